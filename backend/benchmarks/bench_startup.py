@@ -0,0 +1,74 @@
+"""
+Startup benchmark: how long a fresh process takes to import the app, to get
+through startup, and to serve its first request, for a REST-only worker
+(PRELOAD_AGENTS=0) and a chat worker (PRELOAD_AGENTS=1).
+
+Each run is a new interpreter, so nothing is warm from a previous run.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter() - started
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    client.get("/wardrobe")
+    timings = client.get("/ready").json()
+print(json.dumps({
+    "import_ms": round(imported * 1000, 1),
+    "startup_ms": timings["phases"]["total"],
+    "first_request_ms": timings["first_request_ms"]["http"],
+    "autogen_loaded": any(name.startswith("autogen") for name in sys.modules),
+}))
+"""
+
+
+def probe(preload: bool) -> Dict[str, Any]:
+    env = dict(os.environ)
+    env.setdefault("WARDROBE_STORE", "memory")
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env["PRELOAD_AGENTS"] = "1" if preload else "0"
+    out = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    report = {key: round(statistics.median(r[key] for r in runs), 1) for key in ("import_ms", "startup_ms", "first_request_ms")}
+    report["autogen_loaded"] = runs[-1]["autogen_loaded"]
+    return report
+
+
+def main(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        mode: summarize([probe(preload) for _ in range(args.runs)])
+        for mode, preload in (("rest_only", False), ("chat", True))
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per mode (the median is reported)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = main(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for mode, values in report.items():
+            print(f"{mode:10} {values}")
@@ -0,0 +1,179 @@
+"""
+End-to-end WebSocket benchmark against the FastAPI app with a scripted model.
+
+Runs the real app (agents, tools, caches) on an embedded wardrobe store and a
+ScriptedChatCompletionClient, drives N concurrent sessions and reports
+p50/p95/p99 time-to-first-frame and time-to-final_response, plus LLM calls
+and store round-trips per request.
+
+With a response cache enabled (RESPONSE_CACHE=memory), a second wave of
+fresh sessions asks the same question once more, and every one of them must
+be a cache hit; the run exits non-zero otherwise. Repeats inside a session
+are follow-ups with history, which the cache never serves.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ws --sessions 20 --requests 3 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import time
+from typing import Any, Dict, List
+
+# Hermetic defaults; set before the app modules read their config
+os.environ.setdefault("WARDROBE_STORE", "memory")
+os.environ.setdefault("RESPONSE_CACHE", "off")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import uvicorn
+import websockets
+
+from benchmarks.fake_client import ScriptedChatCompletionClient
+from routes.store import DEFAULT_USER_ID, WardrobeStore, create_store
+from utils.instrumented_client import InstrumentedChatCompletionClient
+
+
+class CountingStore(WardrobeStore):
+    """Wraps a store and counts every call, i.e. every database round-trip."""
+
+    def __init__(self, inner: WardrobeStore):
+        self.inner = inner
+        self.calls = 0
+
+    def __getattribute__(self, name: str) -> Any:
+        if name in ("inner", "calls") or name.startswith("__"):
+            return object.__getattribute__(self, name)
+        attr = getattr(object.__getattribute__(self, "inner"), name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def counted(*args, **kwargs):
+            self.calls += 1
+            return await attr(*args, **kwargs)
+        return counted
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_session(url: str, messages: List[str], results: List[Dict[str, float]]) -> None:
+    async with websockets.connect(url, max_size=None) as ws:
+        for text in messages:
+            sent = time.perf_counter()
+            first_frame = None
+            await ws.send(json.dumps({"text": text}))
+            while True:
+                frame = json.loads(await ws.recv())
+                if frame.get("type") in ("session", "ping"):
+                    continue
+                now = time.perf_counter()
+                if first_frame is None:
+                    first_frame = now - sent
+                if frame.get("type") in ("final_response", "error"):
+                    results.append({
+                        "first_frame": first_frame,
+                        "final": now - sent,
+                        "ok": frame["type"] == "final_response",
+                    })
+                    break
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    import main as app_module
+    from routes import mongocl
+    from utils import agents
+
+    fake = ScriptedChatCompletionClient(latency=args.latency, token_delay=args.token_delay)
+    agents.model_client = InstrumentedChatCompletionClient(fake, name="scripted")
+    counting = CountingStore(create_store("memory"))
+    mongocl.use_store(counting)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    # Startup seeding and index creation are not part of the measured traffic
+    counting.calls = 0
+    url = f"ws://127.0.0.1:{port}/ws?user_id={args.user}"
+    results: List[Dict[str, float]] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_session(url, [args.message] * args.requests, results) for _ in range(args.sessions)
+    ))
+    elapsed = time.perf_counter() - started
+    llm_calls, db_calls = fake.calls, counting.calls
+
+    repeat_hits = None
+    if app_module.response_cache is not None:
+        # Not part of the measured traffic: every opening question was answered (and cached) above
+        hits_before = app_module.response_cache.hits
+        await asyncio.gather(*(run_session(url, [args.message], []) for _ in range(args.sessions)))
+        repeat_hits = app_module.response_cache.hits - hits_before
+
+    server.should_exit = True
+    await server_task
+
+    requests = len(results) or 1
+    first = [r["first_frame"] * 1000 for r in results]
+    final = [r["final"] * 1000 for r in results]
+    report = {
+        "sessions": args.sessions,
+        "requests": len(results),
+        "errors": sum(1 for r in results if not r["ok"]),
+        "throughput_rps": round(len(results) / elapsed, 2),
+        "first_frame_ms": {p: round(percentile(first, p), 1) for p in (50, 95, 99)},
+        "final_response_ms": {p: round(percentile(final, p), 1) for p in (50, 95, 99)},
+        "mean_final_ms": round(statistics.mean(final), 1) if final else 0.0,
+        "llm_calls_per_request": round(llm_calls / requests, 2),
+        "db_round_trips_per_request": round(db_calls / requests, 2),
+        "expert_dedupe_ratio": {
+            "color": agents.color_flight.dedupe_ratio,
+            "wardrobe": agents.wardrobe_flight.dedupe_ratio,
+        },
+    }
+    if repeat_hits is not None:
+        report["repeat_cache_hits"] = {"hits": repeat_hits, "expected": args.sessions}
+    return report
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent WebSocket sessions")
+    parser.add_argument("--requests", type=int, default=3, help="messages sent by each session, one after another")
+    parser.add_argument("--message", default="suggest outfit for a wedding")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per model call")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed tokens")
+    parser.add_argument("--user", default=DEFAULT_USER_ID, help="wardrobe owner (the mock data is seeded for DEFAULT_USER_ID)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:28} {value}")
+    repeats = report.get("repeat_cache_hits")
+    if repeats and repeats["hits"] < repeats["expected"]:
+        raise SystemExit(f"repeated questions were not served from the response cache: {repeats}")
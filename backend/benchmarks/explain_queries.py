@@ -0,0 +1,70 @@
+"""
+Print the query plan MongoDB picks for each query the store runs per user, so
+index changes can be checked against a real server: every line should show
+IXSCAN (or DISTINCT_SCAN), never COLLSCAN.
+
+Needs a reachable MongoDB (MONGO_URI); indexes are created if missing.
+
+Usage (from backend/):
+    python -m benchmarks.explain_queries --user default
+"""
+import argparse
+import asyncio
+from typing import Any, Dict, List
+
+from routes.store import DEFAULT_USER_ID, MongoStore
+
+
+def plan_stages(plan: Any) -> List[str]:
+    """Stage names in a plan tree, with the index used by each index scan."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"] + (f"({plan['indexName']})" if "indexName" in plan else ""))
+        for key, value in plan.items():
+            if key != "rejectedPlans":
+                stages += plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            stages += plan_stages(value)
+    return stages
+
+
+async def main(args: argparse.Namespace) -> Dict[str, List[str]]:
+    store = MongoStore()
+    await store.ensure_indexes()
+    db, user = store.db, store._user_filter(args.user)
+    explain = {
+        "find (whole wardrobe)": {"find": "wardrobe", "filter": user},
+        "find (type filter)": {"find": "wardrobe", "filter": {**user, "type": "shirt"}, "collation": MongoStore.COLLATION},
+        "page (sorted by times_worn)": {
+            "find": "wardrobe", "filter": user, "sort": {"times_worn": -1, "_id": -1}, "limit": 21,
+        },
+        "rotation $match": {
+            "aggregate": "wardrobe",
+            "pipeline": [{"$match": user}, {"$project": {"last_worn": 1, "times_worn": 1}}],
+            "cursor": {},
+        },
+        "distinct user_id": {"distinct": "wardrobe", "key": "user_id"},
+        "outfit history": {"find": "outfit_log", "filter": {"user_id": args.user}, "sort": {"worn_at": -1}, "limit": 20},
+    }
+    report = {}
+    for name, command in explain.items():
+        result = await db.command("explain", command, verbosity="queryPlanner")
+        report[name] = plan_stages(result.get("queryPlanner", result).get("winningPlan", result))
+    await store.close()
+    return report
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", default=DEFAULT_USER_ID, help="wardrobe owner to explain the queries for")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    report = asyncio.run(main(parse_args()))
+    for name, stages in report.items():
+        print(f"{name:24} {' <- '.join(stages)}")
+    if any(stage.startswith("COLLSCAN") for stages in report.values() for stage in stages):
+        raise SystemExit("a per-user query scans the whole collection")
@@ -0,0 +1,147 @@
+import asyncio
+import json
+from typing import Any, AsyncGenerator, Callable, List, Mapping, Optional, Sequence, Union
+from autogen_core import CancellationToken, FunctionCall
+from autogen_core.models import (
+    AssistantMessage,
+    ChatCompletionClient,
+    CreateResult,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    ModelCapabilities,
+    ModelInfo,
+    RequestUsage,
+    UserMessage,
+)
+from autogen_core.tools import Tool, ToolSchema
+
+# A script maps (messages, tool names) to either reply text or a list of tool calls
+Script = Callable[[Sequence[LLMMessage], List[str]], Union[str, List[FunctionCall]]]
+
+
+def _text(message: LLMMessage) -> str:
+    content = getattr(message, "content", "")
+    return content if isinstance(content, str) else json.dumps(content, default=str)
+
+
+def default_script(messages: Sequence[LLMMessage], tools: List[str]) -> Union[str, List[FunctionCall]]:
+    """
+    Mimics the real agents: the coordinator consults both experts once per
+    user turn, the wardrobe expert calls WardrobeLook once, everyone else
+    answers in text. The coordinator ends its answer with TERMINATE.
+    """
+    # Messages since the last real user turn
+    turn: List[LLMMessage] = []
+    for message in reversed(messages):
+        if isinstance(message, UserMessage) and _text(message) != "SKIP_USER_INPUT":
+            request = _text(message)
+            break
+        turn.insert(0, message)
+    else:
+        request = ""
+    tool_ran = any(isinstance(m, FunctionExecutionResultMessage) for m in turn)
+
+    if "consult_wardrobe_expert" in tools:
+        if not tool_ran:
+            return [
+                FunctionCall(id="call_wardrobe", name="consult_wardrobe_expert", arguments=json.dumps({"request": request})),
+                FunctionCall(id="call_color", name="consult_color_expert", arguments=json.dumps({"color_query": request})),
+            ]
+        return "Try the white shirt with beige chinos and brown loafers; the neutral palette keeps it classy.\nTERMINATE"
+    if "WardrobeLook" in tools and not tool_ran:
+        return [FunctionCall(id="call_look", name="WardrobeLook", arguments=json.dumps({"request": request}))]
+    return "White, beige and brown form an easy neutral palette for most occasions."
+
+
+class ScriptedChatCompletionClient(ChatCompletionClient):
+    """
+    Deterministic stand-in for OpenAIChatCompletionClient. Every call sleeps
+    for `latency` seconds (streaming calls spread it over the tokens) and
+    answers according to `script`, so benchmarks measure the pipeline rather
+    than the model.
+    """
+
+    def __init__(self, latency: float = 0.5, token_delay: float = 0.01, script: Script = default_script):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.script = script
+        self.calls = 0
+        self._total_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._last_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    @staticmethod
+    def _tool_names(tools: Sequence[Union[Tool, ToolSchema]]) -> List[str]:
+        return [tool["name"] if isinstance(tool, dict) else tool.name for tool in tools]
+
+    def _respond(self, messages: Sequence[LLMMessage], tools: Sequence[Union[Tool, ToolSchema]]) -> CreateResult:
+        self.calls += 1
+        content = self.script(messages, self._tool_names(tools))
+        usage = RequestUsage(
+            prompt_tokens=self.count_tokens(messages),
+            completion_tokens=len(_text(AssistantMessage(content=content, source="fake"))) // 4,
+        )
+        self._last_usage = usage
+        self._total_usage = RequestUsage(
+            prompt_tokens=self._total_usage.prompt_tokens + usage.prompt_tokens,
+            completion_tokens=self._total_usage.completion_tokens + usage.completion_tokens,
+        )
+        finish_reason = "function_calls" if isinstance(content, list) else "stop"
+        return CreateResult(finish_reason=finish_reason, content=content, usage=usage, cached=False)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Union[Tool, ToolSchema]] = [],
+        tool_choice: Any = "auto",
+        json_output: Optional[Any] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        await asyncio.sleep(self.latency)
+        return self._respond(messages, tools)
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Union[Tool, ToolSchema]] = [],
+        tool_choice: Any = "auto",
+        json_output: Optional[Any] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        result = self._respond(messages, tools)
+        if isinstance(result.content, str):
+            tokens = result.content.split(" ")
+            # Time to first token is the bulk of the latency, the rest trickles in
+            await asyncio.sleep(max(self.latency - self.token_delay * len(tokens), 0))
+            for i, token in enumerate(tokens):
+                await asyncio.sleep(self.token_delay)
+                yield token if i == 0 else " " + token
+        else:
+            await asyncio.sleep(self.latency)
+        yield result
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self._last_usage
+
+    def total_usage(self) -> RequestUsage:
+        return self._total_usage
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Union[Tool, ToolSchema]] = []) -> int:
+        return sum(len(_text(m)) for m in messages) // 4
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Union[Tool, ToolSchema]] = []) -> int:
+        return 1_000_000 - self.count_tokens(messages)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore[override]
+        return ModelCapabilities(vision=False, function_calling=True, json_output=False)
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return ModelInfo(vision=False, function_calling=True, json_output=False, family="unknown", structured_output=False)
@@ -1,298 +1,388 @@
 import asyncio
-from typing import Annotated
+import hashlib
+import os
+import time
+
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, WebSocket, Depends, File, Form, Header, Query, Request, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from autogen_agentchat.agents import AssistantAgent, UserProxyAgent
-from autogen_agentchat.conditions import TextMentionTermination
-from autogen_agentchat.messages import TextMessage
-from autogen_core import CancellationToken
 import json
-from utils.tools import WardrobeLook, MarkAsWornTool
-from prompts_lib.prompts import color_expert_prompt, wardrobe_expert_prompt, coordinator_agent_prompt
+from utils.streaming import SentinelStripper
+from utils.cache import create_response_cache
+from utils.telemetry import get_logger, metrics, new_trace_id
+from utils.sessions import session_manager
+from utils.router import route
+from utils.ingest import IMPORT_MAX_ROWS, iter_lines, parse_csv, parse_ndjson
+from utils.photos import PHOTO_MAX_BYTES, analyze_photo, shutdown_pool
+from utils.colors import OCCASIONS, detect_occasion, normalize_color
+from utils.daily import PRECOMPUTE, get_daily, scheduler
 from fastapi import HTTPException
-from typing import Dict, Any
-from routes.mongocl import get_wardrobe, add_to_wardrobe, remove_from_wardrobe, update_item_worn
+from typing import Dict, Any, List, Optional
+from routes.mongocl import check_page_query, get_wardrobe_page, add_to_wardrobe, remove_from_wardrobe, update_item_worn, get_wardrobe_version, get_store_epoch, init_store, close_store, update_items_worn, get_outfit_history, import_items, current_user_id, DEFAULT_USER_ID
 
 load_dotenv()
 
-app = FastAPI()
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+log = get_logger("main")
 
-sessions = {}
-model_client = OpenAIChatCompletionClient(model="gemini-2.5-flash")
+# Load the agent runtime (autogen, model client, agents) at startup instead of
+# on the first chat. Workers that only serve the REST routes set this to 0 and
+# never import it.
+PRELOAD_AGENTS = os.getenv("PRELOAD_AGENTS", "1") == "1"
 
-color_agent = AssistantAgent(
-    name="color_expert",
-    model_client=model_client,
-    system_message=color_expert_prompt
-)
+# Startup phases and the first request of each kind, in milliseconds
+startup_timings: Dict[str, Any] = {"ready": False, "phases": {}, "first_request_ms": {}}
 
-wardrobe_agent = AssistantAgent(
-    name="wardrobe_expert",
-    model_client=model_client,
-    system_message=wardrobe_expert_prompt,
-    tools=[WardrobeLook]
-)
 
+def _record_phase(name: str, started: float) -> None:
+    startup_timings["phases"][name] = round((time.perf_counter() - started) * 1000, 1)
 
-async def consult_color_expert(
-    color_query: Annotated[str, "The color question or combination to analyze (e.g., 'does blue match brown?')"]
-) -> str:
-    print(f"  🎨 Calling color_expert with: {color_query}")
-    
+
+def _record_first_request(kind: str, started: float) -> None:
+    if kind not in startup_timings["first_request_ms"]:
+        startup_timings["first_request_ms"][kind] = round((time.perf_counter() - started) * 1000, 1)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
     try:
-        result = await color_agent.on_messages(
-            [TextMessage(content=color_query, source="coordinator")],
-            cancellation_token=None
-        )
-        if isinstance(result, list):
-            for msg in reversed(result):
-                if hasattr(msg, 'content') and msg.content:
-                    return str(msg.content)
-        elif hasattr(result, 'content'):
-            return str(result.content)
-        elif hasattr(result, 'result'):
-            return str(result.result)
-        
-        print(f"  🎨 Color expert responded successfully")
-        return str(result)
+        await init_store()
     except Exception as e:
-        print(f"  ❌ Color expert error: {str(e)}")
-        return f"I apologize, but I'm having trouble analyzing the colors right now. {str(e)}"
+        # Serve anyway (so /ready can report it and retry), but never as ready
+        startup_timings["store_error"] = str(e)
+        log.error("startup.store_failed", error=str(e))
+    _record_phase("store", started)
 
+    if PRELOAD_AGENTS:
+        phase = time.perf_counter()
+        from utils import agents
+        _record_phase("agents_import", phase)
+        phase = time.perf_counter()
+        startup_timings["warm_up"] = await agents.warm_up()
+        _record_phase("warm_up", phase)
 
-async def consult_wardrobe_expert(
-    request: Annotated[str, "The wardrobe request (e.g., 'suggest outfit for wedding', 'check wardrobe items')"]
-) -> str:
-    """Consult the wardrobe expert to check wardrobe items and get outfit suggestions."""
-    print(f"  👔 Calling wardrobe_expert with: {request}")
-    
-    try:
-        result = await wardrobe_agent.on_messages(
-            [TextMessage(content=request, source="coordinator")],
-            cancellation_token=None
-        )
+    if PRECOMPUTE:
+        scheduler.start()
 
-        if isinstance(result, list):
-            for msg in reversed(result):
-                if hasattr(msg, 'content') and msg.content:
-                    return str(msg.content)
-        elif hasattr(result, 'content'):
-            return str(result.content)
-        elif hasattr(result, 'result'):
-            return str(result.result)
-        
-        print(f"  👔 Wardrobe expert responded successfully")
-        return str(result)
-    except Exception as e:
-        print(f"  ❌ Wardrobe expert error: {str(e)}")
-        return f"I apologize, but I'm having trouble accessing the wardrobe information right now. {str(e)}"
+    _record_phase("total", started)
+    startup_timings["ready"] = "store_error" not in startup_timings
+    log.info("startup.ready" if startup_timings["ready"] else "startup.not_ready", **startup_timings["phases"])
+    yield
+    await scheduler.stop()
+    await session_manager.shutdown()
+    shutdown_pool()
+    await close_store()
 
 
-coordinator_prompt_enhanced = coordinator_agent_prompt + """
+def time_first_request(app):
+    """ASGI middleware recording how long the first HTTP request took; a no-op afterwards."""
+    async def middleware(scope, receive, send):
+        if scope["type"] != "http" or "http" in startup_timings["first_request_ms"]:
+            return await app(scope, receive, send)
+        started = time.perf_counter()
+        try:
+            await app(scope, receive, send)
+        finally:
+            _record_first_request("http", started)
+    return middleware
 
-**Available Tools:**
-- consult_color_expert: Use this when user asks about color combinations or color theory
-- consult_wardrobe_expert: Use this when user needs outfit suggestions or wants to see wardrobe items
-- MarkAsWornTool: Use this to mark items as worn
 
-**Important:** After providing your final response, add "TERMINATE" on a new line.
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(time_first_request)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
+)
 
-**Example workflows:**
+# Largest page GET /wardrobe serves when a limit is given
+WARDROBE_PAGE_MAX = int(os.getenv("WARDROBE_PAGE_MAX", "500"))
 
-User: "Does blue match brown?"
-1. Call consult_color_expert("does blue match brown?")
-2. Synthesize the response in your own words
-3. Add TERMINATE
+response_cache = create_response_cache()
 
-User: "I need an outfit for a wedding"
-1. Call consult_wardrobe_expert("suggest outfit for wedding")
-2. Optionally call consult_color_expert if color advice needed
-3. Synthesize and provide recommendation
-4. Add TERMINATE
+if response_cache is not None:
+    metrics.gauge("wardrobe_response_cache_hits", lambda: response_cache.hits, "Response cache hits since startup")
+    metrics.gauge("wardrobe_response_cache_misses", lambda: response_cache.misses, "Response cache misses since startup")
 
-User: "Hi"
-1. Respond directly (no tools needed)
-2. Add TERMINATE
-"""
 
-coordinator_agent = AssistantAgent(
-    name="CoordinatorAgent",
-    model_client=model_client,
-    system_message=coordinator_prompt_enhanced,
-    tools=[consult_color_expert, consult_wardrobe_expert, MarkAsWornTool]
-)
+def get_user_id(x_user_id: Optional[str] = Header(None), user_id: Optional[str] = None) -> str:
+    """Resolve the wardrobe owner from the X-User-Id header or a user_id query parameter."""
+    return x_user_id or user_id or DEFAULT_USER_ID
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    session_id = id(websocket)
-    
-    print(f"\n🔌 New connection: {session_id}")
-    
-    user_input_queue = asyncio.Queue()
-    should_wait_for_input = asyncio.Event()
+    if session_manager.full:
+        await session_manager.reject(websocket)
+        return
+    from autogen_agentchat.agents import UserProxyAgent
+    from autogen_agentchat.conditions import TextMentionTermination
+    from autogen_agentchat.messages import ModelClientStreamingChunkEvent, TextMessage
+    from autogen_agentchat.teams import RoundRobinGroupChat
+    from autogen_core import CancellationToken
+    from utils.agents import agent_pool, conversation_limiter, consult_in_parallel, is_outfit_request, STREAM_RESPONSES, ORCHESTRATION_MODE
+
+    user_id = websocket.query_params.get("user_id") or websocket.headers.get("x-user-id") or DEFAULT_USER_ID
+    # Inherited by every conversation task, so the wardrobe tools act for this user
+    current_user_id.set(user_id)
+    session = session_manager.open(websocket, user_id)
+    agent_set = agent_pool.acquire()
+    session_id = session.id
+    # Everything from here on runs under the finally that releases the session and the agent set
+    try:
+        should_wait_for_input = session.should_wait_for_input
     
-    async def _user_input(prompt: str, cancellation_token: CancellationToken | None = None) -> str:       
-        if not should_wait_for_input.is_set():
-            print(f"⏭️  UserProxy called but not waiting for input")
-            return "SKIP_USER_INPUT"
+        async def _user_input(prompt: str, cancellation_token: CancellationToken | None = None) -> str:       
+            if not should_wait_for_input.is_set():
+                return "SKIP_USER_INPUT"
         
-        print(f"⏳ Waiting for user input: {prompt[:100]}...")
+            log.info("ws.agent_question", session=session_id, prompt=prompt[:100])
 
-        await websocket.send_json({
-            "type": "agent_question",
-            "content": prompt
-        })
-        
-        user_message = await user_input_queue.get()
-        print(f"✅ Got user input: {user_message}")
+            await websocket.send_json({
+                "type": "agent_question",
+                "content": prompt
+            })
         
-        should_wait_for_input.clear()
-        return user_message
+            user_message = await session.inputs.get()
+            should_wait_for_input.clear()
+            return user_message
     
-    user_proxy = UserProxyAgent(
-        name="User",
-        input_func=_user_input
-    )
+        user_proxy = UserProxyAgent(
+            name="User",
+            input_func=_user_input
+        )
 
-    termination = TextMentionTermination("TERMINATE")
+        termination = TextMentionTermination("TERMINATE")
     
-    from autogen_agentchat.teams import RoundRobinGroupChat
-    
-    team = RoundRobinGroupChat(
-        [user_proxy, coordinator_agent],
-        termination_condition=termination,
-    )
+        team = RoundRobinGroupChat(
+            [user_proxy, agent_set.coordinator_agent],
+            termination_condition=termination,
+        )
     
-    sessions[session_id] = {
-        "websocket": websocket,
-        "team": team,
-        "user_input_queue": user_input_queue,
-        "should_wait_for_input": should_wait_for_input,
-        "conversation_task": None
-    }
+        session.team = team
+        session.agents = agent_set
+        resume_id = websocket.query_params.get("session_id")
+        resumed = bool(resume_id) and await session_manager.resume(session, resume_id)
+        session_id = session.id
+        log.info("ws.connect", session=session_id, user_id=user_id, resumed=resumed)
+        await websocket.send_json({"type": "session", "session_id": session_id, "resumed": resumed})
     
-    try:
         while True:
             data = await websocket.receive_text()
-            print(f"\n{'='*60}")
-            print(f"📨 Received: {data}")
             
             try:
                 parsed_data = json.loads(data)
-                user_message = parsed_data.get('text', data)
+                if isinstance(parsed_data, dict) and parsed_data.get('type') == 'pong':
+                    session.touch(active=False)
+                    continue
+                user_message = parsed_data.get('text', data) if isinstance(parsed_data, dict) else data
             except json.JSONDecodeError:
                 user_message = data
+            session.touch()
             
-            print(f"💬 User: {user_message}")
-            
-            if sessions[session_id]["conversation_task"] is not None and not sessions[session_id]["conversation_task"].done():
-                print("➡️  Feeding to ongoing conversation")
-                should_wait_for_input.set()
-                user_input_queue.put_nowait(user_message)
+            if session.busy:
+                log.info("ws.feed_input", session=session_id, pending=len(session.inputs))
+                if session.inputs.put(user_message):
+                    should_wait_for_input.set()
+                else:
+                    await websocket.send_json({
+                        "type": "status",
+                        "message": "Tara is still working on your earlier messages..."
+                    })
             else:
-                print("🚀 Starting new conversation")
-                
-                async def run_conversation():
-                    await websocket.send_json({"type": "status", "message": "Processing..."})
-                    
+                async def report_queue_position(position: int):
+                    await websocket.send_json({
+                        "type": "status",
+                        "message": f"Tara is busy, you are number {position} in the queue..."
+                    })
+
+                # The receive loop rebinds user_message for the next message while
+                # this one runs, so the conversation gets its own copy
+                async def run_conversation(user_message: str, wardrobe_version: Optional[int]):
                     messages = []
                     last_content = ""
+                    stripper = SentinelStripper("TERMINATE")
+                    # Answers that asked the user something or marked items worn are never cached
+                    cacheable = response_cache is not None
+                    timings = None
+                    new_trace_id()
+                    started = time.perf_counter()
+                    path = "team"
+                    log.info("conversation.start", session=session_id, user_id=user_id, message=user_message[:200])
                     
                     try:
-                        async for message in team.run_stream(task=user_message):
-                            if hasattr(message, 'content') and isinstance(message.content, list):
-                                print(f"  🔧 {message.source}: [TOOL_CALL]")
+                        routed = await route(user_message, user_id)
+                        if routed is not None:
+                            intent, reply = routed
+                            path = f"router:{intent}"
+                            await websocket.send_json({
+                                "type": "final_response",
+                                "agent": "Tara",
+                                "content": reply
+                            })
+                            await agent_set.remember(user_message, reply)
+                            return
+
+                        # A follow-up leans on earlier turns, so only a conversation's opening question is
+                        # served from or stored in the cache
+                        if cacheable and await agent_set.has_history():
+                            cacheable = False
+                        if cacheable:
+                            cached = await response_cache.get(user_message, wardrobe_version, user_id)
+                            if cached is not None:
+                                path = "cache"
                                 await websocket.send_json({
-                                    "type": "status",
-                                    "message": "Consulting experts..."
+                                    "type": "final_response",
+                                    "agent": "Tara",
+                                    "content": cached
+                                })
+                                await agent_set.remember(user_message, cached)
+                                return
+
+                        async with conversation_limiter.slot(on_queued=report_queue_position):
+                            await websocket.send_json({"type": "status", "message": "Processing..."})
+
+                            if ORCHESTRATION_MODE == "parallel" and is_outfit_request(user_message):
+                                path = "parallel"
+                                async def send_token(token: str):
+                                    delta = stripper.feed(token)
+                                    if delta:
+                                        await websocket.send_json({
+                                            "type": "partial_response",
+                                            "agent": "Tara",
+                                            "content": delta
+                                        })
+
+                                content, timings = await consult_in_parallel(
+                                    agent_set, user_message, on_token=send_token, cancellation_token=session.cancellation_token
+                                )
+                                log.info("conversation.timings", **timings)
+                                messages.append({
+                                    "agent": "CoordinatorAgent",
+                                    "content": content.replace("TERMINATE", "").strip()
                                 })
-                                continue
-                            
-                            # Get message content safely
-                            if isinstance(message, dict):
-                                content = str(message.get('result', ""))
-                            elif hasattr(message, 'result'):
-                                content = str(message.result)
-                            elif hasattr(message, 'content'):
-                                content = str(message.content)
                             else:
-                                content = ""
+                                async for message in team.run_stream(task=user_message, cancellation_token=session.cancellation_token):
+                                    if isinstance(message, ModelClientStreamingChunkEvent):
+                                        if STREAM_RESPONSES and message.source == "CoordinatorAgent":
+                                            delta = stripper.feed(message.content)
+                                            if delta:
+                                                await websocket.send_json({
+                                                    "type": "partial_response",
+                                                    "agent": "Tara",
+                                                    "content": delta
+                                                })
+                                        continue
+
+                                    # A complete message closes the current streamed inference
+                                    tail = stripper.flush()
+                                    if tail.strip():
+                                        await websocket.send_json({
+                                            "type": "partial_response",
+                                            "agent": "Tara",
+                                            "content": tail
+                                        })
+
+                                    if hasattr(message, 'content') and isinstance(message.content, list):
+                                        log.debug("conversation.tool_call", agent=message.source, tools=[getattr(call, 'name', None) for call in message.content])
+                                        if any(getattr(call, 'name', None) == "MarkAsWorn" for call in message.content):
+                                            cacheable = False
+                                        await websocket.send_json({
+                                            "type": "status",
+                                            "message": "Consulting experts..."
+                                        })
+                                        continue
+                            
+                                    # Get message content safely
+                                    if isinstance(message, dict):
+                                        content = str(message.get('result', ""))
+                                    elif hasattr(message, 'result'):
+                                        content = str(message.result)
+                                    elif hasattr(message, 'content'):
+                                        content = str(message.content)
+                                    else:
+                                        content = ""
                             
-                            # Skip sentinel, empty, and user messages
-                            if content == "SKIP_USER_INPUT" or not content.strip() or message.source == 'User':
-                                continue
+                                    # The proxy's UserInputRequestedEvent is also from "User"; only an actual reply counts
+                                    if isinstance(message, TextMessage) and message.source == 'User' and content != "SKIP_USER_INPUT":
+                                        cacheable = False
+
+                                    # Skip sentinel, empty, and user messages
+                                    if content == "SKIP_USER_INPUT" or not content.strip() or message.source == 'User':
+                                        continue
                                 
-                            # Avoid duplicate messages from tool calls
-                            if content == last_content:
-                                continue
+                                    # Avoid duplicate messages from tool calls
+                                    if content == last_content:
+                                        continue
                                 
-                            last_content = content
+                                    last_content = content
                             
-                            # Remove TERMINATE
-                            content = content.replace("TERMINATE", "").strip()
+                                    # Remove TERMINATE
+                                    content = content.replace("TERMINATE", "").strip()
                             
-                            if content and message.source == "CoordinatorAgent":
-                                print(f"  💬 {message.source}: {content[:100]}...")
-                                messages.append({
-                                    "agent": message.source,
-                                    "content": content
-                                })
+                                    if content and message.source == "CoordinatorAgent":
+                                        messages.append({
+                                            "agent": message.source,
+                                            "content": content
+                                        })
                         
-                        print(f"✅ Collected {len(messages)} messages")
-                        
-                        if messages:
-                            # Filter out tool responses and send only the final meaningful response
-                            final_messages = [m for m in messages if not m["content"].startswith("Unable to")]
-                            if final_messages:
-                                await websocket.send_json({
-                                    "type": "final_response",
-                                    "agent": "Tara",
-                                    "content": final_messages[-1]["content"]
-                                })
-                                print(f"📤 Sent to frontend: {final_messages[-1]['content'][:100]}...")
+                            if messages:
+                                # Filter out tool responses and send only the final meaningful response
+                                final_messages = [m for m in messages if not m["content"].startswith("Unable to")]
+                                if final_messages:
+                                    final_frame = {
+                                        "type": "final_response",
+                                        "agent": "Tara",
+                                        "content": final_messages[-1]["content"]
+                                    }
+                                    if timings:
+                                        final_frame["timings"] = timings
+                                    await websocket.send_json(final_frame)
+                                    if cacheable:
+                                        await response_cache.set(user_message, wardrobe_version, final_messages[-1]["content"], user_id)
+                                else:
+                                    await websocket.send_json({
+                                        "type": "error",
+                                        "content": "I'm having trouble processing that request. Could you please try again?"
+                                    })
                             else:
                                 await websocket.send_json({
                                     "type": "error",
-                                    "content": "I'm having trouble processing that request. Could you please try again?"
+                                    "content": "No response generated"
                                 })
-                        else:
-                            await websocket.send_json({
-                                "type": "error",
-                                "content": "No response generated"
-                            })
                         
                     except Exception as e:
-                        print(f"❌ Error: {e}")
-                        import traceback
-                        traceback.print_exc()
+                        path = "error"
+                        log.error("conversation.error", exc_info=True, error=str(e))
                         await websocket.send_json({
                             "type": "error",
                             "content": "Something went wrong"
                         })
                     finally:
-                        sessions[session_id]["conversation_task"] = None
                         should_wait_for_input.clear()
-                        print(f"{'='*60}\n")
+                        await session_manager.save(session)
+                        elapsed = time.perf_counter() - started
+                        metrics.observe("wardrobe_conversation_seconds", elapsed, path=path)
+                        _record_first_request("ws", started)
+                        log.info("conversation.end", path=path, ms=round(elapsed * 1000, 1), messages=len(messages))
                 
-                sessions[session_id]["conversation_task"] = asyncio.create_task(run_conversation())
+                # The version the question was asked against keys the cached answer
+                wardrobe_version = await get_wardrobe_version(user_id) if response_cache is not None else None
+                session.start_conversation(run_conversation(user_message, wardrobe_version))
             
     except Exception as e:
-        print(f"❌ Connection error: {e}")
+        log.info("ws.disconnect", session=session_id, reason=str(e) or type(e).__name__)
     finally:
-        if session_id in sessions:
-            if sessions[session_id]["conversation_task"]:
-                sessions[session_id]["conversation_task"].cancel()
-            del sessions[session_id]
+        await session_manager.close(session)
+        await agent_pool.release(agent_set)
         
         try:
             await websocket.close()
@@ -304,38 +394,241 @@ async def websocket_endpoint(websocket: WebSocket):
 async def root():
     return {"message": "Wardrobe Assistant API is running"}
 
+@app.get('/ready')
+async def ready():
+    """Readiness probe, with the startup timings; 503 until startup has finished with a working store."""
+    if "store_error" in startup_timings:
+        # Retried on each probe, so a store that was down at boot does not leave the worker unready for good
+        try:
+            await init_store()
+        except Exception as e:
+            startup_timings["store_error"] = str(e)
+        else:
+            del startup_timings["store_error"]
+            startup_timings["ready"] = True
+            log.info("startup.store_recovered")
+    return JSONResponse(startup_timings, status_code=200 if startup_timings["ready"] else 503)
+
+@app.get('/metrics', response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get('/cache/stats')
+async def cache_stats():
+    if response_cache is None:
+        return {"status": "disabled"}
+    return {"status": "success", "data": await response_cache.stats()}
+
+def _wardrobe_etag(user_id: str, epoch: str, version: int, query: Dict[str, Any]) -> str:
+    """
+    Weak ETag for one view of a wardrobe: changes with the wardrobe version
+    and the query, and with the store epoch, since versions restart with a
+    new store (e.g. the embedded one after a restart).
+    """
+    digest = hashlib.sha1(json.dumps([user_id, query], sort_keys=True).encode()).hexdigest()[:12]
+    return f'W/"{epoch}.{version}-{digest}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
 @app.get('/wardrobe')
-async def get_wardrobe_data():
+async def get_wardrobe_data(
+    type: Optional[str] = None,
+    color: Optional[str] = None,
+    style: Optional[str] = None,
+    fit: Optional[str] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=WARDROBE_PAGE_MAX),
+    cursor: Optional[str] = None,
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    user_id: str = Depends(get_user_id)
+):
+    """
+    List wardrobe items. Without limit the whole (filtered) wardrobe is returned
+    as before; with limit, pages are chained through next_cursor. format=ndjson
+    (or Accept: application/x-ndjson) streams one item per line for export.
+    Responses carry an ETag tied to the wardrobe version, so revalidating an
+    unchanged wardrobe returns 304 without reading it.
+    """
+    ndjson = format == "ndjson" or "application/x-ndjson" in (accept or "")
+    filters = {"type": type, "color": color, "style": style, "fit": fit}
+    query = {**filters, "sort": sort, "limit": limit, "cursor": cursor, "ndjson": ndjson}
     try:
-        data = await get_wardrobe()
-        return {"status": "success", "data": data}
+        # A bad sort or cursor is a 400 even when the client's copy is current
+        check_page_query(sort, cursor)
+        version = await get_wardrobe_version(user_id)
+        etag = _wardrobe_etag(user_id, await get_store_epoch(), version, query)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(if_none_match, etag):
+            metrics.inc("wardrobe_http_not_modified_total")
+            return Response(status_code=304, headers=headers)
+
+        data, next_cursor = await get_wardrobe_page(filters, sort=sort, limit=limit, cursor=cursor, user_id=user_id)
+        if ndjson:
+            if next_cursor:
+                headers["X-Next-Cursor"] = next_cursor
+
+            async def lines():
+                for item in data:
+                    yield json.dumps(jsonable_encoder(item)) + "\n"
+
+            return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
+
+        body = {"status": "success", "data": data}
+        if limit is not None:
+            body["next_cursor"] = next_cursor
+        return JSONResponse(jsonable_encoder(body), headers=headers)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/wardrobe/daily')
+async def get_daily_plan(
+    occasion: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    user_id: str = Depends(get_user_id)
+):
+    """
+    Today's precomputed plan: the top outfits per occasion (or only the one
+    asked for) and the wardrobe's rotation stats (stale, most and least worn
+    items). Computed in the background, so this is normally a cache read.
+    """
+    if occasion is not None:
+        occasion = occasion.lower() if occasion.lower() in OCCASIONS else detect_occasion(occasion)
+        if occasion is None:
+            raise HTTPException(status_code=400, detail=f"occasion must be one of {', '.join(OCCASIONS)}")
+    try:
+        plan = await get_daily(user_id)
+        etag = _wardrobe_etag(user_id, await get_store_epoch(), plan["version"], {"daily": plan["date"], "occasion": occasion})
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(if_none_match, etag):
+            metrics.inc("wardrobe_http_not_modified_total")
+            return Response(status_code=304, headers=headers)
+        if occasion is not None:
+            plan = {**plan, "outfits": {occasion: plan["outfits"].get(occasion, [])}}
+        return JSONResponse({"status": "success", "data": plan}, headers=headers)
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post('/wardrobe/add')
-async def add_item(item: Dict[str, Any]):
+async def add_item(item: Dict[str, Any], user_id: str = Depends(get_user_id)):
     try:
-        item_id = await add_to_wardrobe(item)
+        item_id = await add_to_wardrobe(item, user_id=user_id)
         return {"status": "success", "item_id": item_id}
     except HTTPException as he:
         raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post('/wardrobe/import')
+async def import_wardrobe(request: Request, format: Optional[str] = None, user_id: str = Depends(get_user_id)):
+    """
+    Bulk import from an NDJSON (one item per line) or CSV (header row) body,
+    read as a stream. Rows with an item_id replace the item with that
+    item_id, so re-importing a file is idempotent. Invalid rows are reported
+    per row and skipped; past IMPORT_MAX_ROWS the rest of the file is left
+    unread and the result is marked truncated.
+    """
+    content_type = request.headers.get("content-type", "")
+    format = format or ("csv" if "csv" in content_type else "ndjson")
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    lines = iter_lines(request.stream())
+    rows = parse_csv(lines) if format == "csv" else parse_ndjson(lines)
+    result = await import_items(rows, user_id=user_id, max_rows=IMPORT_MAX_ROWS)
+    metrics.inc("wardrobe_import_rows_total", result["inserted"], outcome="inserted")
+    metrics.inc("wardrobe_import_rows_total", result["updated"], outcome="updated")
+    metrics.inc("wardrobe_import_rows_total", result["failed"], outcome="failed")
+    if result["rows"] and not (result["inserted"] or result["updated"]):
+        raise HTTPException(status_code=422, detail=result)
+    status = "success" if not (result["failed"] or result["truncated"]) else "partial"
+    return {"status": status, **result}
+
+async def _read_upload(file: UploadFile) -> bytes:
+    data = await file.read(PHOTO_MAX_BYTES + 1)
+    if len(data) > PHOTO_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Photo larger than {PHOTO_MAX_BYTES} bytes")
+    return data
+
+@app.post('/wardrobe/photo/colors')
+async def photo_colors(files: List[UploadFile] = File(...)):
+    """Dominant palette colors of one or more garment photos; the photos are analysed concurrently."""
+    async def analyze(file: UploadFile) -> Dict[str, Any]:
+        try:
+            return {"filename": file.filename, "colors": await analyze_photo(await _read_upload(file))}
+        except HTTPException as he:
+            return {"filename": file.filename, "error": he.detail}
+
+    results = await asyncio.gather(*(analyze(file) for file in files))
+    status = "success" if all("colors" in r for r in results) else "partial" if any("colors" in r for r in results) else "error"
+    return {"status": status, "data": results}
+
+@app.post('/wardrobe/add/photo')
+async def add_item_from_photo(
+    file: UploadFile = File(...),
+    item_name: str = Form(...),
+    type: str = Form(...),
+    style: str = Form(...),
+    fit: str = Form(...),
+    color: Optional[str] = Form(None),
+    user_id: str = Depends(get_user_id)
+):
+    """Add an item whose colors come from its photo. A color given in the form wins over the detected one."""
+    colors = await analyze_photo(await _read_upload(file))
+    item = {
+        "item_name": item_name,
+        "type": type,
+        "color": (normalize_color(color) or color) if color else colors[0]["color"],
+        "style": style,
+        "fit": fit,
+        "colors": colors,
+    }
+    try:
+        item_id = await add_to_wardrobe(item, user_id=user_id)
+        return {"status": "success", "item_id": item_id, "color": item["color"], "colors": colors}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.delete('/wardrobe/{item_id}')
-async def delete_item(item_id: str):
+async def delete_item(item_id: str, user_id: str = Depends(get_user_id)):
     try:
-        result = await remove_from_wardrobe(item_id)
+        result = await remove_from_wardrobe(item_id, user_id=user_id)
         return {"status": "success", "message": "Item deleted successfully"}
     except HTTPException as he:
         raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.put('/wardrobe/worn')
+async def mark_items_worn_bulk(payload: Dict[str, List[str]], user_id: str = Depends(get_user_id)):
+    item_ids = payload.get("item_ids") or []
+    if not item_ids:
+        raise HTTPException(status_code=400, detail="item_ids is required")
+    result = await update_items_worn(item_ids, user_id=user_id)
+    if not result["updated"]:
+        raise HTTPException(status_code=404, detail=result)
+    status = "success" if not (result["missing"] or result["invalid"]) else "partial"
+    return {"status": status, **result}
+
+@app.get('/wardrobe/history')
+async def outfit_history(limit: int = 20, user_id: str = Depends(get_user_id)):
+    data = await get_outfit_history(limit, user_id=user_id)
+    return {"status": "success", "data": data}
+
 @app.put('/wardrobe/{item_id}/worn')
-async def mark_item_worn(item_id: str):
+async def mark_item_worn(item_id: str, user_id: str = Depends(get_user_id)):
     try:
-        result = await update_item_worn(item_id)
+        result = await update_item_worn(item_id, user_id=user_id)
         return {"status": "success", "message": "Item marked as worn"}
     except HTTPException as he:
         raise he
@@ -343,6 +636,28 @@ async def mark_item_worn(item_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+startup_timings["import_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
+metrics.gauge("wardrobe_import_seconds", lambda: startup_timings["import_ms"] / 1000, "Time to import the app module")
+metrics.gauge("wardrobe_startup_seconds", lambda: startup_timings["phases"].get("total", 0) / 1000, "Time from startup to ready")
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        # Workers are separate processes: they share wardrobe versions, cached
+        # responses, item handles and resumable sessions through one state service
+        from multiprocessing import Process
+        from utils.shared import run_service
+        if os.getenv("WARDROBE_STORE", "mongo") == "memory":
+            log.warning("startup.memory_store_per_worker", workers=workers)
+        socket_path = os.environ.setdefault("SHARED_STATE_SOCKET", "/tmp/wardrobe-state.sock")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        service = Process(target=run_service, args=(socket_path,), daemon=True)
+        service.start()
+        while not os.path.exists(socket_path):
+            time.sleep(0.05)
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,70 +1,483 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+import base64
+import json
+from contextvars import ContextVar
 from bson import ObjectId
-from datetime import datetime
-from typing import Dict, Any, List
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Any, AsyncIterator, List, Callable, Optional, Tuple, Union
 from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from routes.store import DEFAULT_USER_ID, WARDROBE_SEED, WardrobeStore, create_store, seed_from_mock_data, sort_key
+from utils.shared import shared_state
+from utils.telemetry import get_logger, span
 
-# MongoDB connection string
-MONGO_URI = "mongodb://localhost:27017"
+log = get_logger("db")
 
-# Create a motor client
-client = AsyncIOMotorClient(MONGO_URI)
-db = client.wardrobe
+# Backend chosen by WARDROBE_STORE ("mongo" or "memory"); nothing connects until first use
+store: WardrobeStore = create_store()
+
+# The user a request or WebSocket session acts for. Set once per connection so
+# the LLM tools resolve to the right wardrobe without threading user_id through.
+current_user_id: ContextVar[str] = ContextVar("current_user_id", default=DEFAULT_USER_ID)
+
+def _resolve_user(user_id: Optional[str]) -> str:
+    return user_id or current_user_id.get()
+
+def use_store(new_store: WardrobeStore) -> None:
+    """Swap the storage backend (e.g. for tests or benchmarks) and drop everything cached from the old one."""
+    global store
+    store = new_store
+    _cache.clear()
+    _cache_versions.clear()
+    if shared_state.local:
+        shared_state.clear_now(VERSION_PREFIX)
+        shared_state.clear_now(DAILY_PREFIX)
+
+# Callbacks notified after every successful write: listener(event, item)
+# where event is "add", "remove", "worn" or "reset" (the wardrobe changed in
+# another worker; reload it) and item always carries user_id
+_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+def on_wardrobe_change(listener: Callable[[str, Dict[str, Any]], None]) -> None:
+    _listeners.append(listener)
+
+def _notify(event: str, item: Dict[str, Any]) -> None:
+    for listener in _listeners:
+        try:
+            listener(event, item)
+        except Exception as e:
+            log.error("listener.error", wardrobe_event=event, error=str(e))
+
+# Per-user version, bumped on every write so caches keyed on it (e.g. the
+# response cache) go stale. Persisted by the store so it survives restarts
+# alongside on-disk caches, and mirrored in the shared state so every worker
+# sees a write made by another.
+VERSION_PREFIX = "version:"
+
+async def get_wardrobe_version(user_id: Optional[str] = None) -> int:
+    user_id = _resolve_user(user_id)
+    version = await shared_state.get(VERSION_PREFIX + user_id)
+    if version is None:
+        with span("db", op="get_version"):
+            version = await store.get_version(user_id)
+        await shared_state.set(VERSION_PREFIX + user_id, version)
+    return version
+
+async def get_store_epoch() -> str:
+    """Changes when the store's version counters may have restarted; see WardrobeStore.get_epoch."""
+    return await store.get_epoch()
+
+async def _bump_version(user_id: str) -> None:
+    with span("db", op="bump_version"):
+        version = await store.bump_version(user_id)
+    await shared_state.set(VERSION_PREFIX + user_id, version)
+    # Keep the local cache only if nothing else wrote since it was filled
+    if _cache_versions.get(user_id) == version - 1:
+        _cache_versions[user_id] = version
+    else:
+        _drop_cache(user_id)
+
+# Rows validated and written per bulk round-trip by import_items
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+# Per-row errors reported back for one import; further ones are only counted
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "100"))
+
+REQUIRED_FIELDS = ['item_name', 'type', 'color', 'style', 'fit']
+
+# Fields the LLM tools need; everything else is noise in the prompt
+LLM_FIELDS = ['item_name', 'type', 'color', 'style', 'fit', 'last_worn']
+FILTER_FIELDS = ('type', 'color', 'style', 'fit')
+SORT_FIELDS = ('times_worn', 'last_worn')
+
+# Write-through cache of each user's wardrobe keyed by _id. Filled by the first
+# unfiltered read and kept coherent by add/remove/worn, so later reads cost no
+# database round-trip.
+_cache: Dict[str, Dict[str, Dict[str, Any]]] = {}
+# Wardrobe version each cached wardrobe was read at
+_cache_versions: Dict[str, int] = {}
+
+def _drop_cache(user_id: str) -> None:
+    if _cache.pop(user_id, None) is not None:
+        _cache_versions.pop(user_id, None)
+        _notify("reset", {"user_id": user_id})
+
+async def refresh_if_stale(user_id: Optional[str] = None) -> None:
+    """Drop this worker's copy of a wardrobe (and notify listeners) if another worker changed it."""
+    await _fresh_cache(_resolve_user(user_id))
+
+async def _fresh_cache(user_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """The user's cached wardrobe, unless another worker has written to it since it was read."""
+    if user_id in _cache and not shared_state.local:
+        if await get_wardrobe_version(user_id) != _cache_versions.get(user_id):
+            _drop_cache(user_id)
+    return _cache.get(user_id)
+
+async def init_store() -> None:
+    """Connect the store, create its indexes and optionally seed it from the mock data."""
+    await store.connect()
+    with span("db", op="ping"):
+        await store.ping()
+    await store.ensure_indexes()
+    if WARDROBE_SEED:
+        count = await seed_from_mock_data(store)
+        # Seeding bumped the version in the store; drop any copy another worker mirrored before it
+        await shared_state.delete(VERSION_PREFIX + DEFAULT_USER_ID)
+        log.info("store.seeded", items=count)
+
+async def close_store() -> None:
+    await store.close()
+
+def _project(item: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    if not fields:
+        return dict(item)
+    return {'_id': item['_id'], **{f: item[f] for f in fields if f in item}}
+
+def _matches(item: Dict[str, Any], filters: Dict[str, str]) -> bool:
+    return all(str(item.get(k, "")).lower() == str(v).lower() for k, v in filters.items())
+
+async def get_wardrobe(
+    fields: Optional[List[str]] = None,
+    filters: Optional[Dict[str, str]] = None,
+    user_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    user_id = _resolve_user(user_id)
+    filters = {k: v for k, v in (filters or {}).items() if k in FILTER_FIELDS and v}
+    cached = await _fresh_cache(user_id)
+    if cached is not None:
+        return [_project(item, fields) for item in cached.values() if _matches(item, filters)]
 
-async def get_wardrobe() -> List[Dict[str, Any]]:
     try:
-        collection = db.wardrobe
-        items = await collection.find().to_list(length=None)
-        # Convert ObjectId to string for JSON serialization
-        for item in items:
-            item['_id'] = str(item['_id'])
-        return items
+        if filters:
+            # Cold cache: let the store filter (via its indexes) and project instead of pulling everything
+            with span("db", op="find_items"):
+                return await store.find_items(user_id, filters=filters, fields=fields)
+        version = await get_wardrobe_version(user_id)
+        with span("db", op="find_items"):
+            items = await store.find_items(user_id)
+        # A write that bumped the version while we read may be missing from `items`; don't keep them.
+        # One that bumps it after this check finds the cache filled and writes itself through.
+        if user_id not in _cache and await get_wardrobe_version(user_id) == version:
+            _cache[user_id] = {item['_id']: item for item in items}
+            _cache_versions[user_id] = version
+        return [_project(item, fields) for item in items]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-async def add_to_wardrobe(item: Dict[str, Any]) -> str:
-    required_fields = ['item_name', 'type', 'color', 'style', 'fit']
-    if not all(key in item for key in required_fields):
+def encode_cursor(sort: Optional[str], key: tuple) -> str:
+    raw = json.dumps({"s": sort, "k": list(key)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: Optional[str]) -> tuple:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key = tuple(data["k"])
+        expected = sort_key({'_id': ""}, sort.lstrip('-') if sort else None)
+        if data["s"] != sort or len(key) != 2 or any(type(k) is not type(e) for k, e in zip(key, expected)):
+            raise ValueError("cursor was issued for a different sort")
+        return key
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def check_page_query(sort: Optional[str], cursor: Optional[str]) -> Optional[tuple]:
+    """Validate a listing's sort and cursor (400 if either is bad) and return the cursor's keyset."""
+    field = sort.lstrip('-') if sort else None
+    if field is not None and field not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORT_FIELDS)} (prefix '-' for descending)")
+    return decode_cursor(cursor, sort) if cursor else None
+
+async def get_wardrobe_page(
+    filters: Optional[Dict[str, str]] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    user_id: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of a wardrobe in a stable order, with keyset pagination: the
+    cursor records the last item's sort key, so pages stay consistent when
+    items are added or removed in between. A warm, unfiltered wardrobe is
+    paged from the cache; otherwise the store sorts, seeks past the cursor
+    and reads only the page.
+
+    Args:
+        sort: "times_worn" or "last_worn", "-" prefixed for descending; None keeps insertion order.
+        limit: Page size; None returns everything after the cursor.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str]]: The items and the cursor for the next page, if any.
+    """
+    after = check_page_query(sort, cursor)
+    field = sort.lstrip('-') if sort else None
+    descending = bool(sort) and sort.startswith('-')
+    user_id = _resolve_user(user_id)
+    filters = {k: v for k, v in (filters or {}).items() if k in FILTER_FIELDS and v}
+
+    cached = None if filters else await _fresh_cache(user_id)
+    if cached is not None:
+        keyed = sorted(((sort_key(item, field), item) for item in cached.values()), key=lambda pair: pair[0], reverse=descending)
+        if after is not None:
+            keyed = [(key, item) for key, item in keyed if (key < after if descending else key > after)]
+        items = [item for _, item in keyed[:None if limit is None else limit + 1]]
+    else:
+        try:
+            # One extra item tells whether there is a next page
+            with span("db", op="find_items"):
+                items = await store.find_items(
+                    user_id, filters=filters, sort=sort, after=after, limit=None if limit is None else limit + 1
+                )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    page = items if limit is None else items[:limit]
+    next_cursor = encode_cursor(sort, sort_key(page[-1], field)) if limit is not None and len(items) > limit else None
+    return [_project(item, fields) for item in page], next_cursor
+
+async def add_to_wardrobe(item: Dict[str, Any], user_id: Optional[str] = None) -> str:
+    if not all(key in item for key in REQUIRED_FIELDS):
         raise HTTPException(
-            status_code=400, 
-            detail=f"Missing required fields. Required: {', '.join(required_fields)}"
+            status_code=400,
+            detail=f"Missing required fields. Required: {', '.join(REQUIRED_FIELDS)}"
         )
-    
+
+    user_id = _resolve_user(user_id)
     try:
-        collection = db.wardrobe
         # Add default values
         item.update({
+            'user_id': user_id,
             'last_worn': None,
             'times_worn': 0,
             'created_at': datetime.now()
         })
-        result = await collection.insert_one(item)
-        return str(result.inserted_id)
+        with span("db", op="insert_item"):
+            item_id = await store.insert_item(item)
+        await _bump_version(user_id)
+        stored = {**item, '_id': item_id}
+        if user_id in _cache:
+            _cache[user_id][item_id] = stored
+        _notify("add", dict(stored))
+        return item_id
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+def _validate_row(row: Any) -> Union[Dict[str, Any], str]:
+    """A clean item to write, or the reason the row was rejected."""
+    if not isinstance(row, dict):
+        return "row is not an object"
+    missing = [key for key in REQUIRED_FIELDS if not str(row.get(key) or "").strip()]
+    if missing:
+        return f"missing required fields: {', '.join(missing)}"
+    # Ownership, identity and bookkeeping are the server's, whatever the file says
+    item = {k: v for k, v in row.items() if k not in ('_id', 'user_id', 'created_at') and v != ""}
+    for key in REQUIRED_FIELDS:
+        item[key] = str(item[key]).strip()
+    if 'item_id' in item:
+        item['item_id'] = str(item['item_id']).strip()
+    if 'times_worn' in item:
+        try:
+            item['times_worn'] = int(item['times_worn'])
+        except (TypeError, ValueError):
+            return "times_worn must be an integer"
+    return item
+
+async def import_items(
+    rows: AsyncIterator[Tuple[int, Any]],
+    user_id: Optional[str] = None,
+    max_rows: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Bulk-load items from a stream of (row number, parsed row) pairs. Rows are
+    validated and written in chunks of IMPORT_CHUNK_SIZE, one unordered bulk
+    write per chunk; rows carrying an item_id are upserted so re-imports are
+    idempotent. A parsed row that is an Exception is reported as that row's
+    error. Bad rows never stop the import; reaching `max_rows` does, with
+    `truncated` set and the rows before it kept.
+
+    Returns:
+        Dict[str, Any]: Row, inserted and updated counts, the per-row errors
+        and whether the import was truncated.
+    """
+    user_id = _resolve_user(user_id)
+    summary: Dict[str, Any] = {"rows": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": [], "truncated": False}
+
+    def reject(row_number: int, error: str) -> None:
+        summary["failed"] += 1
+        if len(summary["errors"]) < IMPORT_MAX_ERRORS:
+            summary["errors"].append({"row": row_number, "error": error})
+
+    async def flush(batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        defaults = {'last_worn': None, 'times_worn': 0, 'created_at': datetime.now()}
+        with span("db", op="write_items", rows=len(batch)):
+            result = await store.write_items(user_id, [item for _, item in batch], defaults)
+        summary["inserted"] += len(result["inserted"])
+        summary["updated"] += len(result["updated"])
+        for index, error in result["errors"].items():
+            reject(batch[index][0], error)
+
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    try:
+        async for row_number, row in rows:
+            if max_rows is not None and summary["rows"] >= max_rows:
+                summary["truncated"] = True
+                break
+            summary["rows"] += 1
+            item = row if isinstance(row, Exception) else _validate_row(row)
+            if not isinstance(item, dict):
+                reject(row_number, str(item))
+                continue
+            batch.append((row_number, {**item, 'user_id': user_id}))
+            if len(batch) >= IMPORT_CHUNK_SIZE:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        if summary["inserted"] or summary["updated"]:
+            # One invalidation for the whole import instead of one notification per item
+            _drop_cache(user_id)
+            await _bump_version(user_id)
+    return summary
 
-async def remove_from_wardrobe(item_id: str) -> bool:
+async def remove_from_wardrobe(item_id: str, user_id: Optional[str] = None) -> bool:
+    user_id = _resolve_user(user_id)
+    if not ObjectId.is_valid(item_id):
+        raise HTTPException(status_code=404, detail="Item not found")
     try:
-        collection = db.wardrobe
-        result = await collection.delete_one({"_id": ObjectId(item_id)})
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=404, detail="Item not found")
-        return True
+        with span("db", op="delete_item"):
+            deleted = await store.delete_item(user_id, item_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Item not found")
+    await _bump_version(user_id)
+    if user_id in _cache:
+        _cache[user_id].pop(item_id, None)
+    _notify("remove", {"_id": item_id, "user_id": user_id})
+    return True
 
-async def update_item_worn(item_id: str) -> bool:
+def _apply_worn(user_id: str, item_id: str, worn_at: datetime) -> None:
+    cached = _cache.get(user_id, {}).get(item_id)
+    if cached is not None:
+        cached['last_worn'] = worn_at
+        cached['times_worn'] = cached.get('times_worn', 0) + 1
+    _notify("worn", {"_id": item_id, "user_id": user_id, "last_worn": worn_at})
+
+async def update_item_worn(item_id: str, user_id: Optional[str] = None) -> bool:
+    user_id = _resolve_user(user_id)
+    if not ObjectId.is_valid(item_id):
+        raise HTTPException(status_code=404, detail="Item not found")
+    worn_at = datetime.now()
     try:
-        collection = db.wardrobe
-        result = await collection.update_one(
-            {"_id": ObjectId(item_id)},
-            {
-                "$set": {"last_worn": datetime.now()},
-                "$inc": {"times_worn": 1}
-            }
-        )
-        if result.modified_count == 0:
-            raise HTTPException(status_code=404, detail="Item not found")
-        return True
+        with span("db", op="mark_worn"):
+            modified = await store.mark_worn(user_id, [item_id], worn_at)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if modified == 0:
+        raise HTTPException(status_code=404, detail="Item not found")
+    await _bump_version(user_id)
+    _apply_worn(user_id, item_id, worn_at)
+    return True
+
+async def update_items_worn(item_ids: List[str], user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Mark several items as worn together with a single batched update, and log
+    the combination as one outfit_log entry.
+
+    Returns:
+        Dict[str, Any]: Per-item results: "updated", "missing" and "invalid" id lists.
+    """
+    user_id = _resolve_user(user_id)
+    invalid = [i for i in item_ids if not ObjectId.is_valid(i)]
+    valid = list(dict.fromkeys(i for i in item_ids if ObjectId.is_valid(i)))
+    try:
+        cached = await _fresh_cache(user_id)
+        if cached is not None:
+            existing = [i for i in valid if i in cached]
+        else:
+            with span("db", op="find_items"):
+                found = {item['_id'] for item in await store.find_items(user_id, fields=[], ids=valid)}
+            existing = [i for i in valid if i in found]
+        missing = [i for i in valid if i not in existing]
+
+        if existing:
+            worn_at = datetime.now()
+            with span("db", op="mark_worn"):
+                modified = await store.mark_worn(user_id, existing, worn_at)
+            if modified < len(existing):
+                # Some were deleted since the check above; report only the items the update reached
+                with span("db", op="find_items"):
+                    found = {item['_id'] for item in await store.find_items(user_id, fields=[], ids=existing)}
+                missing += [i for i in existing if i not in found]
+                existing = [i for i in existing if i in found]
+
+        if existing:
+            with span("db", op="log_outfit"):
+                await store.log_outfit(user_id, existing, worn_at)
+            await _bump_version(user_id)
+            for item_id in existing:
+                _apply_worn(user_id, item_id, worn_at)
+
+        return {"updated": existing, "missing": missing, "invalid": invalid}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+async def get_outfit_history(limit: int = 20, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    user_id = _resolve_user(user_id)
+    try:
+        with span("db", op="outfit_history"):
+            return await store.outfit_history(user_id, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+# Precomputed daily plans (outfits and rotation stats), mirrored in the shared
+# state so peak-hour reads skip the store
+DAILY_PREFIX = "daily:"
+# Kept a little over a day; a plan is replaced by the nightly run or goes stale with its date
+DAILY_TTL = float(os.getenv("DAILY_TTL", str(36 * 3600)))
+
+async def list_user_ids() -> List[str]:
+    with span("db", op="user_ids"):
+        return await store.user_ids()
+
+async def get_rotation_stats(stale_days: int, limit: int, user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Recompute wear-rotation stats for a wardrobe (materialized in the
+    wardrobe_daily collection) and return them.
+
+    Args:
+        stale_days (int): Items not worn for this many days (or never) count as stale.
+        limit (int): Items listed per stale/most worn/least worn list.
+        user_id (Optional[str]): Wardrobe owner; defaults to the current user.
+
+    Returns:
+        Dict[str, Any]: Totals and the stale, most_worn and least_worn item lists.
+    """
+    user_id = _resolve_user(user_id)
+    try:
+        with span("db", op="refresh_rotation"):
+            return await store.refresh_rotation(user_id, datetime.now() - timedelta(days=stale_days), limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+async def save_daily_plan(plan: Dict[str, Any], user_id: Optional[str] = None) -> Dict[str, Any]:
+    """Store a plan and return it as stored (JSON-ready: dates as ISO strings)."""
+    user_id = _resolve_user(user_id)
+    plan = jsonable_encoder(plan)
+    with span("db", op="save_daily"):
+        await store.save_daily(user_id, plan)
+    await shared_state.set(DAILY_PREFIX + user_id, plan, ttl=DAILY_TTL)
+    return plan
+
+async def load_daily_plan(user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    user_id = _resolve_user(user_id)
+    plan = await shared_state.get(DAILY_PREFIX + user_id)
+    if plan is None:
+        with span("db", op="load_daily"):
+            plan = await store.load_daily(user_id)
+        if plan is not None:
+            plan = jsonable_encoder(plan)
+            await shared_state.set(DAILY_PREFIX + user_id, plan, ttl=DAILY_TTL)
+    return plan
@@ -0,0 +1,634 @@
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from bson import ObjectId
+
+# "mongo" for MongoDB via Motor, "memory" for the embedded store
+WARDROBE_STORE = os.getenv("WARDROBE_STORE", "mongo")
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+# Connection pool bounds; min connections are opened at startup so the first requests don't pay for them
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+# How long to wait for a reachable server before failing a call (and startup's pre-connect)
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))
+# Owner of items created before wardrobes were partitioned by user
+DEFAULT_USER_ID = os.getenv("DEFAULT_USER_ID", "default")
+MOCK_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "mock_data.json")
+# Seed the store from mock_data.json at startup; on by default for the embedded store
+WARDROBE_SEED = os.getenv("WARDROBE_SEED", "1" if WARDROBE_STORE == "memory" else "0") == "1"
+
+
+class WardrobeStore:
+    """
+    Storage interface behind routes/mongocl.py. Implementations deal only with
+    persistence; validation, caching and change notification stay in mongocl.
+    Items are returned as dicts with a string "_id".
+    """
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def ping(self) -> None:
+        """Round-trip to the backend, so connection setup (DNS, TLS, auth) happens before the first request."""
+        pass
+
+    async def ensure_indexes(self) -> None:
+        pass
+
+    async def find_items(
+        self,
+        user_id: str,
+        filters: Optional[Dict[str, str]] = None,
+        fields: Optional[List[str]] = None,
+        ids: Optional[List[str]] = None,
+        sort: Optional[str] = None,
+        after: Optional[Tuple[Any, str]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        The user's items matching `filters`. With `sort` ("times_worn" or
+        "last_worn", "-" prefixed for descending; None for _id order) they
+        come ordered by sort_key, only those past the keyset `after` and at
+        most `limit` of them. The sort field must be among `fields`, if given.
+        """
+        raise NotImplementedError
+
+    async def insert_item(self, item: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    async def write_items(
+        self,
+        user_id: str,
+        items: List[Dict[str, Any]],
+        defaults: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Write a batch in one unordered round-trip. Items with an item_id are
+        upserted on (owner, item_id), so re-importing the same rows is
+        idempotent; the rest are inserted. `defaults` only apply to new items.
+
+        Returns:
+            Dict[str, Any]: "inserted" and "updated" batch indexes, and "errors" mapping index to message.
+        """
+        raise NotImplementedError
+
+    async def delete_item(self, user_id: str, item_id: str) -> bool:
+        raise NotImplementedError
+
+    async def mark_worn(self, user_id: str, item_ids: List[str], worn_at: datetime) -> int:
+        raise NotImplementedError
+
+    async def log_outfit(self, user_id: str, item_ids: List[str], worn_at: datetime) -> None:
+        raise NotImplementedError
+
+    async def outfit_history(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def get_version(self, user_id: str) -> int:
+        raise NotImplementedError
+
+    async def bump_version(self, user_id: str) -> int:
+        raise NotImplementedError
+
+    async def get_epoch(self) -> str:
+        """
+        Identifies the lifetime of this store's version counters. It changes
+        whenever they may have restarted (a new embedded store, a fresh
+        database), so anything keyed on a version from before never matches.
+        """
+        raise NotImplementedError
+
+    async def user_ids(self) -> List[str]:
+        """Every user that owns at least one item."""
+        raise NotImplementedError
+
+    async def refresh_rotation(self, user_id: str, stale_before: datetime, limit: int) -> Dict[str, Any]:
+        """
+        Recompute a wardrobe's wear-rotation stats into its wardrobe_daily
+        document and return them: item, never-worn and wear totals, plus up
+        to `limit` stale (not worn since `stale_before`), most worn and least
+        worn items.
+        """
+        raise NotImplementedError
+
+    async def save_daily(self, user_id: str, plan: Dict[str, Any]) -> None:
+        """Store a precomputed daily plan next to the rotation stats."""
+        raise NotImplementedError
+
+    async def load_daily(self, user_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+def sort_key(item: Dict[str, Any], field: Optional[str]) -> Tuple[Any, str]:
+    """An item's position in a sorted listing; ties (and no sort field) fall back to _id."""
+    # Never-worn items sort first; last_worn may be a datetime or an ISO date string
+    if field == 'times_worn':
+        value: Any = int(item.get('times_worn') or 0)
+    elif field == 'last_worn':
+        worn = item.get('last_worn')
+        value = worn.isoformat() if isinstance(worn, datetime) else str(worn or "")
+    else:
+        value = 0
+    return (value, item['_id'])
+
+
+def legacy_owner(user_id: str) -> bool:
+    """Items written before wardrobes were partitioned have no user_id and belong to the default user."""
+    return user_id == DEFAULT_USER_ID
+
+
+class MongoStore(WardrobeStore):
+    # Case-insensitive matching, shared by the indexes and the queries that use them
+    COLLATION = {"locale": "en", "strength": 2}
+
+    def __init__(
+        self,
+        uri: str = MONGO_URI,
+        max_pool_size: int = MONGO_MAX_POOL_SIZE,
+        min_pool_size: int = MONGO_MIN_POOL_SIZE,
+        timeout_ms: int = MONGO_TIMEOUT_MS
+    ):
+        self.uri = uri
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.timeout_ms = timeout_ms
+        self.client = None
+        self.db = None
+        self.epoch: Optional[str] = None
+
+    async def connect(self) -> None:
+        if self.client is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            self.client = AsyncIOMotorClient(
+                self.uri,
+                maxPoolSize=self.max_pool_size,
+                minPoolSize=self.min_pool_size,
+                serverSelectionTimeoutMS=self.timeout_ms,
+            )
+            self.db = self.client.wardrobe
+
+    async def ping(self) -> None:
+        await self.connect()
+        await self.client.admin.command("ping")
+
+    async def close(self) -> None:
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    def _user_filter(self, user_id: str) -> Dict[str, Any]:
+        if legacy_owner(user_id):
+            return {"user_id": {"$in": [user_id, None]}}
+        return {"user_id": user_id}
+
+    async def ensure_indexes(self) -> None:
+        await self.connect()
+        collection = self.db.wardrobe
+        # Plain (no collation) index for everything that selects on the owner alone: whole-wardrobe
+        # reads, the rotation aggregation and listing users. Collated indexes only serve collated queries.
+        await collection.create_index([("user_id", 1), ("_id", 1)])
+        # Sorted, keyset-paginated listings walk these instead of sorting in memory
+        await collection.create_index([("user_id", 1), ("times_worn", 1), ("_id", 1)])
+        await collection.create_index([("user_id", 1), ("last_worn", 1), ("_id", 1)])
+        await collection.create_index([("user_id", 1), ("type", 1), ("color", 1)], collation=self.COLLATION)
+        await collection.create_index([("user_id", 1), ("style", 1)], collation=self.COLLATION)
+        await collection.create_index([("user_id", 1), ("fit", 1)], collation=self.COLLATION)
+        await collection.create_index(
+            [("user_id", 1), ("item_id", 1)],
+            unique=True,
+            partialFilterExpression={"item_id": {"$exists": True}}
+        )
+        await self.db.outfit_log.create_index([("user_id", 1), ("worn_at", -1)])
+        await self.db.outfit_log.create_index("item_ids")
+
+    @staticmethod
+    def _after(field: Optional[str], descending: bool, after: Tuple[Any, str]) -> Dict[str, Any]:
+        """Query for the items that sort_key puts past `after`; null (never worn) sorts before any value."""
+        value, item_id = after
+        op = "$lt" if descending else "$gt"
+        if field is None:
+            return {"_id": {op: ObjectId(item_id)}}
+        if field == "last_worn":
+            value = datetime.fromisoformat(value) if value else None
+        tie = {field: value, "_id": {op: ObjectId(item_id)}}
+        if value is None:
+            return tie if descending else {"$or": [{field: {"$ne": None}}, tie]}
+        clauses = [{field: {op: value}}, tie]
+        if descending:
+            clauses.append({field: None})
+        return {"$or": clauses}
+
+    async def find_items(self, user_id, filters=None, fields=None, ids=None, sort=None, after=None, limit=None):
+        await self.connect()
+        query = {**self._user_filter(user_id), **(filters or {})}
+        if ids is not None:
+            query["_id"] = {"$in": [ObjectId(i) for i in ids]}
+        field = sort.lstrip("-") if sort else None
+        descending = bool(sort) and sort.startswith("-")
+        if after is not None:
+            query = {"$and": [query, self._after(field, descending, after)]}
+        projection = ({f: 1 for f in fields} or {"_id": 1}) if fields is not None else None
+        cursor = self.db.wardrobe.find(query, projection)
+        if filters:
+            cursor = cursor.collation(self.COLLATION)
+        if sort is not None or after is not None or limit is not None:
+            direction = -1 if descending else 1
+            cursor = cursor.sort(([(field, direction)] if field else []) + [("_id", direction)])
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        items = await cursor.to_list(length=None)
+        # Convert ObjectId to string for JSON serialization
+        for item in items:
+            item['_id'] = str(item['_id'])
+        return items
+
+    async def insert_item(self, item):
+        await self.connect()
+        result = await self.db.wardrobe.insert_one(item)
+        return str(result.inserted_id)
+
+    async def write_items(self, user_id, items, defaults):
+        from pymongo import InsertOne, UpdateOne
+        from pymongo.errors import BulkWriteError
+        await self.connect()
+        operations = []
+        for item in items:
+            if item.get("item_id"):
+                operations.append(UpdateOne(
+                    {**self._user_filter(user_id), "item_id": item["item_id"]},
+                    {"$set": item, "$setOnInsert": {k: v for k, v in defaults.items() if k not in item}},
+                    upsert=True
+                ))
+            else:
+                operations.append(InsertOne({**defaults, **item}))
+        try:
+            details = (await self.db.wardrobe.bulk_write(operations, ordered=False)).bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+        errors = {error["index"]: error.get("errmsg", "write failed") for error in details.get("writeErrors", [])}
+        upserted = {entry["index"] for entry in details.get("upserted", [])}
+        ok = [i for i in range(len(items)) if i not in errors]
+        return {
+            "inserted": [i for i in ok if not items[i].get("item_id") or i in upserted],
+            "updated": [i for i in ok if items[i].get("item_id") and i not in upserted],
+            "errors": errors,
+        }
+
+    async def delete_item(self, user_id, item_id):
+        await self.connect()
+        result = await self.db.wardrobe.delete_one({"_id": ObjectId(item_id), **self._user_filter(user_id)})
+        return result.deleted_count > 0
+
+    async def mark_worn(self, user_id, item_ids, worn_at):
+        await self.connect()
+        result = await self.db.wardrobe.update_many(
+            {"_id": {"$in": [ObjectId(i) for i in item_ids]}, **self._user_filter(user_id)},
+            {
+                "$set": {"last_worn": worn_at},
+                "$inc": {"times_worn": 1}
+            }
+        )
+        return result.modified_count
+
+    async def log_outfit(self, user_id, item_ids, worn_at):
+        await self.connect()
+        await self.db.outfit_log.insert_one({"user_id": user_id, "item_ids": item_ids, "worn_at": worn_at})
+
+    async def outfit_history(self, user_id, limit):
+        await self.connect()
+        entries = await self.db.outfit_log.find({"user_id": user_id}).sort("worn_at", -1).limit(limit).to_list(length=None)
+        for entry in entries:
+            entry['_id'] = str(entry['_id'])
+        return entries
+
+    async def get_version(self, user_id):
+        await self.connect()
+        doc = await self.db.meta.find_one({"_id": f"wardrobe:{user_id}"})
+        return doc["version"] if doc else 0
+
+    async def bump_version(self, user_id):
+        from pymongo import ReturnDocument
+        await self.connect()
+        doc = await self.db.meta.find_one_and_update(
+            {"_id": f"wardrobe:{user_id}"},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["version"]
+
+    async def get_epoch(self):
+        if self.epoch is None:
+            from pymongo import ReturnDocument
+            await self.connect()
+            # Created with the first counter and kept for as long as the database is
+            doc = await self.db.meta.find_one_and_update(
+                {"_id": "epoch"},
+                {"$setOnInsert": {"value": uuid.uuid4().hex[:12]}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            self.epoch = doc["value"]
+        return self.epoch
+
+    async def user_ids(self):
+        await self.connect()
+        owners = await self.db.wardrobe.distinct("user_id")
+        return list(dict.fromkeys(owner or DEFAULT_USER_ID for owner in owners))
+
+    async def refresh_rotation(self, user_id, stale_before, limit):
+        await self.connect()
+        entry = {
+            "_id": {"$toString": "$_id"},
+            "item_name": 1, "type": 1, "color": 1, "times_worn": 1,
+            "last_worn": "$worn_at",
+        }
+        pipeline = [
+            {"$match": self._user_filter(user_id)},
+            # last_worn is a date for items worn through the API and an ISO string for imported ones
+            {"$addFields": {
+                "worn_at": {"$convert": {"input": "$last_worn", "to": "date", "onError": None, "onNull": None}},
+                "times_worn": {"$ifNull": ["$times_worn", 0]},
+            }},
+            {"$facet": {
+                "totals": [{"$group": {
+                    "_id": None,
+                    "items": {"$sum": 1},
+                    "total_wears": {"$sum": "$times_worn"},
+                    "never_worn": {"$sum": {"$cond": [{"$eq": ["$worn_at", None]}, 1, 0]}},
+                }}],
+                "stale": [
+                    {"$match": {"$or": [{"worn_at": None}, {"worn_at": {"$lt": stale_before}}]}},
+                    {"$sort": {"worn_at": 1, "_id": 1}},
+                    {"$limit": limit},
+                    {"$project": entry},
+                ],
+                "most_worn": [
+                    {"$match": {"times_worn": {"$gt": 0}}},
+                    {"$sort": {"times_worn": -1, "worn_at": -1, "_id": 1}},
+                    {"$limit": limit},
+                    {"$project": entry},
+                ],
+                "least_worn": [
+                    {"$sort": {"times_worn": 1, "worn_at": 1, "_id": 1}},
+                    {"$limit": limit},
+                    {"$project": entry},
+                ],
+            }},
+            {"$project": {
+                "_id": {"$literal": user_id},
+                "rotation": {
+                    "items": {"$ifNull": [{"$arrayElemAt": ["$totals.items", 0]}, 0]},
+                    "never_worn": {"$ifNull": [{"$arrayElemAt": ["$totals.never_worn", 0]}, 0]},
+                    "total_wears": {"$ifNull": [{"$arrayElemAt": ["$totals.total_wears", 0]}, 0]},
+                    "stale_before": {"$literal": stale_before},
+                    "stale": "$stale",
+                    "most_worn": "$most_worn",
+                    "least_worn": "$least_worn",
+                },
+                "rotation_at": "$$NOW",
+            }},
+            {"$merge": {"into": "wardrobe_daily", "on": "_id", "whenMatched": "merge", "whenNotMatched": "insert"}},
+        ]
+        await self.db.wardrobe.aggregate(pipeline).to_list(length=None)
+        doc = await self.db.wardrobe_daily.find_one({"_id": user_id}, {"rotation": 1})
+        return doc["rotation"]
+
+    async def save_daily(self, user_id, plan):
+        await self.connect()
+        plan = {k: v for k, v in plan.items() if k != "rotation"}
+        await self.db.wardrobe_daily.update_one({"_id": user_id}, {"$set": plan}, upsert=True)
+
+    async def load_daily(self, user_id):
+        await self.connect()
+        doc = await self.db.wardrobe_daily.find_one({"_id": user_id}, {"_id": 0, "rotation_at": 0})
+        return doc if doc and "outfits" in doc else None
+
+
+class MemoryStore(WardrobeStore):
+    """
+    Embedded in-process store for tests, benchmarks and small installs. Items
+    are indexed by owner and by (owner, type, color) so filtered reads do not
+    scan other users' clothes.
+    """
+
+    def __init__(self):
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.by_user: Dict[Optional[str], Set[str]] = {}
+        self.by_type_color: Dict[Tuple[Optional[str], str, str], Set[str]] = {}
+        # (owner, item_id) -> _id, the key imports upsert on
+        self.by_item_id: Dict[Tuple[Optional[str], str], str] = {}
+        self.outfit_log: List[Dict[str, Any]] = []
+        self.versions: Dict[str, int] = {}
+        # Versions restart with the process, so each instance is a new epoch
+        self.epoch = uuid.uuid4().hex[:12]
+        self.daily: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _key(item: Dict[str, Any]) -> Tuple[Optional[str], str, str]:
+        return item.get("user_id"), str(item.get("type", "")).lower(), str(item.get("color", "")).lower()
+
+    def _owners(self, user_id: str) -> List[Optional[str]]:
+        return [user_id, None] if legacy_owner(user_id) else [user_id]
+
+    def _candidate_ids(self, user_id: str, filters: Dict[str, str]) -> Iterable[str]:
+        if "type" in filters and "color" in filters:
+            ids: Set[str] = set()
+            for owner in self._owners(user_id):
+                ids |= self.by_type_color.get((owner, filters["type"].lower(), filters["color"].lower()), set())
+            return ids
+        ids = set()
+        for owner in self._owners(user_id):
+            ids |= self.by_user.get(owner, set())
+        return ids
+
+    async def find_items(self, user_id, filters=None, fields=None, ids=None, sort=None, after=None, limit=None):
+        filters = filters or {}
+        candidates = self._candidate_ids(user_id, filters)
+        if ids is not None:
+            candidates = set(ids) & set(candidates)
+        field = sort.lstrip("-") if sort else None
+        descending = bool(sort) and sort.startswith("-")
+        matched = [
+            self.items[item_id] for item_id in candidates
+            if all(str(self.items[item_id].get(k, "")).lower() == str(v).lower() for k, v in filters.items())
+        ]
+        # ObjectId hex sorts by creation time, matching MongoDB's natural order closely enough
+        matched.sort(key=lambda item: sort_key(item, field), reverse=descending)
+        if after is not None:
+            after = tuple(after)
+            keys = {item['_id']: sort_key(item, field) for item in matched}
+            matched = [item for item in matched if (keys[item['_id']] < after if descending else keys[item['_id']] > after)]
+        items = []
+        for item in matched[:limit]:
+            if fields is None:
+                items.append(dict(item))
+            else:
+                items.append({'_id': item['_id'], **{f: item[f] for f in fields if f in item}})
+        return items
+
+    async def insert_item(self, item):
+        item_id = str(ObjectId())
+        item['_id'] = item_id
+        self.items[item_id] = dict(item)
+        self.by_user.setdefault(item.get("user_id"), set()).add(item_id)
+        self.by_type_color.setdefault(self._key(item), set()).add(item_id)
+        if item.get("item_id"):
+            self.by_item_id[(item.get("user_id"), item["item_id"])] = item_id
+        return item_id
+
+    async def write_items(self, user_id, items, defaults):
+        result: Dict[str, Any] = {"inserted": [], "updated": [], "errors": {}}
+        for index, item in enumerate(items):
+            existing = None
+            if item.get("item_id"):
+                existing = next(
+                    (self.by_item_id[(owner, item["item_id"])] for owner in self._owners(user_id)
+                     if (owner, item["item_id"]) in self.by_item_id),
+                    None
+                )
+            if existing is None:
+                await self.insert_item({**defaults, **item})
+                result["inserted"].append(index)
+                continue
+            stored = self.items[existing]
+            self.by_type_color[self._key(stored)].discard(existing)
+            self.by_user[stored.get("user_id")].discard(existing)
+            self.by_item_id.pop((stored.get("user_id"), stored["item_id"]), None)
+            stored.update(item)
+            self.by_user.setdefault(stored.get("user_id"), set()).add(existing)
+            self.by_type_color.setdefault(self._key(stored), set()).add(existing)
+            self.by_item_id[(stored.get("user_id"), stored["item_id"])] = existing
+            result["updated"].append(index)
+        return result
+
+    async def delete_item(self, user_id, item_id):
+        item = self.items.get(item_id)
+        if item is None or item.get("user_id") not in self._owners(user_id):
+            return False
+        del self.items[item_id]
+        self.by_user[item.get("user_id")].discard(item_id)
+        self.by_type_color[self._key(item)].discard(item_id)
+        if item.get("item_id"):
+            self.by_item_id.pop((item.get("user_id"), item["item_id"]), None)
+        return True
+
+    async def mark_worn(self, user_id, item_ids, worn_at):
+        modified = 0
+        for item_id in item_ids:
+            item = self.items.get(item_id)
+            if item is not None and item.get("user_id") in self._owners(user_id):
+                item["last_worn"] = worn_at
+                item["times_worn"] = item.get("times_worn", 0) + 1
+                modified += 1
+        return modified
+
+    async def log_outfit(self, user_id, item_ids, worn_at):
+        self.outfit_log.append({"_id": str(ObjectId()), "user_id": user_id, "item_ids": item_ids, "worn_at": worn_at})
+
+    async def outfit_history(self, user_id, limit):
+        entries = [dict(e) for e in self.outfit_log if e["user_id"] == user_id]
+        return sorted(entries, key=lambda e: e["worn_at"], reverse=True)[:limit]
+
+    async def get_version(self, user_id):
+        return self.versions.get(user_id, 0)
+
+    async def bump_version(self, user_id):
+        self.versions[user_id] = self.versions.get(user_id, 0) + 1
+        return self.versions[user_id]
+
+    async def get_epoch(self):
+        return self.epoch
+
+    async def user_ids(self):
+        return list(dict.fromkeys(owner or DEFAULT_USER_ID for owner, ids in self.by_user.items() if ids))
+
+    @staticmethod
+    def _worn_at(item: Dict[str, Any]) -> Optional[datetime]:
+        last_worn = item.get("last_worn")
+        if isinstance(last_worn, str):
+            try:
+                return datetime.fromisoformat(last_worn)
+            except ValueError:
+                return None
+        return last_worn
+
+    async def refresh_rotation(self, user_id, stale_before, limit):
+        items = [self.items[i] for owner in self._owners(user_id) for i in self.by_user.get(owner, ())]
+        worn = {item["_id"]: self._worn_at(item) for item in items}
+
+        def entry(item):
+            return {
+                "_id": item["_id"],
+                **{f: item[f] for f in ("item_name", "type", "color") if f in item},
+                "times_worn": item.get("times_worn", 0),
+                "last_worn": worn[item["_id"]],
+            }
+
+        def by_worn(item):
+            # Never-worn first, like null dates in a Mongo ascending sort
+            return (worn[item["_id"]] is not None, worn[item["_id"]] or datetime.min)
+
+        stale = [item for item in items if worn[item["_id"]] is None or worn[item["_id"]] < stale_before]
+        # Stable sorts, least significant key first
+        most_worn = sorted((item for item in items if item.get("times_worn", 0) > 0), key=lambda i: i["_id"])
+        most_worn.sort(key=by_worn, reverse=True)
+        most_worn.sort(key=lambda i: i.get("times_worn", 0), reverse=True)
+        rotation = {
+            "items": len(items),
+            "never_worn": sum(1 for item in items if worn[item["_id"]] is None),
+            "total_wears": sum(item.get("times_worn", 0) for item in items),
+            "stale_before": stale_before,
+            "stale": [entry(i) for i in sorted(stale, key=lambda i: (by_worn(i), i["_id"]))[:limit]],
+            "most_worn": [entry(i) for i in most_worn[:limit]],
+            "least_worn": [entry(i) for i in sorted(items, key=lambda i: (i.get("times_worn", 0), by_worn(i), i["_id"]))[:limit]],
+        }
+        self.daily.setdefault(user_id, {})["rotation"] = rotation
+        return rotation
+
+    async def save_daily(self, user_id, plan):
+        self.daily.setdefault(user_id, {}).update({k: v for k, v in plan.items() if k != "rotation"})
+
+    async def load_daily(self, user_id):
+        doc = self.daily.get(user_id)
+        return dict(doc) if doc and "outfits" in doc else None
+
+
+def create_store(kind: str = WARDROBE_STORE) -> WardrobeStore:
+    if kind == "memory":
+        return MemoryStore()
+    if kind == "mongo":
+        return MongoStore()
+    raise ValueError(f"Unknown WARDROBE_STORE: {kind}")
+
+
+async def seed_from_mock_data(store: WardrobeStore, path: str = MOCK_DATA_PATH) -> int:
+    """
+    Load a {"user": ..., "wardrobe": [...]} file into a store in one batch.
+    The items go to DEFAULT_USER_ID, whatever owner the file names, since
+    that is whose wardrobe a client without a user id sees. Items are
+    upserted on item_id, so seeding an existing store again does not
+    duplicate them. The user's wardrobe version is bumped when anything was
+    written. Returns the number of items inserted.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    user_id = DEFAULT_USER_ID
+    items = []
+    for raw in data.get("wardrobe", []):
+        item = dict(raw)
+        item.setdefault("item_name", f"{item.get('color', '')} {item.get('type', '')}".strip())
+        item["user_id"] = user_id
+        items.append(item)
+    if not items:
+        return 0
+    defaults = {"times_worn": 0, "last_worn": None, "created_at": datetime.now()}
+    result = await store.write_items(user_id, items, defaults)
+    if result["inserted"] or result["updated"]:
+        await store.bump_version(user_id)
+    return len(result["inserted"])
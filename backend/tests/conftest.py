@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+# Hermetic defaults; set before the app modules read their config
+os.environ.setdefault("WARDROBE_STORE", "memory")
+os.environ.setdefault("RESPONSE_CACHE", "memory")
+os.environ.setdefault("PRECOMPUTE", "0")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from routes import mongocl
+from routes.store import MemoryStore
+
+
+@pytest.fixture
+def store() -> MemoryStore:
+    """A fresh embedded store behind routes/mongocl.py, with its caches dropped."""
+    memory_store = MemoryStore()
+    mongocl.use_store(memory_store)
+    return memory_store
@@ -0,0 +1,97 @@
+import asyncio
+
+from routes import mongocl
+from utils.cache import DiskBackend, MemoryBackend, ResponseCache
+from utils.shared import LocalState
+
+USER = "cache"
+
+
+def shirt(name: str) -> dict:
+    return {"item_name": name, "type": "shirt", "color": "white", "style": "casual", "fit": "regular"}
+
+
+class WorkerState(LocalState):
+    """In-process state that behaves as if shared with other workers, so versions are re-checked."""
+
+    local = False
+
+
+def test_wardrobe_write_makes_cached_answers_unreachable(store):
+    async def scenario():
+        cache = ResponseCache(MemoryBackend())
+        before = await mongocl.get_wardrobe_version(USER)
+        await cache.set("what goes with my shirts?", before, "The white one.", USER)
+        hit = await cache.get("What goes with my shirts", before, USER)
+        await mongocl.add_to_wardrobe(shirt("blue shirt"), user_id=USER)
+        after = await mongocl.get_wardrobe_version(USER)
+        return hit, before, after, await cache.get("what goes with my shirts?", after, USER)
+
+    hit, before, after, miss = asyncio.run(scenario())
+    assert hit == "The white one."
+    assert after == before + 1
+    assert miss is None
+
+
+def test_disk_backend_round_trip(tmp_path):
+    async def scenario():
+        cache = ResponseCache(DiskBackend(str(tmp_path / "cache.sqlite3"), max_entries=2))
+        for number in range(3):
+            await cache.set(f"question {number}", 1, f"answer {number}")
+        return [await cache.get(f"question {number}", 1) for number in range(3)], await cache.backend.size()
+
+    answers, size = asyncio.run(scenario())
+    assert answers == [None, "answer 1", "answer 2"]
+    assert size == 2
+
+
+def test_version_bump_from_another_worker_drops_the_cached_wardrobe(store, monkeypatch):
+    monkeypatch.setattr(mongocl, "shared_state", WorkerState())
+    resets = []
+
+    def listener(event, item):
+        if event == "reset":
+            resets.append(item["user_id"])
+
+    mongocl.on_wardrobe_change(listener)
+
+    async def scenario():
+        await mongocl.add_to_wardrobe(shirt("white shirt"), user_id=USER)
+        cached = await mongocl.get_wardrobe(user_id=USER)
+        # Another worker writes straight to the store and publishes the new version
+        await store.insert_item({**shirt("black shirt"), "user_id": USER})
+        version = await store.bump_version(USER)
+        await mongocl.shared_state.set(mongocl.VERSION_PREFIX + USER, version)
+        return cached, await mongocl.get_wardrobe(user_id=USER)
+
+    try:
+        cached, fresh = asyncio.run(scenario())
+    finally:
+        mongocl._listeners.remove(listener)
+    assert len(cached) == 1
+    assert sorted(item["item_name"] for item in fresh) == ["black shirt", "white shirt"]
+    assert resets == [USER]
+
+
+def test_write_during_a_cold_read_is_not_lost(store):
+    async def scenario():
+        await mongocl.add_to_wardrobe(shirt("white shirt"), user_id=USER)
+        mongocl._drop_cache(USER)
+        find_items = store.find_items
+
+        async def slow_find_items(*args, **kwargs):
+            items = await find_items(*args, **kwargs)
+            await asyncio.sleep(0.05)
+            return items
+
+        store.find_items = slow_find_items
+
+        async def write() -> None:
+            await asyncio.sleep(0.01)
+            await mongocl.add_to_wardrobe(shirt("black shirt"), user_id=USER)
+
+        await asyncio.gather(mongocl.get_wardrobe(user_id=USER), write())
+        store.find_items = find_items
+        return await mongocl.get_wardrobe(user_id=USER)
+
+    assert len(asyncio.run(scenario())) == 2
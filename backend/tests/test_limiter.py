@@ -0,0 +1,77 @@
+import asyncio
+from typing import Dict, List
+
+from utils.agents import ConversationLimiter
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_queue_positions_and_counts():
+    async def scenario():
+        limiter = ConversationLimiter(max_concurrent=1)
+        reports: Dict[str, List[int]] = {}
+        release = {name: asyncio.Event() for name in "abcd"}
+
+        async def conversation(name: str) -> None:
+            async def on_queued(position: int) -> None:
+                reports.setdefault(name, []).append(position)
+            async with limiter.slot(on_queued):
+                await release[name].wait()
+
+        tasks = {}
+        for name in "abcd":
+            tasks[name] = asyncio.create_task(conversation(name))
+            await settle()
+        assert (limiter.active, limiter.waiting) == (1, 3)
+        assert reports == {"b": [1], "c": [2], "d": [3]}
+
+        # A client leaving the queue moves everyone behind it up
+        tasks["c"].cancel()
+        await settle()
+        assert limiter.waiting == 2
+        assert reports["d"] == [3, 2]
+
+        release["a"].set()
+        await settle()
+        assert (limiter.active, limiter.waiting) == (1, 1)
+        assert reports["d"] == [3, 2, 1]
+
+        release["b"].set()
+        release["d"].set()
+        await asyncio.gather(tasks["a"], tasks["b"], tasks["d"])
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert (limiter.active, limiter.waiting) == (0, 0)
+
+
+def test_failing_callback_does_not_leak_a_queue_entry():
+    async def scenario():
+        limiter = ConversationLimiter(max_concurrent=1)
+        release = asyncio.Event()
+
+        async def holder() -> None:
+            async with limiter.slot():
+                await release.wait()
+
+        async def gone(position: int) -> None:
+            raise ConnectionError("client disconnected")
+
+        async def queued() -> None:
+            async with limiter.slot(gone):
+                pass
+
+        first = asyncio.create_task(holder())
+        await settle()
+        second = asyncio.create_task(queued())
+        await settle()
+        assert limiter.waiting == 1
+        release.set()
+        await asyncio.gather(first, second)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert (limiter.active, limiter.waiting) == (0, 0)
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from routes import mongocl
+from utils.router import classify, route
+
+WHITE_SHIRT = {"item_name": "white shirt", "type": "shirt", "color": "white", "style": "formal", "fit": "regular"}
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("hi", "greeting"),
+    ("thanks so much!", "greeting"),
+    ("show my wardrobe", "list"),
+    ("what is in my closet", "list"),
+    ("do I have any blue shirts", "list"),
+    ("I wore my black shirt today", "mark_worn"),
+    ("mark w3 and w5 as worn", "mark_worn"),
+    ("what should I wear today?", "today"),
+    ("suggest an outfit for a wedding", None),
+])
+def test_classify(text, intent):
+    assert classify(text) == intent
+
+
+@pytest.mark.parametrize("text", [
+    "what is navy?",
+    "what goes with my black shirt",
+    "what are my options for a wedding?",
+    "do I have anything for a wedding?",
+    "hey tara, can you help me pick shoes?",
+    "I wore my blue shirt, what goes with it?",
+    "I wore my navy blazer to the interview, was that too formal?",
+    "I wore jeans, should I wash them?",
+    "mark my shirt as worn and suggest pants",
+])
+def test_questions_go_to_the_stylist(text):
+    assert classify(text) is None
+
+
+def test_mark_worn_updates_the_wardrobe(store):
+    async def scenario():
+        item_id = await mongocl.add_to_wardrobe(dict(WHITE_SHIRT), user_id="router")
+        routed = await route("I wore my white shirt today", "router")
+        items = await mongocl.get_wardrobe(user_id="router")
+        history = await mongocl.get_outfit_history(user_id="router")
+        return item_id, routed, items, history
+
+    item_id, routed, items, history = asyncio.run(scenario())
+    assert routed[0] == "mark_worn"
+    assert items[0]["_id"] == item_id and items[0]["times_worn"] == 1
+    assert len(history) == 1
+
+
+def test_mark_worn_falls_through_for_unknown_items(store):
+    assert asyncio.run(route("I wore my purple cape", "router")) is None
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from routes import mongocl
+
+import main
+
+USER = {"x-user-id": "api"}
+
+
+def shirt(number: int, **extra) -> dict:
+    return {"item_name": f"shirt {number}", "type": "shirt", "color": "white", "style": "casual", "fit": "regular", **extra}
+
+
+@pytest.fixture
+def client(store):
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def add_shirts(client: TestClient, count: int) -> None:
+    for number in range(count):
+        assert client.post("/wardrobe/add", json=shirt(number), headers=USER).status_code == 200
+
+
+def test_unchanged_wardrobe_revalidates_with_304(client):
+    add_shirts(client, 2)
+    first = client.get("/wardrobe", headers=USER)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get("/wardrobe", headers={**USER, "If-None-Match": etag})
+    assert again.status_code == 304
+
+    # A different query over the same version gets its own tag
+    assert client.get("/wardrobe?type=shirt", headers={**USER, "If-None-Match": etag}).status_code == 200
+
+
+def test_write_changes_the_etag(client):
+    add_shirts(client, 1)
+    etag = client.get("/wardrobe", headers=USER).headers["etag"]
+    add_shirts(client, 1)
+    changed = client.get("/wardrobe", headers={**USER, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()["data"]) == 2
+
+
+@pytest.mark.parametrize("query", ["sort=bogus", "cursor=not-a-cursor"])
+def test_bad_query_is_400_even_when_the_tag_matches(client, query):
+    assert client.get(f"/wardrobe?limit=2&{query}", headers={**USER, "If-None-Match": "*"}).status_code == 400
+
+
+@pytest.mark.parametrize("sort", [None, "times_worn", "-times_worn", "last_worn", "-last_worn"])
+@pytest.mark.parametrize("warm", [True, False])
+def test_cursor_pages_cover_the_wardrobe_once(client, store, sort, warm):
+    add_shirts(client, 7)
+    for number, item in enumerate(store.items.values()):
+        item["times_worn"] = number % 3
+    # The store was edited behind mongocl's back, so drop its cached copy
+    mongocl._drop_cache("api")
+    query = f"&sort={sort}" if sort else ""
+    everything = client.get(f"/wardrobe?{query}", headers=USER).json()["data"]
+    if not warm:
+        mongocl._drop_cache("api")
+
+    seen, cursor = [], None
+    while True:
+        url = f"/wardrobe?limit=3{query}" + (f"&cursor={cursor}" if cursor else "")
+        body = client.get(url, headers=USER).json()
+        seen += [item["_id"] for item in body["data"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+        if not warm:
+            mongocl._drop_cache("api")
+    assert seen == [item["_id"] for item in everything]
+    assert len(set(seen)) == 7
+
+
+def test_cursor_for_another_sort_is_rejected(client):
+    add_shirts(client, 3)
+    cursor = client.get("/wardrobe?limit=1&sort=times_worn", headers=USER).json()["next_cursor"]
+    assert client.get(f"/wardrobe?limit=1&sort=last_worn&cursor={cursor}", headers=USER).status_code == 400
+
+
+def ndjson(rows) -> str:
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def test_import_is_idempotent(client):
+    body = ndjson(shirt(number, item_id=f"sku-{number}") for number in range(5))
+    first = client.post("/wardrobe/import", content=body, headers=USER).json()
+    assert (first["status"], first["inserted"], first["updated"]) == ("success", 5, 0)
+
+    again = client.post("/wardrobe/import", content=body, headers=USER).json()
+    assert (again["inserted"], again["updated"]) == (0, 5)
+    assert len(client.get("/wardrobe", headers=USER).json()["data"]) == 5
+
+
+def test_import_reports_bad_rows_and_keeps_going(client):
+    rows = [
+        json.dumps(shirt(1)),
+        "{not json",
+        json.dumps({"item_name": "no type"}),
+        json.dumps(shirt(2, notes="x" * 70000)),
+        json.dumps(shirt(3)),
+    ]
+    result = client.post("/wardrobe/import", content="\n".join(rows), headers=USER).json()
+    assert result["status"] == "partial"
+    assert result["inserted"] == 2
+    assert [error["row"] for error in result["errors"]] == [2, 3, 4]
+    assert "longer than" in result["errors"][2]["error"]
+
+
+def test_import_past_the_row_cap_is_truncated(client, monkeypatch):
+    monkeypatch.setattr(main, "IMPORT_MAX_ROWS", 3)
+    result = client.post("/wardrobe/import", content=ndjson(shirt(n) for n in range(5)), headers=USER).json()
+    assert result["truncated"] is True
+    assert result["status"] == "partial"
+    assert result["inserted"] == 3
@@ -0,0 +1,389 @@
+import asyncio
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.messages import TextMessage
+from autogen_core import CancellationToken
+from autogen_core.models import AssistantMessage, SystemMessage, UserMessage
+from utils.tools import WardrobeLook, MarkAsWornTool, suggest_outfits
+from routes.mongocl import current_user_id, get_wardrobe_version
+from utils.colors import answer_color_query
+from utils.instrumented_client import InstrumentedChatCompletionClient
+from utils.singleflight import SingleFlight, normalize_request
+from utils.memory import MEMORY_EXPERT_WINDOW_TURNS, MEMORY_SUMMARIZER, create_memory
+from utils.telemetry import get_logger, metrics, span
+from prompts_lib.prompts import color_expert_prompt, wardrobe_expert_prompt, coordinator_prompt_enhanced, synthesis_prompt, memory_summary_prompt
+
+load_dotenv()
+
+log = get_logger("agents")
+
+MAX_CONCURRENT_CONVERSATIONS = int(os.getenv("MAX_CONCURRENT_CONVERSATIONS", "8"))
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "16"))
+# Stream the coordinator's tokens to the client as partial_response frames
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1") == "1"
+# "team" lets the coordinator call experts one by one; "parallel" fans outfit requests out concurrently
+ORCHESTRATION_MODE = os.getenv("ORCHESTRATION_MODE", "team")
+# Agent sets built at startup, so the first sessions don't pay for constructing them
+AGENT_POOL_PREWARM = int(os.getenv("AGENT_POOL_PREWARM", "2"))
+# Send one tiny completion at startup to open the connection (DNS, TLS) to the model endpoint
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "0") == "1"
+
+# The model client is stateless, so one instance is shared by every agent set
+model_client = InstrumentedChatCompletionClient(OpenAIChatCompletionClient(model="gemini-2.5-flash"), name="gemini-2.5-flash")
+
+
+async def _ask(agent: AssistantAgent, content: str, cancellation_token: Optional[CancellationToken] = None) -> str:
+    result = await agent.on_messages(
+        [TextMessage(content=content, source="coordinator")],
+        cancellation_token=cancellation_token or CancellationToken()
+    )
+    if isinstance(result, list):
+        for msg in reversed(result):
+            if hasattr(msg, 'content') and msg.content:
+                return str(msg.content)
+    elif hasattr(result, 'chat_message') and result.chat_message.content:
+        return str(result.chat_message.content)
+    elif hasattr(result, 'content'):
+        return str(result.content)
+    elif hasattr(result, 'result'):
+        return str(result.result)
+    return str(result)
+
+
+async def summarize_with_model(summary: str, evicted: str) -> str:
+    """Rolling summary via the LLM, used for the coordinator when MEMORY_SUMMARIZER=model."""
+    prompt = f"Current summary:\n{summary or '(empty)'}\n\nOlder turns to fold in:\n{evicted}"
+    result = await model_client.create([SystemMessage(content=memory_summary_prompt), UserMessage(content=prompt, source="memory")])
+    return str(result.content)
+
+
+# Shared by every agent set so identical consultations from different sessions coalesce
+color_flight = SingleFlight("color_expert")
+wardrobe_flight = SingleFlight("wardrobe_expert")
+
+
+class AgentSet:
+    """The color expert, wardrobe expert and coordinator owned by a single session."""
+
+    def __init__(
+        self,
+        color_agent: AssistantAgent,
+        wardrobe_agent: AssistantAgent,
+        coordinator_agent: AssistantAgent,
+        consult_color_expert: Callable[..., Awaitable[str]],
+        consult_wardrobe_expert: Callable[..., Awaitable[str]],
+        running: Optional[Dict[str, int]] = None,
+    ):
+        self.color_agent = color_agent
+        self.wardrobe_agent = wardrobe_agent
+        self.coordinator_agent = coordinator_agent
+        self.consult_color_expert = consult_color_expert
+        self.consult_wardrobe_expert = consult_wardrobe_expert
+        self._running = running if running is not None else {"calls": 0}
+
+    @property
+    def busy(self) -> bool:
+        """True while an expert call runs on these agents, possibly on behalf of another session."""
+        return self._running["calls"] > 0
+
+    @property
+    def agents(self) -> List[AssistantAgent]:
+        return [self.color_agent, self.wardrobe_agent, self.coordinator_agent]
+
+    async def has_history(self) -> bool:
+        """True once the coordinator holds earlier turns, which may shape the answer to the next one."""
+        return bool(await self.coordinator_agent.model_context.get_messages())
+
+    async def remember(self, request: str, answer: str) -> None:
+        """Keep an exchange answered outside the team in the coordinator's history, so follow-up turns have context."""
+        context = self.coordinator_agent.model_context
+        await context.add_message(UserMessage(content=request, source="user"))
+        await context.add_message(AssistantMessage(content=answer, source=self.coordinator_agent.name))
+
+    async def reset(self) -> None:
+        for agent in self.agents:
+            await agent.on_reset(CancellationToken())
+
+
+def create_agent_set() -> AgentSet:
+    color_agent = AssistantAgent(
+        name="color_expert",
+        model_client=model_client,
+        system_message=color_expert_prompt,
+        model_context=create_memory(MEMORY_EXPERT_WINDOW_TURNS)
+    )
+
+    wardrobe_agent = AssistantAgent(
+        name="wardrobe_expert",
+        model_client=model_client,
+        system_message=wardrobe_expert_prompt,
+        tools=[WardrobeLook],
+        model_context=create_memory(MEMORY_EXPERT_WINDOW_TURNS)
+    )
+
+    # Coalesced expert calls can outlive the session that started them
+    running = {"calls": 0}
+
+    async def run_on(agent: AssistantAgent, content: str, cancellation_token: Optional[CancellationToken]) -> str:
+        running["calls"] += 1
+        try:
+            return await _ask(agent, content, cancellation_token)
+        finally:
+            running["calls"] -= 1
+
+    async def consult_color_expert(
+        color_query: Annotated[str, "The color question or combination to analyze (e.g., 'does blue match brown?')"],
+        cancellation_token: Optional[CancellationToken] = None
+    ) -> str:
+        """Answer color questions from the local harmony engine, falling back to the color expert agent."""
+        with span("tool", tool="consult_color_expert") as fields:
+            local_answer = answer_color_query(color_query)
+            fields["local"] = bool(local_answer)
+            if local_answer:
+                log.info("color_expert.local", query=color_query)
+                return local_answer
+
+            log.info("color_expert.call", query=color_query)
+            try:
+                return await color_flight.do(
+                    normalize_request(color_query),
+                    lambda token: run_on(color_agent, color_query, token),
+                    cancellation_token
+                )
+            except Exception as e:
+                log.error("color_expert.error", error=str(e))
+                return f"I apologize, but I'm having trouble analyzing the colors right now. {str(e)}"
+
+    async def consult_wardrobe_expert(
+        request: Annotated[str, "The wardrobe request (e.g., 'suggest outfit for wedding', 'check wardrobe items')"],
+        cancellation_token: Optional[CancellationToken] = None
+    ) -> str:
+        """Consult the wardrobe expert to check wardrobe items and get outfit suggestions."""
+        with span("tool", tool="consult_wardrobe_expert"):
+            log.info("wardrobe_expert.call", request=request)
+            try:
+                # The answer depends on the wardrobe, so only the same user at the same version can share it
+                user_id = current_user_id.get()
+                key = (user_id, await get_wardrobe_version(user_id), normalize_request(request))
+                return await wardrobe_flight.do(
+                    key,
+                    lambda token: run_on(wardrobe_agent, request, token),
+                    cancellation_token
+                )
+            except Exception as e:
+                log.error("wardrobe_expert.error", error=str(e))
+                return f"I apologize, but I'm having trouble accessing the wardrobe information right now. {str(e)}"
+
+    coordinator_agent = AssistantAgent(
+        name="CoordinatorAgent",
+        model_client=model_client,
+        system_message=coordinator_prompt_enhanced,
+        tools=[consult_color_expert, consult_wardrobe_expert, MarkAsWornTool],
+        model_client_stream=STREAM_RESPONSES,
+        model_context=create_memory(summarizer=summarize_with_model if MEMORY_SUMMARIZER == "model" else None)
+    )
+
+    return AgentSet(color_agent, wardrobe_agent, coordinator_agent, consult_color_expert, consult_wardrobe_expert, running)
+
+
+_OUTFIT_REQUEST = re.compile(r"\b(outfit|wear|dress(?: up)?|look|suggest|style me|put together)\b", re.IGNORECASE)
+
+
+# "I'll wear this" confirms a look and must reach the coordinator's MarkAsWorn tool
+_WEAR_CONFIRMATION = re.compile(r"\b(i'?ll|i will|i'?m going to) (wear|go with|choose|take)\b|\b(wore|worn)\b", re.IGNORECASE)
+
+
+def is_outfit_request(text: str) -> bool:
+    return bool(_OUTFIT_REQUEST.search(text)) and not _WEAR_CONFIRMATION.search(text)
+
+
+async def _palette_query(request: str) -> str:
+    """Build a color question from the top pre-ranked outfit, straight from wardrobe data."""
+    ranked = await suggest_outfits(request)
+    if not ranked["outfits"]:
+        return request
+    colors = [item["color"] for item in ranked["outfits"][0]["items"] if item.get("color")]
+    return f"{', '.join(colors)} for a {ranked['occasion']} occasion"
+
+
+async def consult_in_parallel(
+    agent_set: AgentSet,
+    request: str,
+    on_token: Optional[Callable[[str], Awaitable[None]]] = None,
+    cancellation_token: Optional[CancellationToken] = None
+) -> Tuple[str, Dict[str, float]]:
+    """
+    Run the wardrobe and color consultations concurrently, then make a single
+    synthesis call. The color expert validates the palette of the top ranked
+    outfit, so it does not need to wait for the wardrobe expert's answer.
+
+    Returns:
+        Tuple[str, Dict[str, float]]: The final answer and per-stage timings in seconds.
+    """
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+
+    async def timed(name: str, call: Awaitable[str]) -> str:
+        stage_start = time.perf_counter()
+        try:
+            return await call
+        finally:
+            timings[name] = round(time.perf_counter() - stage_start, 3)
+
+    async def color_stage() -> str:
+        return await agent_set.consult_color_expert(await _palette_query(request), cancellation_token)
+
+    wardrobe_notes, color_notes = await asyncio.gather(
+        timed("wardrobe_expert", agent_set.consult_wardrobe_expert(request, cancellation_token)),
+        timed("color_expert", color_stage()),
+    )
+    timings["fan_out"] = round(time.perf_counter() - started, 3)
+
+    synthesis_start = time.perf_counter()
+    prompt = f"User request: {request}\n\nWardrobe expert: {wardrobe_notes}\n\nColor expert: {color_notes}"
+    messages = [SystemMessage(content=synthesis_prompt), UserMessage(content=prompt, source="coordinator")]
+    answer: Any = ""
+    if on_token and STREAM_RESPONSES:
+        async for chunk in model_client.create_stream(messages, cancellation_token=cancellation_token):
+            if isinstance(chunk, str):
+                await on_token(chunk)
+            else:
+                answer = chunk.content
+    else:
+        answer = (await model_client.create(messages, cancellation_token=cancellation_token)).content
+    answer = str(answer)
+    timings["synthesis"] = round(time.perf_counter() - synthesis_start, 3)
+    timings["total"] = round(time.perf_counter() - started, 3)
+    timings["sequential_estimate"] = round(timings["wardrobe_expert"] + timings["color_expert"] + timings["synthesis"], 3)
+
+    await agent_set.remember(request, answer)
+    return answer, timings
+
+
+class AgentPool:
+    """
+    Hands each WebSocket session its own AgentSet so model contexts never mix
+    between users. Released sets are reset and kept for reuse, up to max_idle.
+    """
+
+    def __init__(self, max_idle: int = AGENT_POOL_SIZE):
+        self.max_idle = max_idle
+        self._idle: List[AgentSet] = []
+        self.created = 0
+
+    def acquire(self) -> AgentSet:
+        if self._idle:
+            return self._idle.pop()
+        self.created += 1
+        return create_agent_set()
+
+    def prewarm(self, count: int) -> None:
+        while len(self._idle) < min(count, self.max_idle):
+            self.created += 1
+            self._idle.append(create_agent_set())
+
+    async def release(self, agent_set: AgentSet) -> None:
+        # A set still serving a coalesced call for someone else is left to finish and be collected
+        if len(self._idle) >= self.max_idle or agent_set.busy:
+            return
+        try:
+            await agent_set.reset()
+        except Exception as e:
+            log.error("agent_pool.reset_failed", error=str(e))
+            return
+        self._idle.append(agent_set)
+
+
+class ConversationLimiter:
+    """
+    Caps the number of in-flight LLM conversations; extra ones wait in FIFO
+    order. A waiting conversation's `on_queued` callback gets its position
+    when it joins the queue and again every time the position changes.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_CONVERSATIONS):
+        self.max_concurrent = max_concurrent
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        # Waiters in arrival order: [on_queued, last position reported]
+        self._queue: List[list] = []
+
+    @property
+    def waiting(self) -> int:
+        return len(self._queue)
+
+    async def _report(self, on_queued: Callable[[int], Awaitable[None]], position: int) -> None:
+        try:
+            await on_queued(position)
+        except Exception as e:
+            # The client may be gone; its conversation is cancelled separately
+            log.debug("limiter.report_failed", error=str(e))
+
+    def _reposition(self) -> None:
+        for position, entry in enumerate(self._queue, start=1):
+            on_queued, reported = entry
+            if on_queued and reported != position:
+                entry[1] = position
+                asyncio.create_task(self._report(on_queued, position))
+
+    @asynccontextmanager
+    async def slot(self, on_queued: Optional[Callable[[int], Awaitable[None]]] = None):
+        if self._semaphore.locked():
+            entry = [on_queued, len(self._queue) + 1]
+            self._queue.append(entry)
+            try:
+                if on_queued:
+                    await self._report(on_queued, entry[1])
+                await self._semaphore.acquire()
+            finally:
+                # Also reached on cancellation or disconnect, so the queue never keeps a ghost entry
+                self._queue.remove(entry)
+                self._reposition()
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+agent_pool = AgentPool()
+conversation_limiter = ConversationLimiter()
+
+
+async def warm_up(agent_sets: int = AGENT_POOL_PREWARM, model: bool = MODEL_WARMUP) -> Dict[str, float]:
+    """
+    Prepare for the first conversations: pre-build agent sets and optionally
+    make one minimal model call. Failures are logged, never raised, so an
+    unreachable model endpoint does not keep the app from starting.
+
+    Returns:
+        Dict[str, float]: Milliseconds spent on each step.
+    """
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    agent_pool.prewarm(agent_sets)
+    timings["agent_sets_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    if model:
+        started = time.perf_counter()
+        try:
+            await model_client.create(
+                [UserMessage(content="Reply with OK.", source="warm_up")],
+                extra_create_args={"max_tokens": 1}
+            )
+        except Exception as e:
+            log.warning("warm_up.model_failed", error=str(e))
+        timings["model_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return timings
+
+metrics.gauge("wardrobe_conversations_active", lambda: conversation_limiter.active, "LLM conversations holding a slot")
+metrics.gauge("wardrobe_conversations_waiting", lambda: conversation_limiter.waiting, "Conversations queued for a slot")
+metrics.gauge("wardrobe_agent_sets_created", lambda: agent_pool.created, "Agent sets built since startup")
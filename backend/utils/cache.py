@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from utils.shared import SHARED_STATE_SOCKET, SharedState, shared_state
+
+# memory | disk | shared | off; "shared" is the default when workers share a state service
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "shared" if SHARED_STATE_SOCKET else "memory")
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite3")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+
+
+class CacheBackend:
+    """Storage for cache entries. Values are JSON-serialisable dicts."""
+
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    async def size(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU store."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def clear(self) -> None:
+        self._data.clear()
+
+    async def size(self) -> int:
+        return len(self._data)
+
+
+class DiskBackend(CacheBackend):
+    """
+    SQLite-backed LRU store that survives restarts. Queries run on a worker
+    thread, one at a time, so a slow disk never stalls the event loop.
+    """
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_used_at ON cache (used_at)")
+        self._conn.commit()
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        def locked() -> Any:
+            with self._lock:
+                return fn(*args)
+        return await asyncio.to_thread(locked)
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE cache SET used_at = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return row[0]
+
+    def _set(self, key: str, value: str) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, used_at) VALUES (?, ?, ?)",
+            (key, value, time.time())
+        )
+        self._conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self._conn.commit()
+
+    def _execute(self, sql: str, *params: Any) -> Any:
+        result = self._conn.execute(sql, params).fetchone()
+        self._conn.commit()
+        return result
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = await self._run(self._get, key)
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        await self._run(self._set, key, json.dumps(value))
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._execute, "DELETE FROM cache WHERE key = ?", key)
+
+    async def clear(self) -> None:
+        await self._run(self._execute, "DELETE FROM cache")
+
+    async def size(self) -> int:
+        return (await self._run(self._execute, "SELECT COUNT(*) FROM cache"))[0]
+
+
+class SharedBackend(CacheBackend):
+    """Entries kept in the shared state service so every worker sees them."""
+
+    PREFIX = "response:"
+
+    def __init__(self, state: SharedState = shared_state):
+        self.state = state
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self.state.get(self.PREFIX + key)
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        await self.state.set(self.PREFIX + key, value, ttl=RESPONSE_CACHE_TTL)
+
+    async def delete(self, key: str) -> None:
+        await self.state.delete(self.PREFIX + key)
+
+    async def clear(self) -> None:
+        await self.state.clear(self.PREFIX)
+
+    async def size(self) -> int:
+        return await self.state.count(self.PREFIX)
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivially different phrasings share a key."""
+    text = re.sub(r"[^\w\s-]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class ResponseCache:
+    """
+    Caches final stylist answers keyed on the user, the normalised question and
+    that user's wardrobe version, so any wardrobe write makes older answers
+    unreachable.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, version: int, user_id: str = "") -> str:
+        return f"{user_id}:{version}:{normalize_query(query)}"
+
+    async def get(self, query: str, version: int, user_id: str = "") -> Optional[str]:
+        key = self.make_key(query, version, user_id)
+        entry = await self.backend.get(key)
+        if entry is not None and time.time() - entry["stored_at"] > self.ttl:
+            await self.backend.delete(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["response"]
+
+    async def set(self, query: str, version: int, response: str, user_id: str = "") -> None:
+        await self.backend.set(self.make_key(query, version, user_id), {"response": response, "stored_at": time.time()})
+
+    async def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": await self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    if RESPONSE_CACHE == "off":
+        return None
+    if RESPONSE_CACHE == "disk":
+        return ResponseCache(DiskBackend())
+    if RESPONSE_CACHE == "shared":
+        return ResponseCache(SharedBackend())
+    return ResponseCache(MemoryBackend())
@@ -0,0 +1,344 @@
+import colorsys
+import re
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Canonical palette: color name -> sRGB hex
+COLOR_TABLE: Dict[str, str] = {
+    "black": "#000000",
+    "white": "#ffffff",
+    "off-white": "#f5f5f0",
+    "ivory": "#fffff0",
+    "cream": "#fffdd0",
+    "grey": "#808080",
+    "charcoal": "#36454f",
+    "silver": "#c0c0c0",
+    "beige": "#d8c8a8",
+    "khaki": "#c3b091",
+    "tan": "#d2b48c",
+    "camel": "#c19a6b",
+    "taupe": "#8b7d6b",
+    "brown": "#7b4a2a",
+    "chocolate": "#5c3317",
+    "navy": "#1f2a44",
+    "denim": "#3b5b8c",
+    "blue": "#2f6fd6",
+    "light blue": "#9cc3e6",
+    "sky blue": "#87ceeb",
+    "teal": "#008080",
+    "turquoise": "#40e0d0",
+    "green": "#2e8b57",
+    "olive": "#6b6b2a",
+    "mint": "#98d8b0",
+    "emerald": "#1f8a5a",
+    "red": "#c62828",
+    "maroon": "#6d1a1a",
+    "burgundy": "#800020",
+    "pink": "#f4a6b8",
+    "coral": "#ff7f50",
+    "orange": "#ef7d1a",
+    "rust": "#b7410e",
+    "mustard": "#d4a017",
+    "yellow": "#f2d600",
+    "gold": "#d4af37",
+    "purple": "#6a3d9a",
+    "lavender": "#b9a6d9",
+    "lilac": "#c8a2c8",
+}
+
+COLOR_ALIASES: Dict[str, str] = {
+    "gray": "grey",
+    "navy blue": "navy",
+    "dark blue": "navy",
+    "jeans": "denim",
+    "light grey": "silver",
+    "light gray": "silver",
+    "dark grey": "charcoal",
+    "dark gray": "charcoal",
+    "dark brown": "chocolate",
+    "wine": "burgundy",
+    "dark green": "emerald",
+    "army green": "olive",
+    "sand": "beige",
+    "nude": "beige",
+    "violet": "purple",
+}
+
+# Colors that pair with almost anything
+NEUTRALS = {
+    "black", "white", "off-white", "ivory", "cream", "grey", "charcoal", "silver",
+    "beige", "khaki", "tan", "camel", "taupe", "brown", "chocolate", "navy", "denim",
+}
+
+OCCASIONS = ("casual", "semi-formal", "formal")
+
+# Checked in order, so "semi-formal" wins over "formal"
+OCCASION_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "semi-formal": ("semi-formal", "semi formal", "smart casual", "office", "work", "dinner", "date", "business"),
+    "formal": ("formal", "wedding", "interview", "gala", "funeral", "ceremony", "black tie"),
+    "casual": ("casual", "weekend", "brunch", "beach", "gym", "party", "travel", "everyday"),
+}
+
+
+def hex_to_rgb(value: str) -> Tuple[float, float, float]:
+    value = value.lstrip("#")
+    return tuple(int(value[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+
+def rgb_to_hsl(rgb: Tuple[float, float, float]) -> Tuple[float, float, float]:
+    h, l, s = colorsys.rgb_to_hls(*rgb)
+    return h * 360, s, l
+
+
+def rgb_to_lab(rgb: Tuple[float, float, float]) -> Tuple[float, float, float]:
+    def linear(c: float) -> float:
+        return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+    r, g, b = (linear(c) for c in rgb)
+    # sRGB -> XYZ (D65), normalised by the reference white
+    x = (0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047
+    y = 0.2126 * r + 0.7152 * g + 0.0722 * b
+    z = (0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883
+
+    def f(t: float) -> float:
+        return t ** (1 / 3) if t > 0.008856 else 7.787 * t + 16 / 116
+
+    fx, fy, fz = f(x), f(y), f(z)
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+
+def delta_e(a: Tuple[float, float, float], b: Tuple[float, float, float]) -> float:
+    return sum((x - y) ** 2 for x, y in zip(a, b)) ** 0.5
+
+
+# Precomputed once at import: name -> (hsl, lab)
+PALETTE: Dict[str, Tuple[Tuple[float, float, float], Tuple[float, float, float]]] = {
+    name: (rgb_to_hsl(hex_to_rgb(code)), rgb_to_lab(hex_to_rgb(code)))
+    for name, code in COLOR_TABLE.items()
+}
+
+
+def nearest_color(rgb: Tuple[float, float, float]) -> str:
+    """The canonical palette name closest to an sRGB color (components 0..1), by distance in Lab."""
+    lab = rgb_to_lab(rgb)
+    return min(PALETTE, key=lambda name: delta_e(lab, PALETTE[name][1]))
+
+
+_names = sorted(list(COLOR_TABLE) + list(COLOR_ALIASES), key=len, reverse=True)
+_COLOR_PATTERN = re.compile(r"\b(" + "|".join(re.escape(n) for n in _names) + r")(?:-?ish)?\b")
+
+
+def normalize_color(name: str) -> Optional[str]:
+    """Map a free-text color ("Navy Blue", "blue-ish", "dark gray") to a canonical palette name."""
+    if not name:
+        return None
+    text = re.sub(r"\s+", " ", name.strip().lower())
+    if text in COLOR_TABLE:
+        return text
+    if text in COLOR_ALIASES:
+        return COLOR_ALIASES[text]
+    found = find_colors(text)
+    return found[0] if found else None
+
+
+def find_colors(text: str) -> List[str]:
+    """Return the canonical colors mentioned in a text, in order of appearance, without duplicates."""
+    colors = []
+    for match in _COLOR_PATTERN.finditer(text.lower()):
+        name = COLOR_ALIASES.get(match.group(1), match.group(1))
+        if name not in colors:
+            colors.append(name)
+    return colors
+
+
+# Whole words only (plurals allowed), so "informal" is not formal and "update" is not a date
+_OCCASION_PATTERNS = {
+    occasion: re.compile(r"\b(" + "|".join(re.escape(k) for k in keywords) + r")(s|es)?\b")
+    for occasion, keywords in OCCASION_KEYWORDS.items()
+}
+
+
+def detect_occasion(text: str) -> Optional[str]:
+    text = text.lower()
+    for occasion, pattern in _OCCASION_PATTERNS.items():
+        if pattern.search(text):
+            return occasion
+    return None
+
+
+def _hue_distance(a: float, b: float) -> float:
+    d = abs(a - b) % 360
+    return min(d, 360 - d)
+
+
+def classify_pair(a: str, b: str) -> str:
+    """Classify two canonical colors as neutral, monochrome, analogous, complementary, triadic or clash."""
+    if a in NEUTRALS or b in NEUTRALS:
+        return "neutral"
+    (ha, _, _), _ = PALETTE[a]
+    (hb, _, _), _ = PALETTE[b]
+    d = _hue_distance(ha, hb)
+    if d <= 15:
+        return "monochrome"
+    if d <= 45:
+        return "analogous"
+    if d >= 140:
+        return "complementary"
+    if d >= 100:
+        return "triadic"
+    return "clash"
+
+
+_SCHEME_SCORES = {
+    "neutral": 0.9,
+    "monochrome": 0.8,
+    "analogous": 0.8,
+    "complementary": 0.7,
+    "triadic": 0.6,
+    "clash": 0.3,
+}
+
+
+def harmony_score(a: str, b: str) -> float:
+    """Score a color pair between 0 and 1."""
+    scheme = classify_pair(a, b)
+    score = _SCHEME_SCORES[scheme]
+    _, lab_a = PALETTE[a]
+    _, lab_b = PALETTE[b]
+    # Two neutrals with no lightness contrast read as flat; a touch of contrast helps any scheme
+    if scheme == "neutral" and a in NEUTRALS and b in NEUTRALS and abs(lab_a[0] - lab_b[0]) < 10:
+        score -= 0.15
+    elif delta_e(lab_a, lab_b) > 40:
+        score += 0.05
+    return round(min(score, 1.0), 3)
+
+
+def occasion_score(colors: Sequence[str], occasion: str) -> float:
+    """How well a palette suits an occasion (0-1): formal favours dark neutrals, casual tolerates bright colors."""
+    if not colors:
+        return 0.0
+    total = 0.0
+    for name in colors:
+        (_, saturation, lightness), _ = PALETTE[name]
+        neutral = name in NEUTRALS
+        if occasion == "formal":
+            total += 1.0 if neutral and (lightness < 0.35 or lightness > 0.9) else 0.7 if neutral else 0.3 if saturation < 0.6 else 0.15
+        elif occasion == "semi-formal":
+            total += 1.0 if neutral else 0.6 if saturation < 0.7 else 0.4
+        else:
+            total += 0.8 if neutral else 1.0
+    return round(total / len(colors), 3)
+
+
+def score_palette(colors: Sequence[str], occasion: Optional[str] = None) -> Dict[str, object]:
+    """Harmony of every pair in a palette plus per-occasion suitability."""
+    pairs = [(a, b) for i, a in enumerate(colors) for b in colors[i + 1:]]
+    harmony = min((harmony_score(a, b) for a, b in pairs), default=1.0)
+    schemes = {f"{a}/{b}": classify_pair(a, b) for a, b in pairs}
+    occasions = {o: occasion_score(colors, o) for o in ([occasion] if occasion else OCCASIONS)}
+    return {"harmony": harmony, "schemes": schemes, "occasions": occasions}
+
+
+def score_combinations(groups: Sequence[Sequence[str]], occasion: Optional[str] = None) -> List[Tuple[Tuple[str, ...], float]]:
+    """
+    Batch-score every combination that takes one color from each group
+    (e.g. tops x bottoms x shoes). Pair scores are memoised so each distinct
+    color pair is only evaluated once.
+
+    Returns:
+        List of (combination, score) sorted best first.
+    """
+    canonical = [[c for c in (normalize_color(x) for x in group) if c] for group in groups]
+    pair_cache: Dict[Tuple[str, str], float] = {}
+
+    def pair(a: str, b: str) -> float:
+        key = (a, b) if a <= b else (b, a)
+        if key not in pair_cache:
+            pair_cache[key] = harmony_score(a, b)
+        return pair_cache[key]
+
+    results = []
+    for combo in product(*canonical):
+        score = min((pair(a, b) for i, a in enumerate(combo) for b in combo[i + 1:]), default=1.0)
+        if occasion:
+            score = 0.7 * score + 0.3 * occasion_score(combo, occasion)
+        results.append((combo, round(score, 3)))
+    results.sort(key=lambda r: r[1], reverse=True)
+    return results
+
+
+def best_matches(color: str, limit: int = 3) -> List[str]:
+    others = [c for c in COLOR_TABLE if c != color]
+    return sorted(others, key=lambda c: harmony_score(color, c), reverse=True)[:limit]
+
+
+_SCHEME_REASONS = {
+    "neutral": "a neutral base keeps the look balanced and easy to wear",
+    "monochrome": "staying within one hue gives a clean, elongating effect",
+    "analogous": "neighbouring hues blend smoothly without competing",
+    "complementary": "opposite hues create bold, eye-catching contrast",
+    "triadic": "evenly spaced hues feel playful but need confident styling",
+    "clash": "the hues sit awkwardly apart on the color wheel and compete for attention",
+}
+
+
+# The only single-color question answered locally: "what goes with navy?", "which colors match beige", ...
+_PAIRING_QUESTION = re.compile(
+    r"^\s*(what|which)( colou?rs?| shades?)?( (goes?|go well|looks? good|pairs?( well)?|works?)( best)? with|"
+    r" (matches|match|complements?))\b",
+    re.IGNORECASE
+)
+# The only several-color questions answered locally: "does navy go with beige?", "navy and beige together?", ...
+_MATCH_QUESTION = re.compile(
+    r"\b((goes|go|pairs?|paired|works?|looks?( good| ok| okay| fine| right)?)( well)? with|together|"
+    r"match(es|ing)?|clash(es|ing)?|complements?|combin(e|ation))\b",
+    re.IGNORECASE
+)
+# "blue or green?" asks for a choice, which the palette score can't make
+_CHOICE_QUESTION = re.compile(r"\b(or|versus|vs)\b", re.IGNORECASE)
+
+
+def answer_color_query(query: str) -> Optional[str]:
+    """
+    Answer a color question locally when it asks what goes with one named
+    color, or whether the named colors go together.
+
+    Returns:
+        Optional[str]: A short stylist answer (under 50 words), or None when the
+        question is too free-form for the rule engine and should go to the LLM.
+    """
+    colors = find_colors(query)
+    occasion = detect_occasion(query)
+
+    if len(colors) == 1:
+        # Anything else about one color ("is navy too dark for summer?") needs the color expert
+        if not _PAIRING_QUESTION.match(query):
+            return None
+        matches = best_matches(colors[0])
+        return (
+            f"{colors[0].capitalize()} pairs best with {', '.join(matches[:-1])} or {matches[-1]}. "
+            f"These keep the palette harmonious for {occasion or 'most'} settings."
+        )
+    if len(colors) < 2 or not _MATCH_QUESTION.search(query) or _CHOICE_QUESTION.search(query):
+        return None
+
+    palette = score_palette(colors, occasion)
+    worst = min(
+        ((a, b) for i, a in enumerate(colors) for b in colors[i + 1:]),
+        key=lambda p: harmony_score(*p),
+    )
+    scheme = classify_pair(*worst)
+    names = ", ".join(colors[:-1]).capitalize() + f" and {colors[-1]}"
+    best_occasion = occasion or max(palette["occasions"], key=palette["occasions"].get)
+    article = "an" if scheme[0] in "aeiou" else "a"
+    answer = f"{names} form {article} {scheme} palette: {_SCHEME_REASONS[scheme]}. "
+
+    if palette["harmony"] >= 0.6 and palette["occasions"][best_occasion] >= 0.5:
+        answer += f"Great for {best_occasion} settings."
+    else:
+        swap = max(
+            (c for c in NEUTRALS if c not in colors),
+            key=lambda c: harmony_score(worst[0], c) + (occasion_score([c], best_occasion) if best_occasion else 0),
+        )
+        answer += f"For {best_occasion} settings, try swapping {worst[1]} for {swap}."
+    return answer
@@ -0,0 +1,254 @@
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from utils.colors import find_colors, normalize_color
+from utils.outfits import OCCASION_FORMALITY, SLOT_BY_TYPE, _days_since_worn, item_score
+from utils.shared import shared_state
+
+# Upper bound on the wardrobe context handed to the LLM per tool call, in estimated tokens
+WARDROBE_TOKEN_BUDGET = int(os.getenv("WARDROBE_TOKEN_BUDGET", "600"))
+
+_WORD = re.compile(r"[a-z-]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough to keep prompts bounded."""
+    return len(text) // 4 + 1
+
+
+class HandleRegistry:
+    """
+    Short handles (w1, w2, ...) for one user's item ObjectIds. A handle is
+    assigned the first time an item is shown and never reused, so the LLM can
+    refer to items cheaply and MarkAsWorn can map them back.
+    """
+
+    def __init__(self):
+        self.by_id: Dict[str, str] = {}
+        self.by_handle: Dict[str, str] = {}
+        self._next = 1
+
+    def handle(self, item_id: str) -> str:
+        if item_id not in self.by_id:
+            handle = f"w{self._next}"
+            self._next += 1
+            self.by_id[item_id] = handle
+            self.by_handle[handle] = item_id
+        return self.by_id[item_id]
+
+    def resolve(self, ref: str) -> str:
+        """Map a handle back to its ObjectId; anything else (e.g. a raw ObjectId) passes through."""
+        ref = str(ref).strip()
+        return self.by_handle.get(ref.lower(), ref)
+
+    def forget(self, item_id: str) -> None:
+        handle = self.by_id.pop(item_id, None)
+        if handle is not None:
+            self.by_handle.pop(handle, None)
+
+    def assign(self, item_id: str, handle: str) -> None:
+        """Record a handle given out elsewhere, e.g. by another worker."""
+        self.by_id[item_id] = handle
+        self.by_handle[handle] = item_id
+
+
+handle_registries: Dict[str, HandleRegistry] = {}
+
+
+def get_handles(user_id: str) -> HandleRegistry:
+    if user_id not in handle_registries:
+        handle_registries[user_id] = HandleRegistry()
+    return handle_registries[user_id]
+
+
+# Handles are shared between workers so a resumed conversation can still refer to w3
+HANDLES_PREFIX = "handles:"
+
+_HANDLE = re.compile(r"w\d+")
+
+
+def _item_key(user_id: str, item_id: str) -> str:
+    return f"{HANDLES_PREFIX}{user_id}:item:{item_id}"
+
+
+def _handle_key(user_id: str, handle: str) -> str:
+    return f"{HANDLES_PREFIX}{user_id}:handle:{handle}"
+
+
+async def _claim_handle(user_id: str, item_id: str) -> str:
+    """
+    The item's shared handle, claiming one if it has none. Numbers come from a
+    shared counter and every claim is a set-if-absent, so two workers never
+    give one handle to different items; if both claim the same item, the
+    first claim wins and the other number is simply never shown.
+    """
+    handle = await shared_state.get(_item_key(user_id, item_id))
+    while handle is None:
+        candidate = f"w{await shared_state.incr(HANDLES_PREFIX + user_id + ':next')}"
+        # Taken only if the counter was lost and restarted
+        if not await shared_state.add(_handle_key(user_id, candidate), item_id):
+            continue
+        if await shared_state.add(_item_key(user_id, item_id), candidate):
+            return candidate
+        handle = await shared_state.get(_item_key(user_id, item_id))
+    return handle
+
+
+async def shared_handles(user_id: str, item_ids: Iterable[str] = ()) -> HandleRegistry:
+    """
+    The user's registry, with a handle for each of `item_ids`. When workers
+    share state those handles are looked up (or claimed) there first, so
+    every worker shows the same handle for an item; otherwise the registry
+    hands them out itself as items are shown.
+    """
+    handles = get_handles(user_id)
+    if not shared_state.local:
+        for item_id in item_ids:
+            if item_id not in handles.by_id:
+                handles.assign(item_id, await _claim_handle(user_id, item_id))
+    return handles
+
+
+async def resolve_handle(user_id: str, ref: str) -> str:
+    """Map a handle back to its ObjectId, asking the shared state for one another worker gave out."""
+    handles = get_handles(user_id)
+    ref = str(ref).strip()
+    item_id = handles.resolve(ref)
+    if item_id == ref and not shared_state.local and _HANDLE.fullmatch(ref.lower()):
+        shared_id = await shared_state.get(_handle_key(user_id, ref.lower()))
+        if shared_id is not None:
+            handles.assign(shared_id, ref.lower())
+            item_id = shared_id
+    return item_id
+
+
+def find_types(text: str) -> Set[str]:
+    """Garment types mentioned in a request, e.g. "my blue shirts" -> {"shirt"}."""
+    found = set()
+    for word in _WORD.findall(text.lower()):
+        for candidate in (word, word[:-1] if word.endswith("s") else word):
+            if candidate in SLOT_BY_TYPE:
+                found.add(candidate)
+    return found
+
+
+def relevance(item: Dict[str, Any], occasion: str, types: Set[str], colors: Set[str]) -> float:
+    """How useful an item is for this request: occasion fit, plus a boost for each type or color the user named."""
+    score = item_score(item, occasion)
+    if str(item.get("type", "")).lower() in types:
+        score += 2
+    if colors and normalize_color(str(item.get("color", ""))) in colors:
+        score += 1
+    return score
+
+
+class _Column:
+    """Dictionary encoding for one categorical field."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: Any) -> str:
+        value = str(value or "").strip().lower()
+        if not value:
+            return "-"
+        if value not in self.codes:
+            self.codes[value] = len(self.codes)
+        return str(self.codes[value])
+
+    def cost(self, value: Any) -> int:
+        value = str(value or "").strip().lower()
+        return 0 if not value or value in self.codes else len(value) + 4
+
+    def render(self) -> str:
+        return f"{self.name}: " + " ".join(f"{code}={value}" for value, code in self.codes.items())
+
+
+def _worn(item: Dict[str, Any]) -> str:
+    days = _days_since_worn(item)
+    return "-" if days is None else f"{int(days)}d"
+
+
+def _name(item: Dict[str, Any]) -> str:
+    # Names like "white shirt" repeat the color and type columns, so only distinct ones are shown
+    name = str(item.get("item_name") or "").strip()
+    derived = f"{item.get('color', '')} {item.get('type', '')}".strip().lower()
+    return "" if not name or name.lower() == derived else f' "{name}"'
+
+
+def compact_wardrobe(
+    items: Iterable[Dict[str, Any]],
+    request: str,
+    occasion: str,
+    outfits: List[Dict[str, Any]],
+    handles: HandleRegistry,
+    budget: int = WARDROBE_TOKEN_BUDGET,
+    rotation: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Serialize ranked outfits and the most relevant wardrobe items as a
+    dictionary-encoded table that stays within `budget` estimated tokens.
+
+    Args:
+        items (Iterable[Dict[str, Any]]): Wardrobe items with "_id".
+        request (str): The user's request, used to rank items by type/color mentions.
+        occasion (str): Canonical occasion ("casual", "semi-formal" or "formal").
+        outfits (List[Dict[str, Any]]): Ranked outfits as returned by OutfitIndex.top.
+        handles (HandleRegistry): The user's handle registry.
+        budget (int): Maximum estimated tokens for the whole block.
+        rotation (Optional[Dict[str, Any]]): Precomputed rotation stats; their stale, most and least worn items are listed by handle.
+
+    Returns:
+        str: Compact plain-text wardrobe context.
+    """
+    if occasion not in OCCASION_FORMALITY:
+        occasion = "casual"
+    items = list(items)
+    types, colors = find_types(request), set(find_colors(request))
+    in_outfits = {item["_id"] for outfit in outfits for item in outfit["items"]}
+    ranked = sorted(
+        items,
+        key=lambda item: (item["_id"] not in in_outfits, -relevance(item, occasion, types, colors), item["_id"]),
+    )
+
+    header = [f"occasion: {occasion}", "outfits (score: items):"]
+    header += [f"{outfit['score']}: " + " ".join(handles.handle(i["_id"]) for i in outfit["items"]) for outfit in outfits]
+    counts: Dict[str, int] = {}
+    for item in items:
+        item_type = str(item.get("type", "")).lower()
+        counts[item_type] = counts.get(item_type, 0) + 1
+    header.append("counts: " + " ".join(f"{t}={n}" for t, n in sorted(counts.items())))
+    if rotation:
+        # Items the precomputed stats name may have been removed since; skip those
+        known = {item["_id"] for item in items}
+        groups = []
+        for label, key in (("stale", "stale"), ("most worn", "most_worn"), ("least worn", "least_worn")):
+            ids = [entry["_id"] for entry in rotation.get(key, []) if entry["_id"] in known]
+            if ids:
+                groups.append(f"{label} " + " ".join(handles.handle(i) for i in ids))
+        if groups:
+            header.append("rotation: " + " | ".join(groups))
+
+    columns = [_Column("types"), _Column("colors"), _Column("styles"), _Column("fits")]
+    fields = ("type", "color", "style", "fit")
+    legend = "items (id type color style fit last_worn):"
+    # Reserve room for the dictionaries' line prefixes and the trailing "more items" note
+    used = sum(len(line) + 1 for line in header) + len(legend) + 80
+    rows: List[str] = []
+    for item in ranked:
+        cost = sum(column.cost(item.get(field)) for column, field in zip(columns, fields))
+        row_length = 24 + len(_name(item))
+        if (used + cost + row_length) // 4 + 1 > budget and rows:
+            break
+        codes = " ".join(column.encode(item.get(field)) for column, field in zip(columns, fields))
+        row = f"{handles.handle(item['_id'])} {codes} {_worn(item)}{_name(item)}"
+        rows.append(row)
+        used += cost + len(row) + 1
+
+    lines = header + [column.render() for column in columns if column.codes] + [legend] + rows
+    omitted = len(items) - len(rows)
+    if omitted:
+        lines.append(f"+{omitted} more items not shown; ask for a type or color to see them")
+    return "\n".join(lines)
@@ -0,0 +1,218 @@
+import asyncio
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from routes.mongocl import (
+    LLM_FIELDS, get_rotation_stats, get_wardrobe, get_wardrobe_version, list_user_ids,
+    load_daily_plan, on_wardrobe_change, save_daily_plan
+)
+from utils.colors import OCCASIONS
+from utils.outfits import TOP_K, OutfitIndex
+from utils.shared import shared_state
+from utils.telemetry import get_logger, metrics
+
+# Run the background scheduler that keeps daily plans warm
+PRECOMPUTE = os.getenv("PRECOMPUTE", "1") == "1"
+# Local time (HH:MM) of the nightly pass over every wardrobe; pick an off-peak hour
+PRECOMPUTE_AT = os.getenv("PRECOMPUTE_AT", "04:00")
+# Outfits kept per occasion; the same number WardrobeLook shows, so it can serve them as they are
+PRECOMPUTE_OUTFITS = int(os.getenv("PRECOMPUTE_OUTFITS", str(TOP_K)))
+# Seconds to wait after a wardrobe's last write before refreshing its plan, so a burst of edits costs one refresh
+PRECOMPUTE_DEBOUNCE = float(os.getenv("PRECOMPUTE_DEBOUNCE", "10"))
+# Longest a refresh waits after the first write of a burst, however long the edits keep coming
+PRECOMPUTE_DEBOUNCE_MAX = float(os.getenv("PRECOMPUTE_DEBOUNCE_MAX", "60"))
+# Wardrobes recomputed at once by one pass
+PRECOMPUTE_CONCURRENCY = int(os.getenv("PRECOMPUTE_CONCURRENCY", "4"))
+# Items not worn for this many days (or never) are suggested for rotation
+ROTATION_STALE_DAYS = int(os.getenv("ROTATION_STALE_DAYS", "30"))
+ROTATION_LIST_SIZE = int(os.getenv("ROTATION_LIST_SIZE", "5"))
+
+# Held by the worker running a night's pass, so only one of them does it
+LOCK_PREFIX = "precompute:"
+
+log = get_logger("daily")
+
+
+async def compute_daily(user_id: str) -> Dict[str, Any]:
+    """
+    Build and store a user's plan for today: the top PRECOMPUTE_OUTFITS
+    outfits per occasion and the wardrobe's rotation stats.
+
+    Returns:
+        Dict[str, Any]: The plan, with the date and wardrobe version it was computed for.
+    """
+    started = time.perf_counter()
+    # Read first: a write landing mid-computation leaves the plan stale rather than wrongly fresh
+    version = await get_wardrobe_version(user_id)
+    rotation = await get_rotation_stats(ROTATION_STALE_DAYS, ROTATION_LIST_SIZE, user_id=user_id)
+    outfit_index = OutfitIndex(top_k=PRECOMPUTE_OUTFITS)
+    outfit_index.load(await get_wardrobe(fields=LLM_FIELDS, user_id=user_id))
+    plan = {
+        "date": date.today().isoformat(),
+        "version": version,
+        "computed_at": datetime.now().isoformat(timespec="seconds"),
+        "outfits": {occasion: outfit_index.top(occasion) for occasion in OCCASIONS},
+        "rotation": rotation,
+    }
+    plan = await save_daily_plan(plan, user_id=user_id)
+    metrics.observe("wardrobe_precompute_seconds", time.perf_counter() - started)
+    return plan
+
+
+def is_current(plan: Optional[Dict[str, Any]], version: int) -> bool:
+    return bool(plan) and plan.get("version") == version and plan.get("date") == date.today().isoformat()
+
+
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+async def get_daily(user_id: str, compute: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    The user's plan for today. Served from the precomputed copy; computed
+    inline only when it is missing or out of date (and `compute` is set),
+    once per user however many requests are waiting for it.
+    """
+    version = await get_wardrobe_version(user_id)
+    plan = await load_daily_plan(user_id=user_id)
+    if is_current(plan, version):
+        metrics.inc("wardrobe_daily_total", outcome="hit")
+        return plan
+    if not compute:
+        metrics.inc("wardrobe_daily_total", outcome="stale")
+        return None
+    async with _locks.setdefault(user_id, asyncio.Lock()):
+        plan = await load_daily_plan(user_id=user_id)
+        if is_current(plan, await get_wardrobe_version(user_id)):
+            metrics.inc("wardrobe_daily_total", outcome="hit")
+            return plan
+        metrics.inc("wardrobe_daily_total", outcome="miss")
+        return await compute_daily(user_id)
+
+
+def seconds_until(at: str, now: Optional[datetime] = None) -> float:
+    """Seconds from `now` to the next local HH:MM."""
+    now = now or datetime.now()
+    hour, minute = (int(part) for part in at.split(":"))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+class DailyScheduler:
+    """
+    Keeps daily plans warm in the background. Every wardrobe is recomputed
+    once a night at PRECOMPUTE_AT, by whichever worker takes that night's
+    lock; a wardrobe written through this worker is recomputed
+    PRECOMPUTE_DEBOUNCE seconds after its last change (each change restarts
+    the wait), but no later than PRECOMPUTE_DEBOUNCE_MAX after its first.
+    """
+
+    def __init__(
+        self,
+        at: str = PRECOMPUTE_AT,
+        debounce: float = PRECOMPUTE_DEBOUNCE,
+        max_wait: float = PRECOMPUTE_DEBOUNCE_MAX,
+        concurrency: int = PRECOMPUTE_CONCURRENCY
+    ):
+        self.at = at
+        self.debounce = debounce
+        self.max_wait = max(max_wait, debounce)
+        self.concurrency = concurrency
+        # user_id -> monotonic times of the first and the last change not yet refreshed
+        self.dirty: Dict[str, Tuple[float, float]] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wake = asyncio.Event()
+        if self.dirty:
+            self._wake.set()
+        self._tasks = [
+            asyncio.create_task(self._refresh_loop()),
+            asyncio.create_task(self._nightly_loop()),
+        ]
+        log.info("scheduler.started", at=self.at, debounce=self.debounce)
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def mark_dirty(self, user_id: str) -> None:
+        now = time.monotonic()
+        first, _ = self.dirty.get(user_id, (now, now))
+        self.dirty[user_id] = (first, now)
+        if self._wake is not None:
+            self._wake.set()
+
+    def _due_at(self, first: float, last: float) -> float:
+        return min(last + self.debounce, first + self.max_wait)
+
+    async def run(self, user_ids: Iterable[str]) -> int:
+        """Recompute the given wardrobes, at most `concurrency` at a time. Returns how many succeeded."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(user_id: str) -> bool:
+            async with semaphore:
+                try:
+                    await compute_daily(user_id)
+                    return True
+                except Exception as e:
+                    log.warning("scheduler.refresh_failed", user_id=user_id, error=str(e))
+                    metrics.inc("wardrobe_precompute_total", outcome="error")
+                    return False
+
+        results = await asyncio.gather(*(refresh(user_id) for user_id in user_ids))
+        metrics.inc("wardrobe_precompute_total", sum(results), outcome="ok")
+        return sum(results)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            now = time.monotonic()
+            due = [user_id for user_id, times in self.dirty.items() if self._due_at(*times) <= now]
+            if not due:
+                # Sleep until the next wardrobe is due; a new change wakes us to recompute that
+                self._wake.clear()
+                timeout = min((self._due_at(*times) for times in self.dirty.values()), default=None)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), None if timeout is None else timeout - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            for user_id in due:
+                del self.dirty[user_id]
+            await self.run(due)
+
+    async def _nightly_loop(self) -> None:
+        while True:
+            await asyncio.sleep(seconds_until(self.at))
+            if not await shared_state.add(LOCK_PREFIX + date.today().isoformat(), os.getpid(), ttl=24 * 3600):
+                continue
+            started = time.perf_counter()
+            try:
+                user_ids = await list_user_ids()
+                refreshed = await self.run(user_ids)
+                log.info("scheduler.nightly", wardrobes=len(user_ids), refreshed=refreshed,
+                         seconds=round(time.perf_counter() - started, 2))
+            except Exception as e:
+                log.error("scheduler.nightly_failed", error=str(e))
+
+
+scheduler = DailyScheduler()
+
+
+def _mark_changed(event: str, item: Dict[str, Any]) -> None:
+    if scheduler.running:
+        scheduler.mark_dirty(item["user_id"])
+
+on_wardrobe_change(_mark_changed)
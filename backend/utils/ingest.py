@@ -0,0 +1,95 @@
+import csv
+import json
+import os
+from typing import Any, AsyncIterator, Tuple, Union
+
+# Longest line accepted from an upload; guards against a file with no newlines being buffered whole
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", "65536"))
+# Rows read from one upload; the rest of the file is left unread and the import reported truncated
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "50000"))
+
+Row = Tuple[int, Any]
+
+
+class LineTooLong(ValueError):
+    """Stands in for a line that was dropped for being longer than the limit."""
+
+    def __init__(self, max_line: int):
+        super().__init__(f"line longer than {max_line} bytes")
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes],
+    max_line: int = IMPORT_MAX_LINE_BYTES
+) -> AsyncIterator[Union[str, LineTooLong]]:
+    """
+    Split a byte stream into decoded lines (newline kept) without reading it
+    all into memory. A line over `max_line` bytes is discarded as it streams
+    in and a LineTooLong is yielded in its place.
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping or len(line) > max_line:
+                skipping = False
+                yield LineTooLong(max_line)
+            else:
+                yield line.decode("utf-8-sig", errors="replace") + "\n"
+        if len(buffer) > max_line:
+            skipping, buffer = True, b""
+    if skipping:
+        yield LineTooLong(max_line)
+    elif buffer:
+        yield buffer.decode("utf-8-sig", errors="replace")
+
+
+async def parse_ndjson(lines: AsyncIterator[Union[str, LineTooLong]]) -> AsyncIterator[Row]:
+    """One JSON object per line; blank lines are skipped, bad ones become that row's error."""
+    row = 0
+    async for line in lines:
+        if isinstance(line, LineTooLong):
+            row += 1
+            yield row, line
+            continue
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, json.loads(line)
+        except ValueError as e:
+            yield row, ValueError(f"invalid JSON: {e}")
+
+
+async def parse_csv(lines: AsyncIterator[Union[str, LineTooLong]]) -> AsyncIterator[Row]:
+    """CSV with a header row. Quoted fields may span lines; a record is parsed once its quotes are balanced."""
+    header = None
+    pending = ""
+    row = 0
+    async for line in lines:
+        if isinstance(line, LineTooLong) or len(pending) + len(line) > IMPORT_MAX_LINE_BYTES:
+            # Drop the whole record; if it was still inside quotes the next lines start a fresh one
+            pending = ""
+            if header is not None:
+                row += 1
+                yield row, ValueError(f"record longer than {IMPORT_MAX_LINE_BYTES} bytes")
+            continue
+        pending += line
+        if pending.count('"') % 2:
+            continue
+        record, pending = pending, ""
+        if not record.strip():
+            continue
+        values = next(csv.reader([record.rstrip("\r\n")]), [])
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) > len(header):
+            yield row, ValueError(f"expected {len(header)} columns, got {len(values)}")
+            continue
+        yield row, dict(zip(header, values))
+    if pending.strip():
+        yield row + 1, ValueError("unterminated quoted field")
@@ -0,0 +1,107 @@
+import time
+from typing import Any, AsyncGenerator, Mapping, Optional, Sequence, Union
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage, ModelCapabilities, ModelInfo, RequestUsage
+from autogen_core.tools import Tool, ToolSchema
+from utils.telemetry import get_logger, metrics
+
+log = get_logger("llm")
+
+
+class InstrumentedChatCompletionClient(ChatCompletionClient):
+    """
+    Wraps a model client and records call counts, latency, time to first token
+    and token usage for every create/create_stream call.
+    """
+
+    def __init__(self, inner: ChatCompletionClient, name: str = "default"):
+        self.inner = inner
+        self.name = name
+
+    def _record(self, result: CreateResult, elapsed: float, first_token: Optional[float] = None) -> None:
+        metrics.inc("wardrobe_llm_calls_total", model=self.name)
+        metrics.observe("wardrobe_llm_latency_seconds", elapsed, model=self.name)
+        if first_token is not None:
+            metrics.observe("wardrobe_llm_first_token_seconds", first_token, model=self.name)
+        usage = result.usage
+        metrics.inc("wardrobe_llm_tokens_total", usage.prompt_tokens, model=self.name, kind="prompt")
+        metrics.inc("wardrobe_llm_tokens_total", usage.completion_tokens, model=self.name, kind="completion")
+        log.info(
+            "llm.call",
+            model=self.name,
+            ms=round(elapsed * 1000, 1),
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            tool_calls=isinstance(result.content, list),
+        )
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Union[Tool, ToolSchema]] = [],
+        tool_choice: Any = "auto",
+        json_output: Optional[Any] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        started = time.perf_counter()
+        try:
+            result = await self.inner.create(
+                messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args, cancellation_token=cancellation_token,
+            )
+        except Exception:
+            metrics.inc("wardrobe_llm_errors_total", model=self.name)
+            raise
+        self._record(result, time.perf_counter() - started)
+        return result
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Union[Tool, ToolSchema]] = [],
+        tool_choice: Any = "auto",
+        json_output: Optional[Any] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        started = time.perf_counter()
+        first_token = None
+        try:
+            async for chunk in self.inner.create_stream(
+                messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args, cancellation_token=cancellation_token,
+            ):
+                if isinstance(chunk, CreateResult):
+                    self._record(chunk, time.perf_counter() - started, first_token)
+                elif first_token is None:
+                    first_token = time.perf_counter() - started
+                yield chunk
+        except Exception:
+            metrics.inc("wardrobe_llm_errors_total", model=self.name)
+            raise
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+    def actual_usage(self) -> RequestUsage:
+        return self.inner.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self.inner.total_usage()
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Union[Tool, ToolSchema]] = []) -> int:
+        return self.inner.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Union[Tool, ToolSchema]] = []) -> int:
+        return self.inner.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore[override]
+        return self.inner.capabilities
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self.inner.model_info
@@ -0,0 +1,180 @@
+import json
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence
+
+from autogen_core.model_context import ChatCompletionContext, ChatCompletionContextState, UnboundedChatCompletionContext
+from autogen_core.models import AssistantMessage, FunctionExecutionResultMessage, LLMMessage, SystemMessage, UserMessage
+
+from utils.colors import detect_occasion
+from utils.compact import estimate_tokens
+
+# Recent turns kept verbatim in the coordinator's context; 0 keeps everything (the old behaviour)
+MEMORY_WINDOW_TURNS = int(os.getenv("MEMORY_WINDOW_TURNS", "4"))
+# The experts answer one self-contained consultation at a time, so they keep less
+MEMORY_EXPERT_WINDOW_TURNS = int(os.getenv("MEMORY_EXPERT_WINDOW_TURNS", "1"))
+# Budget for the rolling summary of older turns, in estimated tokens
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "250"))
+# "extractive" folds old turns locally; "model" asks the LLM to rewrite the summary
+MEMORY_SUMMARIZER = os.getenv("MEMORY_SUMMARIZER", "extractive")
+
+_HANDLE = re.compile(r"\bw\d+\b")
+
+Summarizer = Callable[[str, str], Awaitable[str]]
+
+
+def _text(message: LLMMessage) -> Optional[str]:
+    content = getattr(message, "content", None)
+    return content if isinstance(content, str) else None
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.replace("TERMINATE", "").split())
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def _clip_lines(text: str, budget: int) -> str:
+    """Drop the oldest lines until the text fits the token budget."""
+    lines = text.strip().split("\n")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class SessionMemoryContext(ChatCompletionContext):
+    """
+    Bounded model context for a long-lived session.
+
+    The last `window_turns` turns are kept, the current one in full and
+    finished ones reduced to the user's message and the final answer (tool
+    calls and results are dropped). Older turns are folded into a rolling
+    summary capped at `summary_tokens`. Facts worth keeping for the whole
+    session (occasion, suggested and worn item handles) are pinned and sent
+    with the summary as a system message ahead of the window.
+    """
+
+    def __init__(
+        self,
+        window_turns: int = MEMORY_WINDOW_TURNS,
+        summary_tokens: int = MEMORY_SUMMARY_TOKENS,
+        summarizer: Optional[Summarizer] = None,
+        ignore: Sequence[str] = ("SKIP_USER_INPUT",),
+    ):
+        super().__init__()
+        if window_turns <= 0:
+            raise ValueError("window_turns must be greater than 0.")
+        self.window_turns = window_turns
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        self.ignore = set(ignore)
+        self.summary = ""
+        self.pinned: Dict[str, str] = {}
+
+    def _starts_turn(self, message: LLMMessage) -> bool:
+        return isinstance(message, UserMessage) and _text(message) not in self.ignore
+
+    def _turn_starts(self) -> List[int]:
+        return [i for i, message in enumerate(self._messages) if self._starts_turn(message)]
+
+    async def add_message(self, message: LLMMessage) -> None:
+        if self._starts_turn(message):
+            self._close_turn()
+            self._messages.append(message)
+            await self._evict()
+        else:
+            self._messages.append(message)
+        self._pin(message)
+
+    def _close_turn(self) -> None:
+        """Reduce the finished turn to the user's message and the final answer."""
+        starts = self._turn_starts()
+        if not starts:
+            return
+        turn = self._messages[starts[-1]:]
+        answers = [m for m in turn[1:] if isinstance(m, AssistantMessage) and _text(m)]
+        self._messages[starts[-1]:] = [turn[0]] + answers[-1:]
+
+    async def _evict(self) -> None:
+        starts = self._turn_starts()
+        if len(starts) <= self.window_turns:
+            return
+        cut = starts[-self.window_turns]
+        evicted, self._messages = self._messages[:cut], self._messages[cut:]
+        lines = []
+        for message in evicted:
+            text = _text(message)
+            if not text or text in self.ignore:
+                continue
+            # One line per turn, so trimming the summary never splits a question from its answer
+            if isinstance(message, UserMessage):
+                lines.append(f"- user: {_clip(text, 160)}")
+            elif isinstance(message, AssistantMessage):
+                answer = f"answer: {_clip(text, 200)}"
+                lines.append(f"{lines.pop()} | {answer}" if lines else f"- {answer}")
+        if lines:
+            await self._fold("\n".join(lines))
+
+    async def _fold(self, evicted: str) -> None:
+        if self.summarizer is not None:
+            try:
+                self.summary = _clip_lines(await self.summarizer(self.summary, evicted), self.summary_tokens)
+                return
+            except Exception:
+                pass
+        self.summary = _clip_lines(f"{self.summary}\n{evicted}".strip(), self.summary_tokens)
+
+    def _pin(self, message: LLMMessage) -> None:
+        text = _text(message)
+        if isinstance(message, UserMessage) and text and text not in self.ignore:
+            occasion = detect_occasion(text)
+            if occasion:
+                self.pinned["occasion"] = occasion
+        elif isinstance(message, AssistantMessage) and isinstance(message.content, list):
+            for call in message.content:
+                if getattr(call, "name", None) == "MarkAsWorn":
+                    try:
+                        item_ids = json.loads(call.arguments).get("item_ids") or []
+                    except (ValueError, AttributeError):
+                        continue
+                    self.pinned["worn"] = " ".join(str(i) for i in item_ids)
+        elif isinstance(message, AssistantMessage) and text:
+            handles = list(dict.fromkeys(_HANDLE.findall(text)))[:8]
+            if handles:
+                self.pinned["suggested"] = " ".join(handles)
+
+    def render_memory(self) -> str:
+        parts = []
+        if self.pinned:
+            labels = {"occasion": "occasion", "suggested": "last suggested items", "worn": "marked worn"}
+            parts.append("Pinned facts: " + "; ".join(f"{labels.get(k, k)}: {v}" for k, v in self.pinned.items()))
+        if self.summary:
+            parts.append("Earlier in this conversation:\n" + self.summary)
+        return "\n".join(parts)
+
+    async def get_messages(self) -> List[LLMMessage]:
+        messages = list(self._messages)
+        if messages and isinstance(messages[0], FunctionExecutionResultMessage):
+            messages = messages[1:]
+        memory = self.render_memory()
+        return ([SystemMessage(content=memory)] if memory else []) + messages
+
+    async def clear(self) -> None:
+        self._messages = []
+        self.summary = ""
+        self.pinned = {}
+
+    async def save_state(self) -> Mapping[str, Any]:
+        state = dict(ChatCompletionContextState(messages=self._messages).model_dump())
+        state.update(summary=self.summary, pinned=dict(self.pinned))
+        return state
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        self._messages = ChatCompletionContextState.model_validate({"messages": state.get("messages", [])}).messages
+        self.summary = state.get("summary", "")
+        self.pinned = dict(state.get("pinned", {}))
+
+
+def create_memory(window_turns: int = MEMORY_WINDOW_TURNS, summarizer: Optional[Summarizer] = None) -> ChatCompletionContext:
+    if window_turns <= 0:
+        return UnboundedChatCompletionContext()
+    return SessionMemoryContext(window_turns, summarizer=summarizer)
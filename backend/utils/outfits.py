@@ -0,0 +1,191 @@
+import heapq
+from datetime import datetime
+from itertools import product
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.colors import OCCASIONS, harmony_score, normalize_color
+
+# Garment type -> outfit slot
+SLOT_BY_TYPE = {
+    "shirt": "top", "t-shirt": "top", "tshirt": "top", "tee": "top", "top": "top", "blouse": "top",
+    "polo": "top", "sweater": "top", "kurta": "top",
+    "pants": "bottom", "trousers": "bottom", "jeans": "bottom", "chinos": "bottom", "shorts": "bottom",
+    "skirt": "bottom",
+    "shoes": "footwear", "sneakers": "footwear", "loafers": "footwear", "boots": "footwear",
+    "heels": "footwear", "sandals": "footwear", "oxfords": "footwear",
+    "jacket": "outerwear", "blazer": "outerwear", "coat": "outerwear", "hoodie": "outerwear",
+    "cardigan": "outerwear",
+    "dress": "onepiece", "jumpsuit": "onepiece",
+}
+
+# Style -> formality level (0 casual .. 2 formal)
+FORMALITY = {
+    "athletic": 0.0, "casual": 0.0, "streetwear": 0.0, "party": 1.0, "semi-formal": 1.0,
+    "smart casual": 1.0, "business": 1.5, "formal": 2.0,
+}
+OCCASION_FORMALITY = {"casual": 0.0, "semi-formal": 1.0, "formal": 2.0}
+
+# Fit pairs that read poorly together; everything else is neutral
+FIT_PENALTIES = {
+    frozenset(["oversized"]): 0.4,
+    frozenset(["loose", "oversized"]): 0.3,
+    frozenset(["loose"]): 0.2,
+}
+
+SHORTLIST_SIZE = 8
+TOP_K = 5
+
+
+def slot_for(item: Dict[str, Any]) -> Optional[str]:
+    return SLOT_BY_TYPE.get(str(item.get("type", "")).strip().lower())
+
+
+def _formality(item: Dict[str, Any]) -> float:
+    return FORMALITY.get(str(item.get("style", "")).strip().lower(), 1.0)
+
+
+def _days_since_worn(item: Dict[str, Any]) -> Optional[float]:
+    last_worn = item.get("last_worn")
+    if not last_worn:
+        return None
+    if isinstance(last_worn, str):
+        try:
+            last_worn = datetime.fromisoformat(last_worn)
+        except ValueError:
+            return None
+    return (datetime.now() - last_worn).total_seconds() / 86400
+
+
+def item_score(item: Dict[str, Any], occasion: str) -> float:
+    """Unary score: how well an item suits the occasion, with a small bonus for items not worn recently."""
+    score = 1 - abs(_formality(item) - OCCASION_FORMALITY[occasion]) / 2
+    days = _days_since_worn(item)
+    score += 0.1 if days is None else min(days, 14) / 140
+    return score
+
+
+def pair_score(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    """Pairwise compatibility over color, style and fit."""
+    color_a, color_b = normalize_color(a.get("color", "")), normalize_color(b.get("color", ""))
+    color = harmony_score(color_a, color_b) if color_a and color_b else 0.6
+    style = 1 - abs(_formality(a) - _formality(b)) / 2
+    fits = frozenset(str(x.get("fit", "")).strip().lower() for x in (a, b))
+    fit = 1 - FIT_PENALTIES.get(fits, 0.0)
+    return 0.5 * color + 0.3 * style + 0.2 * fit
+
+
+class OutfitIndex:
+    """
+    Keeps the top-K ranked outfits per occasion for one wardrobe.
+
+    Items are grouped into slots by type. For each occasion only the best
+    SHORTLIST_SIZE items per slot (by unary score) are combined, so ranking
+    cost stays bounded however large the wardrobe gets. Pair scores are cached
+    and only the pairs involving a changed item are recomputed.
+    """
+
+    def __init__(self, shortlist_size: int = SHORTLIST_SIZE, top_k: int = TOP_K):
+        self.shortlist_size = shortlist_size
+        self.top_k = top_k
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.loaded = False
+        self._pairs: Dict[Tuple[str, str], float] = {}
+        self._rankings: Dict[str, List[Dict[str, Any]]] = {}
+
+    def load(self, items: List[Dict[str, Any]]) -> None:
+        self.items = {str(item["_id"]): item for item in items}
+        self._pairs.clear()
+        self._rankings.clear()
+        self.loaded = True
+
+    def invalidate(self) -> None:
+        """Forget everything; the next caller reloads from the wardrobe."""
+        self.items = {}
+        self._pairs.clear()
+        self._rankings.clear()
+        self.loaded = False
+
+    def add(self, item: Dict[str, Any]) -> None:
+        if not self.loaded:
+            return
+        self.remove(str(item["_id"]))
+        self.items[str(item["_id"])] = item
+        self._rankings.clear()
+
+    def remove(self, item_id: str) -> None:
+        if self.items.pop(item_id, None) is None:
+            return
+        self._pairs = {k: v for k, v in self._pairs.items() if item_id not in k}
+        self._rankings.clear()
+
+    def mark_worn(self, item_id: str, worn_at: datetime) -> None:
+        item = self.items.get(item_id)
+        if item is None:
+            return
+        item["last_worn"] = worn_at
+        item["times_worn"] = item.get("times_worn", 0) + 1
+        self._rankings.clear()
+
+    def _pair(self, a: str, b: str) -> float:
+        key = (a, b) if a <= b else (b, a)
+        if key not in self._pairs:
+            self._pairs[key] = pair_score(self.items[a], self.items[b])
+        return self._pairs[key]
+
+    def _shortlist(self, slot: str, occasion: str) -> List[Tuple[str, float]]:
+        scored = ((item_id, item_score(item, occasion)) for item_id, item in self.items.items() if slot_for(item) == slot)
+        return heapq.nlargest(self.shortlist_size, scored, key=lambda s: s[1])
+
+    def _rank(self, occasion: str) -> List[Dict[str, Any]]:
+        shortlists = {slot: self._shortlist(slot, occasion) for slot in ("top", "bottom", "footwear", "outerwear", "onepiece")}
+        footwear = shortlists["footwear"] or [(None, 0.0)]
+        outerwear = shortlists["outerwear"] + [(None, 0.0)]
+        bases = [(t, b) for t, b in product(shortlists["top"], shortlists["bottom"])]
+        bases += [(d,) for d in shortlists["onepiece"]]
+
+        candidates = []
+        for base, shoe, layer in product(bases, footwear, outerwear):
+            picked = [p for p in (*base, shoe, layer) if p[0] is not None]
+            ids = [p[0] for p in picked]
+            unary = sum(p[1] for p in picked) / len(picked)
+            pairs = [self._pair(a, b) for i, a in enumerate(ids) for b in ids[i + 1:]]
+            compatibility = min(pairs) * 0.5 + sum(pairs) / len(pairs) * 0.5 if pairs else 0.0
+            candidates.append((round(0.4 * unary + 0.6 * compatibility, 3), ids))
+
+        ranked = heapq.nlargest(self.top_k, candidates, key=lambda c: c[0])
+        return [{"score": score, "items": [self._describe(i) for i in ids]} for score, ids in ranked]
+
+    def _describe(self, item_id: str) -> Dict[str, Any]:
+        item = self.items[item_id]
+        return {
+            "_id": item_id,
+            "item_name": item.get("item_name") or item.get("item_id"),
+            "type": item.get("type"),
+            "color": item.get("color"),
+            "style": item.get("style"),
+            "fit": item.get("fit"),
+        }
+
+    def top(self, occasion: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        if occasion not in OCCASIONS:
+            occasion = "casual"
+        if occasion not in self._rankings:
+            self._rankings[occasion] = self._rank(occasion)
+        return self._rankings[occasion][: k or self.top_k]
+
+    def summary(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for item in self.items.values():
+            item_type = str(item.get("type", "")).lower()
+            counts[item_type] = counts.get(item_type, 0) + 1
+        return counts
+
+
+# One index per user wardrobe
+outfit_indexes: Dict[str, OutfitIndex] = {}
+
+
+def get_outfit_index(user_id: str) -> OutfitIndex:
+    if user_id not in outfit_indexes:
+        outfit_indexes[user_id] = OutfitIndex()
+    return outfit_indexes[user_id]
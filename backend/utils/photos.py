@@ -0,0 +1,165 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from utils.colors import nearest_color
+from utils.telemetry import get_logger, metrics
+
+# Worker processes for photo analysis; the decoding and k-means never run on the event loop
+PHOTO_WORKERS = int(os.getenv("PHOTO_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+# Photos admitted (running or queued for a worker) at once; beyond that uploads get a 503
+PHOTO_MAX_PENDING = int(os.getenv("PHOTO_MAX_PENDING", str(PHOTO_WORKERS * 8)))
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(10 * 1024 * 1024)))
+# Longest side the photo is downsampled to before clustering
+PHOTO_SAMPLE_SIZE = int(os.getenv("PHOTO_SAMPLE_SIZE", "64"))
+PHOTO_COLORS = int(os.getenv("PHOTO_COLORS", "4"))
+# Clusters covering less of the garment than this are ignored
+PHOTO_MIN_SHARE = float(os.getenv("PHOTO_MIN_SHARE", "0.08"))
+
+log = get_logger("photos")
+
+
+def _kmeans(pixels, k: int, iterations: int = 15, seed: int = 0):
+    """Vectorised k-means (k-means++ seeding) over an (N, 3) float array. Returns centers and labels."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = pixels[rng.integers(len(pixels))][None, :]
+    for _ in range(1, k):
+        distances = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        total = distances.sum()
+        if total == 0:
+            break
+        centers = np.vstack([centers, pixels[rng.choice(len(pixels), p=distances / total)]])
+
+    for _ in range(iterations):
+        labels = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centers)).astype(float)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, pixels)
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        if np.abs(updated - centers).max() < 0.5:
+            centers = updated
+            break
+        centers = updated
+    labels = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    return centers, labels
+
+
+def extract_colors(
+    data: bytes,
+    k: int = PHOTO_COLORS,
+    size: int = PHOTO_SAMPLE_SIZE,
+    min_share: float = PHOTO_MIN_SHARE
+) -> List[Dict[str, Any]]:
+    """
+    Dominant colors of a garment photo, mapped to the canonical palette.
+
+    The image is downsampled to at most `size` pixels a side. A uniform
+    background (judged from the border pixels) is masked out before
+    clustering. Clusters that map to the same palette color are merged.
+
+    Returns:
+        List[Dict[str, Any]]: {"color", "hex", "share"} entries, largest share first.
+    """
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    # Lets the JPEG decoder scale down while decoding instead of producing full-size pixels
+    image.draft("RGB", (size * 4, size * 4))
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    image.thumbnail((size, size))
+    grid = np.asarray(image, dtype=np.float64)
+
+    pixels = grid.reshape(-1, 3)
+    border = np.concatenate([grid[0], grid[-1], grid[:, 0], grid[:, -1]])
+    if border.std(axis=0).max() < 20:
+        garment = pixels[np.sqrt(((pixels - border.mean(axis=0)) ** 2).sum(axis=1)) > 40]
+        # Keep the mask only if it leaves a plausible garment (not a plain photo of the background)
+        if len(garment) >= 0.1 * len(pixels):
+            pixels = garment
+
+    centers, labels = _kmeans(pixels, min(k, len(pixels)))
+    shares = np.bincount(labels, minlength=len(centers)) / len(labels)
+
+    merged: Dict[str, Dict[str, Any]] = {}
+    for center, share in zip(centers, shares):
+        if share <= 0:
+            continue
+        rgb = tuple(float(c) / 255 for c in center)
+        name = nearest_color(rgb)
+        entry = merged.setdefault(name, {"color": name, "hex": "", "share": 0.0, "_weight": 0.0})
+        # Report the hex of the cluster that contributes most to each palette color
+        if share > entry["_weight"]:
+            entry["hex"] = "#" + "".join(f"{int(round(c)):02x}" for c in center)
+            entry["_weight"] = float(share)
+        entry["share"] += float(share)
+
+    colors = sorted(merged.values(), key=lambda entry: entry["share"], reverse=True)
+    result = [
+        {"color": entry["color"], "hex": entry["hex"], "share": round(entry["share"], 3)}
+        for entry in colors if entry["share"] >= min_share
+    ]
+    return result or [{"color": colors[0]["color"], "hex": colors[0]["hex"], "share": round(colors[0]["share"], 3)}]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the parent runs an event loop and logging threads that must not be copied
+        _pool = ProcessPoolExecutor(max_workers=PHOTO_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def analyze_photo(data: bytes) -> List[Dict[str, Any]]:
+    """Run extract_colors in the process pool. Raises 503 when too many photos are already pending."""
+    global _pending
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty file")
+    if len(data) > PHOTO_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Photo larger than {PHOTO_MAX_BYTES} bytes")
+    if _pending >= PHOTO_MAX_PENDING:
+        metrics.inc("wardrobe_photos_total", outcome="rejected")
+        raise HTTPException(status_code=503, detail="Too many photos being analysed, please retry shortly")
+
+    _pending += 1
+    started = time.perf_counter()
+    try:
+        colors = await asyncio.get_running_loop().run_in_executor(_executor(), extract_colors, data)
+    except BrokenProcessPool as e:
+        # A worker died (e.g. out of memory); start a fresh pool for the next photo
+        metrics.inc("wardrobe_photos_total", outcome="error")
+        log.error("photo.pool_broken", error=str(e))
+        shutdown_pool()
+        raise HTTPException(status_code=503, detail="Photo analysis is restarting, please retry")
+    except Exception as e:
+        metrics.inc("wardrobe_photos_total", outcome="error")
+        log.warning("photo.failed", error=str(e))
+        raise HTTPException(status_code=422, detail="Could not read the image")
+    finally:
+        _pending -= 1
+    metrics.inc("wardrobe_photos_total", outcome="ok")
+    metrics.observe("wardrobe_photo_seconds", time.perf_counter() - started)
+    return colors
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+metrics.gauge("wardrobe_photos_pending", lambda: _pending, "Photos admitted for analysis and not yet finished")
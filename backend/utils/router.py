@@ -0,0 +1,317 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from routes.mongocl import LLM_FIELDS, get_wardrobe, update_items_worn
+from utils.colors import detect_occasion, find_colors, normalize_color
+from utils.compact import find_types, resolve_handle
+from utils.daily import get_daily
+from utils.outfits import SLOT_BY_TYPE
+from utils.telemetry import get_logger, metrics
+
+# Answer greetings, wardrobe listings, "mark X as worn" and "what should I wear today" without a model call
+INTENT_ROUTER = os.getenv("INTENT_ROUTER", "1") == "1"
+# Also try a small local classifier when no rule matches
+INTENT_CLASSIFIER = os.getenv("INTENT_CLASSIFIER", "0") == "1"
+# Minimum posterior for the classifier's guess to be acted on
+INTENT_CLASSIFIER_THRESHOLD = float(os.getenv("INTENT_CLASSIFIER_THRESHOLD", "0.8"))
+
+log = get_logger("router")
+
+SLOT_ORDER = ("top", "onepiece", "bottom", "outerwear", "footwear")
+
+_GREETING = re.compile(
+    r"^\s*(hi+|hello+|hey+|hiya|yo|howdy|greetings|good (morning|afternoon|evening)|"
+    r"thanks?( you)?( so much)?|thank you|thx|ty|bye|goodbye|see you)"
+    r"(,?\s+(tara|there|again|a lot))?\s*[!.?\s]*$",
+    re.IGNORECASE
+)
+_THANKS = re.compile(r"\b(thanks?|thx|ty)\b", re.IGNORECASE)
+_BYE = re.compile(r"\b(bye|goodbye|see you)\b", re.IGNORECASE)
+# "what is/are" only as "what's in my closet" or "what are my shirts"; "what is navy?" is a color question
+_LIST = re.compile(
+    r"^\s*(please\s+)?((can|could) you\s+)?(show|list|display|view|see|what('s| is| are) (in|inside) |"
+    r"what('s| is| are) (all )?my |what .* do i (have|own)|do i (have|own)|how many)\b",
+    re.IGNORECASE
+)
+_WARDROBE_WORDS = re.compile(r"\b(wardrobe|closet|clothes|items|everything)\b", re.IGNORECASE)
+_MARK_WORN = [
+    re.compile(r"^\s*(please\s+)?mark\s+(?P<items>.+?)\s+as\s+worn\b", re.IGNORECASE),
+    re.compile(r"^\s*i\s+(wore|am wearing|'m wearing|have worn|just wore)\s+(?P<items>.+?)\s*(today|yesterday)?[.!\s]*$", re.IGNORECASE),
+]
+# A plain "what should I wear today" (optionally casual/semi-formal/formal) is answered from the precomputed daily plan
+_TODAY = re.compile(
+    r"^\s*(so\s+)?((what|which)( outfit)? (should|shall|can|do) i wear( today| this morning)?|what to wear( today)?|"
+    r"(suggest|recommend|pick|plan)( me)? (an |a |my )?outfit for today|(today'?s|daily) (outfit|look)|outfit of the day)"
+    r"(\s+(for\s+)?(a\s+)?(casual|semi-formal|formal)( day| look)?)?\s*[?!.\s]*$",
+    re.IGNORECASE
+)
+# Anything asking for judgement (outfits, matching, advice) goes to the stylist
+_NEEDS_STYLIST = re.compile(
+    r"\b(suggest|recommend|outfit|match|matches|go with|goes with|pair|should i|what to wear|advice|help me|"
+    r"look good|combination|combine|style me|ideas?)\b",
+    re.IGNORECASE
+)
+# A "mark worn" message is only a list of items; any question in it goes to the stylist
+_QUESTION = re.compile(
+    r"\?|\b(what|which|how|why|where|when|who|should|would|could|can|does|do|is|are|any|or)\b",
+    re.IGNORECASE
+)
+_SPLIT = re.compile(r"\s*(?:,|\band\b|&|\+|\bplus\b|\bwith\b)\s*", re.IGNORECASE)
+_HANDLE = re.compile(r"^w\d+$", re.IGNORECASE)
+_OBJECT_ID = re.compile(r"^[0-9a-f]{24}$", re.IGNORECASE)
+_STOP = {"my", "the", "a", "an", "this", "that", "these", "those", "one", "today", "yesterday", "both", "all"}
+_WORD = re.compile(r"[a-z0-9-]+")
+_STYLE_WORDS = re.compile(r"\b(semi-formal|formal|casual)\b", re.IGNORECASE)
+
+# Seed phrases for the optional classifier; the rules above stay authoritative
+_EXAMPLES = {
+    "greeting": [
+        "hi", "hello there", "hey tara", "good morning", "thanks a lot", "thank you so much",
+        "hey how are you", "hello tara how are you doing", "bye for now", "ok thanks",
+    ],
+    "list": [
+        "show my wardrobe", "what is in my closet", "list my shirts", "which shoes do i have",
+        "show me all my clothes", "what jackets do i own", "do i have any blue shirts",
+        "show formal items", "what casual clothes are there", "list everything i own",
+    ],
+    "mark_worn": [
+        "mark the white shirt as worn", "i wore my black shirt today", "i am wearing the beige pants",
+        "log the brown loafers as worn", "record that i wore the jacket", "put the sneakers down as worn",
+        "i wore the navy jacket yesterday", "update my white sneakers to worn",
+    ],
+    "stylist": [
+        "suggest an outfit for a wedding", "what should i wear to the office", "does blue match brown",
+        "what goes with beige pants", "help me dress for a date", "recommend something casual",
+        "is black and navy a good combination", "what color shoes go with grey trousers",
+        "plan my look for an interview", "style me for a party tonight",
+    ],
+}
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def _name(item: Dict[str, Any]) -> str:
+    return str(item.get("item_name") or f"{item.get('color', '')} {item.get('type', '')}").strip()
+
+
+class IntentClassifier:
+    """
+    Multinomial naive Bayes over the words of a few seed phrases per intent.
+    Tiny and dependency-free; it only widens what the rules catch, and its
+    guesses still need the same parameters (e.g. resolvable items) to be acted on.
+    """
+
+    def __init__(self, examples: Dict[str, List[str]] = _EXAMPLES):
+        self.counts = {intent: Counter(w for phrase in phrases for w in _words(phrase)) for intent, phrases in examples.items()}
+        self.totals = {intent: sum(counts.values()) for intent, counts in self.counts.items()}
+        self.vocabulary = {w for counts in self.counts.values() for w in counts}
+        total_phrases = sum(len(phrases) for phrases in examples.values())
+        self.priors = {intent: math.log(len(phrases) / total_phrases) for intent, phrases in examples.items()}
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        words = [w for w in _words(text) if w in self.vocabulary]
+        if not words:
+            return "stylist", 0.0
+        scores = {}
+        for intent, counts in self.counts.items():
+            denominator = self.totals[intent] + len(self.vocabulary)
+            scores[intent] = self.priors[intent] + sum(math.log((counts[w] + 1) / denominator) for w in words)
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1 / norm
+
+
+classifier = IntentClassifier() if INTENT_CLASSIFIER else None
+
+
+def classify(text: str) -> Optional[str]:
+    """The intent a message can be answered with locally ("greeting", "list", "mark_worn", "today"), or None."""
+    text = text.strip()
+    if not text or len(text) > 200:
+        return None
+    if _GREETING.match(text):
+        return "greeting"
+    if _TODAY.match(text):
+        return "today"
+    # Style words ("formal") also name occasions; only other occasion words mean a styling request
+    if _NEEDS_STYLIST.search(text) or detect_occasion(_STYLE_WORDS.sub(" ", text)):
+        return None
+    if _worn_refs(text) is not None:
+        return "mark_worn"
+    if _LIST.match(text) and (_WARDROBE_WORDS.search(text) or find_types(text) or find_colors(text)):
+        return "list"
+    if classifier is not None:
+        intent, confidence = classifier.predict(text)
+        if intent != "stylist" and confidence >= INTENT_CLASSIFIER_THRESHOLD:
+            return intent
+    return None
+
+
+def _worn_refs(text: str) -> Optional[List[str]]:
+    """The item phrases of a "mark X as worn" / "I wore X" message, or None if it is anything more than that."""
+    if _QUESTION.search(text) or _NEEDS_STYLIST.search(text):
+        return None
+    match = next((m for m in (p.match(text) for p in _MARK_WORN) if m), None)
+    if match is None:
+        return None
+    phrases = [phrase for phrase in _SPLIT.split(match.group("items")) if phrase and phrase.strip(" .!\"'")]
+    return phrases or None
+
+
+def _greet(text: str) -> str:
+    if _THANKS.search(text):
+        return "You're welcome! Let me know whenever you need another outfit idea."
+    if _BYE.search(text):
+        return "Bye for now, and have a stylish day!"
+    return (
+        "Hi! I'm Tara, your stylist. Ask me for an outfit for any occasion, whether two colors go together, "
+        "or to show what's in your wardrobe."
+    )
+
+
+def _join(names: List[str]) -> str:
+    return names[0] if len(names) == 1 else ", ".join(names[:-1]) + " and " + names[-1]
+
+
+def _plural(word: str, count: int) -> str:
+    if count == 1 or word.endswith("s"):
+        return word
+    return word + "es" if word.endswith(("sh", "ch", "x")) else word + "s"
+
+
+def _slot_rank(kind: str) -> int:
+    slot = SLOT_BY_TYPE.get(kind)
+    return SLOT_ORDER.index(slot) if slot in SLOT_ORDER else len(SLOT_ORDER)
+
+
+async def _list(text: str, user_id: str) -> str:
+    types = find_types(text)
+    colors = set(find_colors(text))
+    styles = [m.group(1).lower() for m in _STYLE_WORDS.finditer(text)][:1]
+    filters = {"style": styles[0]} if styles else {}
+    if len(types) == 1:
+        filters["type"] = next(iter(types))
+    items = await get_wardrobe(fields=LLM_FIELDS, filters=filters, user_id=user_id)
+    items = [
+        item for item in items
+        if (not types or str(item.get("type", "")).lower() in types)
+        and (not colors or normalize_color(str(item.get("color", ""))) in colors)
+    ]
+
+    described = " ".join(filter(None, [" and ".join(sorted(colors)), styles[0] if styles else ""]))
+    if not items:
+        what = " ".join(filter(None, [described, " or ".join(_plural(t, 2) for t in sorted(types)) or "items"]))
+        return f"I couldn't find any {what} in your wardrobe."
+
+    by_type: Dict[str, List[str]] = {}
+    for item in items:
+        by_type.setdefault(str(item.get("type", "other")).lower(), []).append(
+            f"{_name(item)} ({item.get('style', '')}, {item.get('fit', '')})"
+        )
+    lines = [
+        f"- {_plural(kind, len(names)).capitalize()}: {', '.join(names)}"
+        for kind, names in sorted(by_type.items(), key=lambda kv: _slot_rank(kv[0]))
+    ]
+    noun = _plural(next(iter(types)), len(items)) if len(types) == 1 else "item" if len(items) == 1 else "items"
+    header = f"You have {len(items)} {(described + ' ') if described else ''}{noun}"
+    return f"{header}:\n" + "\n".join(lines)
+
+
+async def _match(phrase: str, items: List[Dict[str, Any]], user_id: str) -> List[Dict[str, Any]]:
+    """Items a phrase refers to: a handle, an ObjectId, or words from the name, color and type."""
+    phrase = phrase.strip(" .!\"'")
+    if _HANDLE.match(phrase) or _OBJECT_ID.match(phrase):
+        # Handles may have been assigned by another worker
+        item_id = await resolve_handle(user_id, phrase)
+        return [item for item in items if item["_id"] == item_id]
+    words = [w for w in _words(phrase) if w not in _STOP]
+    if not words:
+        return []
+    exact = [item for item in items if _name(item).lower() == " ".join(words)]
+    if exact:
+        return exact
+    colors = set(find_colors(phrase))
+    types = find_types(phrase)
+    matched = []
+    for item in items:
+        haystack = set(_words(f"{_name(item)} {item.get('color', '')} {item.get('type', '')}"))
+        if colors and normalize_color(str(item.get("color", ""))) not in colors:
+            continue
+        if types and str(item.get("type", "")).lower() not in types:
+            continue
+        if colors or types or all(w in haystack for w in words):
+            matched.append(item)
+    return matched
+
+
+async def _mark_worn(text: str, user_id: str) -> Optional[str]:
+    phrases = _worn_refs(text)
+    if phrases is None:
+        return None
+    items = await get_wardrobe(fields=LLM_FIELDS, user_id=user_id)
+    chosen: Dict[str, Dict[str, Any]] = {}
+    for phrase in phrases:
+        matched = await _match(phrase, items, user_id)
+        if len(matched) != 1:
+            # Unknown or ambiguous ("my shirt" with two shirts): let the stylist ask
+            return None
+        chosen[matched[0]["_id"]] = matched[0]
+    if not chosen:
+        return None
+
+    # Even a single item goes through the batched path, which also logs the outfit for rotation history
+    result = await update_items_worn(list(chosen), user_id=user_id)
+    if result["missing"] or result["invalid"]:
+        return None
+    return f"Done! I've marked your {_join([_name(item) for item in chosen.values()])} as worn today."
+
+
+async def _today(text: str, user_id: str) -> Optional[str]:
+    styles = [m.group(1).lower() for m in _STYLE_WORDS.finditer(text)]
+    occasion = styles[0] if styles else "casual"
+    plan = await get_daily(user_id)
+    outfits = plan["outfits"].get(occasion) or []
+    if not outfits:
+        return None
+    reply = f"For a {occasion} day I'd go with your {_join([_name(item) for item in outfits[0]['items']])}."
+    if len(outfits) > 1:
+        reply += f" Another option: your {_join([_name(item) for item in outfits[1]['items']])}."
+    wearing = {item["_id"] for item in outfits[0]["items"]}
+    stale = [entry for entry in plan["rotation"].get("stale", []) if entry["_id"] not in wearing][:2]
+    if stale:
+        verb, pronoun = ("hasn't", "it") if len(stale) == 1 else ("haven't", "them")
+        reply += f" Your {_join([_name(entry) for entry in stale])} {verb} been worn in a while, so today is a good day to rotate {pronoun} in."
+    return reply
+
+
+async def route(text: str, user_id: str) -> Optional[Tuple[str, str]]:
+    """
+    Answer a message locally when it is trivial.
+
+    Returns:
+        Optional[Tuple[str, str]]: (intent, reply), or None to hand the message to the agent team.
+    """
+    if not INTENT_ROUTER:
+        return None
+    intent = classify(text)
+    if intent is None:
+        return None
+    try:
+        if intent == "greeting":
+            reply = _greet(text)
+        elif intent == "list":
+            reply = await _list(text, user_id)
+        elif intent == "today":
+            reply = await _today(text, user_id)
+        else:
+            reply = await _mark_worn(text, user_id)
+    except Exception as e:
+        log.warning("router.failed", intent=intent, error=str(e))
+        reply = None
+    metrics.inc("wardrobe_router_total", intent=intent if reply is not None else "fallthrough")
+    return (intent, reply) if reply is not None else None
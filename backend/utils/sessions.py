@@ -0,0 +1,247 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional
+
+from fastapi import WebSocket
+
+from utils.shared import SharedState, shared_state
+from utils.telemetry import get_logger, metrics
+
+if TYPE_CHECKING:
+    from autogen_core import CancellationToken
+
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "200"))
+# Close sessions with no user message and nothing running for this long (seconds)
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "900"))
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", "20"))
+# A client that has sent nothing (not even a pong) for this long is treated as dead
+HEARTBEAT_TIMEOUT = float(os.getenv("HEARTBEAT_TIMEOUT", "60"))
+INPUT_QUEUE_SIZE = int(os.getenv("INPUT_QUEUE_SIZE", "4"))
+# What to do with a message that arrives while the input queue is full: "drop" or "coalesce"
+INPUT_OVERFLOW = os.getenv("INPUT_OVERFLOW", "coalesce")
+# How long a closed session's conversation can be resumed, from any worker (seconds)
+SESSION_STATE_TTL = float(os.getenv("SESSION_STATE_TTL", "3600"))
+
+# Close codes sent to clients
+CLOSE_IDLE = 4000
+CLOSE_DEAD = 4001
+CLOSE_TRY_AGAIN_LATER = 1013
+
+log = get_logger("sessions")
+
+
+class InputQueue:
+    """
+    Bounded queue of user messages waiting for the conversation to ask for
+    them. When full, "drop" discards the new message and "coalesce" appends
+    it to the newest pending one, so a chatty client can't grow memory.
+    """
+
+    def __init__(self, maxsize: int = INPUT_QUEUE_SIZE, overflow: str = INPUT_OVERFLOW):
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._items: Deque[str] = deque()
+        self._ready = asyncio.Event()
+
+    def put(self, text: str) -> bool:
+        """Queue a message. Returns False if it was dropped."""
+        if len(self._items) >= self.maxsize:
+            metrics.inc("wardrobe_inputs_overflow_total", policy=self.overflow)
+            if self.overflow != "coalesce":
+                return False
+            self._items[-1] = f"{self._items[-1]}\n{text}"
+        else:
+            self._items.append(text)
+        self._ready.set()
+        return True
+
+    async def get(self) -> str:
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class Session:
+    """State for one WebSocket connection."""
+
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.user_id = user_id
+        self.inputs = InputQueue()
+        self.should_wait_for_input = asyncio.Event()
+        self.conversation_task: Optional[asyncio.Task] = None
+        self.cancellation_token: Optional["CancellationToken"] = None
+        self.team: Any = None
+        self.agents: Any = None
+        self.created_at = time.monotonic()
+        self.last_seen = self.created_at
+        self.last_active = self.created_at
+
+    def touch(self, active: bool = True) -> None:
+        """Record traffic from the client; pongs keep it alive but don't count as activity."""
+        self.last_seen = time.monotonic()
+        if active:
+            self.last_active = self.last_seen
+
+    @property
+    def busy(self) -> bool:
+        return self.conversation_task is not None and not self.conversation_task.done()
+
+    def start_conversation(self, coro) -> asyncio.Task:
+        from autogen_core import CancellationToken
+        self.cancellation_token = CancellationToken()
+        self.conversation_task = asyncio.create_task(coro)
+        return self.conversation_task
+
+    async def cancel_conversation(self) -> None:
+        """Stop the running conversation, including model calls already in flight."""
+        if self.cancellation_token is not None:
+            self.cancellation_token.cancel()
+        task = self.conversation_task
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self.conversation_task = None
+        self.inputs.clear()
+
+
+class SessionManager:
+    """
+    Tracks open sessions, rejects new ones past max_sessions, and runs a
+    single background sweep that pings clients and closes dead or idle ones.
+
+    A WebSocket stays on the worker that accepted it, so live state never
+    crosses processes. What must outlive the connection (the coordinator's
+    conversation memory) is saved to the shared state after every turn and
+    can be resumed by reconnecting with ?session_id=... on any worker.
+    """
+
+    STATE_PREFIX = "session:"
+
+    def __init__(
+        self,
+        max_sessions: int = MAX_SESSIONS,
+        idle_timeout: float = SESSION_IDLE_TIMEOUT,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+        state: SharedState = shared_state,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.state = state
+        self.sessions: Dict[str, Session] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    @property
+    def full(self) -> bool:
+        return len(self.sessions) >= self.max_sessions
+
+    def open(self, websocket: WebSocket, user_id: str) -> Session:
+        session = Session(websocket, user_id)
+        self.sessions[session.id] = session
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+        return session
+
+    async def save(self, session: Session) -> None:
+        """Persist the session's conversation memory so it can be resumed elsewhere."""
+        if session.agents is None:
+            return
+        try:
+            memory = await session.agents.coordinator_agent.model_context.save_state()
+            await self.state.set(
+                self.STATE_PREFIX + session.id,
+                {"user_id": session.user_id, "memory": dict(memory)},
+                ttl=SESSION_STATE_TTL
+            )
+        except Exception as e:
+            log.warning("session.save_failed", session=session.id, error=str(e))
+
+    async def resume(self, session: Session, session_id: str) -> bool:
+        """Load a saved conversation into a fresh session, which takes over its id."""
+        if session_id in self.sessions:
+            return False
+        saved = await self.state.get(self.STATE_PREFIX + session_id)
+        if not saved or saved.get("user_id") != session.user_id:
+            return False
+        await session.agents.coordinator_agent.model_context.load_state(saved["memory"])
+        self.sessions.pop(session.id, None)
+        session.id = session_id
+        self.sessions[session.id] = session
+        metrics.inc("wardrobe_sessions_resumed_total")
+        return True
+
+    async def close(self, session: Session) -> None:
+        """Cancel the session's work and forget it. Safe to call more than once."""
+        await session.cancel_conversation()
+        self.sessions.pop(session.id, None)
+
+    async def reject(self, websocket: WebSocket) -> None:
+        metrics.inc("wardrobe_sessions_rejected_total")
+        log.warning("session.rejected", open_sessions=len(self.sessions))
+        await websocket.send_json({
+            "type": "error",
+            "content": "Tara is helping a lot of people right now. Please try again in a moment."
+        })
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+
+    async def _evict(self, session: Session, code: int, reason: str) -> None:
+        metrics.inc("wardrobe_sessions_evicted_total", reason=reason)
+        log.info("session.evicted", session=session.id, reason=reason)
+        await self.close(session)
+        try:
+            await asyncio.wait_for(session.websocket.close(code=code, reason=reason), timeout=5)
+        except Exception:
+            pass
+
+    async def _ping(self, session: Session) -> None:
+        try:
+            await asyncio.wait_for(session.websocket.send_json({"type": "ping"}), timeout=self.heartbeat_interval)
+        except Exception:
+            await self._evict(session, CLOSE_DEAD, "unreachable")
+
+    async def _sweep(self) -> None:
+        while self.sessions:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            pings: List[Session] = []
+            for session in list(self.sessions.values()):
+                if now - session.last_seen > self.heartbeat_timeout:
+                    await self._evict(session, CLOSE_DEAD, "heartbeat")
+                elif not session.busy and now - session.last_active > self.idle_timeout:
+                    await self._evict(session, CLOSE_IDLE, "idle")
+                else:
+                    pings.append(session)
+            await asyncio.gather(*(self._ping(session) for session in pings))
+
+    async def shutdown(self) -> None:
+        for session in list(self.sessions.values()):
+            await self._evict(session, 1001, "shutdown")
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+
+
+session_manager = SessionManager()
+
+metrics.gauge("wardrobe_sessions", lambda: len(session_manager), "Open WebSocket sessions")
+metrics.gauge(
+    "wardrobe_sessions_busy",
+    lambda: sum(1 for s in session_manager.sessions.values() if s.busy),
+    "Sessions with a conversation in progress"
+)
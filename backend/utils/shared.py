@@ -0,0 +1,231 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+# Unix socket of the shared state service; empty keeps state in-process (single worker)
+SHARED_STATE_SOCKET = os.getenv("SHARED_STATE_SOCKET", "")
+SHARED_STATE_SIZE = int(os.getenv("SHARED_STATE_SIZE", "10000"))
+
+
+class SharedState:
+    """
+    Small key-value store for state every worker must agree on: wardrobe
+    versions, cached responses, item handles and resumable conversations.
+    Values must be JSON-serialisable.
+    """
+
+    # True when the state lives in this process, so callers can skip syncing
+    local = False
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    async def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set the key only if it is absent (or expired). Returns True if this call set it."""
+        raise NotImplementedError
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        """Add to a counter (absent counts as 0) and return its new value, atomically."""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def clear(self, prefix: str = "") -> None:
+        raise NotImplementedError
+
+    async def count(self, prefix: str = "") -> int:
+        raise NotImplementedError
+
+
+class LocalState(SharedState):
+    """In-process LRU map with optional per-key expiry."""
+
+    local = True
+
+    def __init__(self, max_entries: int = SHARED_STATE_SIZE):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+
+    def get_now(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.time() > expires_at:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set_now(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (value, time.time() + ttl if ttl else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def add_now(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        if self.get_now(key) is not None:
+            return False
+        self.set_now(key, value, ttl)
+        return True
+
+    def incr_now(self, key: str, amount: int = 1) -> int:
+        value = (self.get_now(key) or 0) + amount
+        self.set_now(key, value)
+        return value
+
+    def clear_now(self, prefix: str = "") -> None:
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            del self._data[key]
+
+    def delete_now(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def count_now(self, prefix: str = "") -> int:
+        return sum(1 for k in self._data if k.startswith(prefix))
+
+    async def get(self, key):
+        return self.get_now(key)
+
+    async def set(self, key, value, ttl=None):
+        self.set_now(key, value, ttl)
+
+    async def add(self, key, value, ttl=None):
+        return self.add_now(key, value, ttl)
+
+    async def incr(self, key, amount=1):
+        return self.incr_now(key, amount)
+
+    async def delete(self, key):
+        self.delete_now(key)
+
+    async def clear(self, prefix=""):
+        self.clear_now(prefix)
+
+    async def count(self, prefix=""):
+        return self.count_now(prefix)
+
+
+class SocketState(SharedState):
+    """Client for the shared state service, one connection per worker."""
+
+    def __init__(self, path: str = SHARED_STATE_SOCKET):
+        self.path = path
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _call(self, **request: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Streams and locks belong to one event loop (e.g. a new loop per test run)
+            self._loop, self._lock = loop, asyncio.Lock()
+            self._reader = self._writer = None
+        async with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._writer is None:
+                        self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+                    self._writer.write(json.dumps(request, default=str).encode() + b"\n")
+                    await self._writer.drain()
+                    line = await self._reader.readline()
+                    if not line:
+                        raise ConnectionError("shared state service closed the connection")
+                    return json.loads(line)["value"]
+                except (ConnectionError, OSError):
+                    self._disconnect()
+                    if attempt == 2:
+                        raise
+                except asyncio.CancelledError:
+                    # The reply may still arrive; drop the connection so the next call can't read it
+                    self._disconnect()
+                    raise
+
+    def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def get(self, key):
+        return await self._call(op="get", key=key)
+
+    async def set(self, key, value, ttl=None):
+        await self._call(op="set", key=key, value=value, ttl=ttl)
+
+    async def add(self, key, value, ttl=None):
+        return await self._call(op="add", key=key, value=value, ttl=ttl)
+
+    async def incr(self, key, amount=1):
+        return await self._call(op="incr", key=key, amount=amount)
+
+    async def delete(self, key):
+        await self._call(op="delete", key=key)
+
+    async def clear(self, prefix=""):
+        await self._call(op="clear", prefix=prefix)
+
+    async def count(self, prefix=""):
+        return await self._call(op="count", prefix=prefix)
+
+
+async def serve(path: str = SHARED_STATE_SOCKET) -> None:
+    """Run the shared state service on a unix socket until cancelled."""
+    state = LocalState()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                op, value = request["op"], None
+                if op == "get":
+                    value = state.get_now(request["key"])
+                elif op == "set":
+                    state.set_now(request["key"], request["value"], request.get("ttl"))
+                elif op == "add":
+                    value = state.add_now(request["key"], request["value"], request.get("ttl"))
+                elif op == "incr":
+                    value = state.incr_now(request["key"], request.get("amount", 1))
+                elif op == "delete":
+                    state.delete_now(request["key"])
+                elif op == "clear":
+                    state.clear_now(request.get("prefix", ""))
+                elif op == "count":
+                    value = state.count_now(request.get("prefix", ""))
+                writer.write(json.dumps({"value": value}).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(handle, path=path)
+    async with server:
+        await server.serve_forever()
+
+
+def run_service(path: str) -> None:
+    asyncio.run(serve(path))
+
+
+def create_shared_state() -> SharedState:
+    if SHARED_STATE_SOCKET:
+        return SocketState(SHARED_STATE_SOCKET)
+    return LocalState()
+
+
+shared_state = create_shared_state()
+
+
+if __name__ == "__main__":
+    run_service(sys.argv[1] if len(sys.argv) > 1 else SHARED_STATE_SOCKET)
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from autogen_core import CancellationToken
+
+from utils.cache import normalize_query
+from utils.telemetry import metrics
+
+# Share one in-flight expert call between concurrent identical requests
+COALESCE = os.getenv("COALESCE", "1") == "1"
+# How requests are compared: "exact", "basic" (case, punctuation, spacing) or
+# "bag" (basic, minus filler words, order-insensitive: "black shirt with beige
+# chinos" matches "beige chinos and a black shirt")
+COALESCE_NORMALIZE = os.getenv("COALESCE_NORMALIZE", "basic")
+
+_FILLER = {"a", "an", "the", "and", "with", "for", "to", "of", "my", "me", "please", "some", "on", "in"}
+
+
+def normalize_request(text: str, mode: str = COALESCE_NORMALIZE) -> str:
+    if mode == "exact":
+        return text.strip()
+    basic = normalize_query(text)
+    if mode == "bag":
+        return " ".join(sorted(w for w in re.split(r"\s+", basic) if w and w not in _FILLER))
+    return basic
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; callers that arrive while it is
+    in flight await the same result. The shared call is detached from any one
+    caller, so it survives a caller going away and is cancelled only when
+    nobody is waiting for it any more.
+    """
+
+    def __init__(self, name: str, enabled: bool = COALESCE):
+        self.name = name
+        self.enabled = enabled
+        self.calls = 0
+        self.shared = 0
+        self._inflight: Dict[Any, Tuple[asyncio.Task, Dict[str, int]]] = {}
+        metrics.gauge(f"wardrobe_{name}_dedupe_ratio", lambda: self.dedupe_ratio, f"Share of {name} calls served by another in-flight call")
+
+    @property
+    def dedupe_ratio(self) -> float:
+        return round(self.shared / self.calls, 3) if self.calls else 0.0
+
+    async def do(
+        self,
+        key: Any,
+        call: Callable[[Optional[CancellationToken]], Awaitable[Any]],
+        cancellation_token: Optional[CancellationToken] = None
+    ) -> Any:
+        self.calls += 1
+        metrics.inc("wardrobe_singleflight_calls_total", flight=self.name)
+        if not self.enabled:
+            return await call(cancellation_token)
+
+        entry = self._inflight.get(key)
+        if entry is not None and not entry[0].cancelled():
+            task, waiters = entry
+            self.shared += 1
+            metrics.inc("wardrobe_singleflight_shared_total", flight=self.name)
+        else:
+            task, waiters = asyncio.create_task(call(None)), {"count": 0}
+            self._inflight[key] = (task, waiters)
+            task.add_done_callback(lambda done: self._finished(key, done))
+
+        waiters["count"] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            waiters["count"] -= 1
+            if waiters["count"] == 0 and not task.done():
+                task.cancel()
+                self._finished(key, task)
+
+    def _finished(self, key: Any, task: asyncio.Task) -> None:
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight[key]
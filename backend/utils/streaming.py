@@ -0,0 +1,26 @@
+class SentinelStripper:
+    """
+    Removes a sentinel word (e.g. "TERMINATE") from a stream of text chunks.
+
+    A chunk ending in a partial match ("...TERM") is held back until the next
+    chunk shows whether it completes the sentinel, so the sentinel never
+    reaches the client even when the model splits it across tokens.
+    """
+
+    def __init__(self, sentinel: str = "TERMINATE"):
+        self.sentinel = sentinel
+        self.buffer = ""
+
+    def feed(self, chunk: str) -> str:
+        text = (self.buffer + chunk).replace(self.sentinel, "")
+        hold = 0
+        for size in range(min(len(self.sentinel) - 1, len(text)), 0, -1):
+            if self.sentinel.startswith(text[-size:]):
+                hold = size
+                break
+        self.buffer = text[len(text) - hold:]
+        return text[:len(text) - hold]
+
+    def flush(self) -> str:
+        text, self.buffer = self.buffer, ""
+        return text
@@ -0,0 +1,201 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Trace id of the conversation currently being handled, attached to every log line and span
+current_trace_id: ContextVar[Optional[str]] = ContextVar("current_trace_id", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class StructLogger:
+    """Logs one JSON object per event. Formatting and I/O happen on a background thread."""
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, level: int, event: str, exc_info: bool = False, **fields: Any) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        trace_id = current_trace_id.get()
+        if trace_id:
+            fields["trace_id"] = trace_id
+        self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self._log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self._log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self._log(logging.WARNING, event, **fields)
+
+    def error(self, event: str, exc_info: bool = False, **fields: Any) -> None:
+        self._log(logging.ERROR, event, exc_info=exc_info, **fields)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging() -> None:
+    """Route the "wardrobe" loggers through a queue so the event loop never blocks on stdout."""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger("wardrobe")
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.propagate = False
+
+
+def get_logger(name: str) -> StructLogger:
+    setup_logging()
+    return StructLogger(f"wardrobe.{name}")
+
+
+# --- Metrics -----------------------------------------------------------------
+
+Labels = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Minimal in-process registry rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self.help: Dict[str, str] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        series = self.counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        series = self.histograms.setdefault(name, {})
+        key = _labels(labels)
+        if key not in series:
+            series[key] = Histogram()
+        series[key].observe(value)
+
+    def gauge(self, name: str, read: Callable[[], float], help: str = "") -> None:
+        """Register a gauge read lazily at scrape time."""
+        self.gauges[name] = read
+        if help:
+            self.help[name] = help
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, series in self.counters.items():
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name, series in self.histograms.items():
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in series.items():
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', str(bound)))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {hist.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {round(hist.sum, 6)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {hist.count}")
+        for name, read in self.gauges.items():
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} gauge")
+            try:
+                lines.append(f"{name} {read()}")
+            except Exception:
+                continue
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+_span_log = get_logger("trace")
+
+
+def new_trace_id() -> str:
+    trace_id = uuid.uuid4().hex[:16]
+    current_trace_id.set(trace_id)
+    return trace_id
+
+
+@contextmanager
+def span(name: str, **labels: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block and record it as wardrobe_span_seconds{span=name,...}. The
+    yielded dict can be filled with extra fields for the debug log line.
+    """
+    fields: Dict[str, Any] = {}
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield fields
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe("wardrobe_span_seconds", elapsed, span=name, **labels)
+        if status == "error":
+            metrics.inc("wardrobe_span_errors_total", span=name, **labels)
+        _span_log.debug("span", span=name, status=status, ms=round(elapsed * 1000, 2), **labels, **fields)
@@ -1,34 +1,39 @@
 from autogen_core.tools import FunctionTool
 from datetime import datetime
 from typing import List, Dict, Any
-from routes.mongocl import get_wardrobe, update_item_worn
+from routes.mongocl import get_wardrobe, update_items_worn, on_wardrobe_change, refresh_if_stale, current_user_id, LLM_FIELDS
+from utils.outfits import get_outfit_index
+from utils.daily import get_daily
+from utils.colors import detect_occasion
+from utils.compact import compact_wardrobe, estimate_tokens, get_handles, resolve_handle, shared_handles
+from utils.telemetry import get_logger, metrics, span
+
+log = get_logger("tools")
 
 async def get_wardrobe_items() -> List[Dict[str, Any]]:
     """
-    Get all items from the wardrobe database.
+    Get all items from the wardrobe database, projected to the fields the LLM needs.
 
     Returns:
         List[Dict[str, Any]]: List of wardrobe items.
     """
-    return await get_wardrobe()
+    return await get_wardrobe(fields=LLM_FIELDS)
 
-async def update_worn_items(item_ids: List[str]) -> bool:
+async def update_worn_items(item_ids: List[str]) -> Dict[str, Any]:
     """
-    Update the last_worn date and increment times_worn for the given items.
+    Update the last_worn date and increment times_worn for the given items in one batch.
 
     Args:
         item_ids (List[str]): List of MongoDB ObjectId strings that the user wore.
 
     Returns:
-        bool: True if all updates were successful.
+        Dict[str, Any]: Lists of "updated", "missing" and "invalid" item ids.
     """
     try:
-        for item_id in item_ids:
-            await update_item_worn(item_id)
-        return True
+        return await update_items_worn(item_ids)
     except Exception as e:
-        print(f"Error updating worn items: {str(e)}")
-        return False
+        log.error("update_worn_items.error", error=str(e))
+        return {"updated": [], "missing": [], "invalid": [], "error": str(e)}
 
 
 async def mark_items_worn(item_ids: List[str]) -> Dict[str, Any]:
@@ -36,35 +41,109 @@ async def mark_items_worn(item_ids: List[str]) -> Dict[str, Any]:
     Async wrapper that marks items as worn.
     
     Args:
-        item_ids (List[str]): List of MongoDB ObjectId strings that the user wore.
+        item_ids (List[str]): Item handles from WardrobeLook (e.g. "w3") or MongoDB ObjectId strings that the user wore.
         
     Returns:
-        Dict[str, Any]: Status of the update operation
+        Dict[str, Any]: Status of the update operation with per-item results
     """
-    success = await update_worn_items(item_ids)
+    user_id = current_user_id.get()
+    refs = {await resolve_handle(user_id, ref): ref for ref in item_ids}
+    with span("tool", tool="MarkAsWorn") as fields:
+        result = await update_worn_items(list(refs))
+        fields["updated"] = len(result["updated"])
+    failed = result["missing"] or result["invalid"] or "error" in result
     return {
-        "status": "success" if success else "error",
-        "updated_items": item_ids if success else []
+        "status": "success" if not failed else "partial" if result["updated"] else "error",
+        "updated_items": [refs[i] for i in result["updated"]],
+        "missing_items": [refs[i] for i in result["missing"]],
+        "invalid_items": [refs[i] for i in result["invalid"]]
     }
 
-async def suggest_outfits() -> Dict[str, Any]:
+
+def _sync_outfit_index(event: str, item: Dict[str, Any]) -> None:
+    outfit_index = get_outfit_index(item["user_id"])
+    if event == "add":
+        outfit_index.add(dict(item))
+    elif event == "remove":
+        outfit_index.remove(item["_id"])
+        get_handles(item["user_id"]).forget(item["_id"])
+    elif event == "worn":
+        outfit_index.mark_worn(item["_id"], item["last_worn"])
+    elif event == "reset":
+        outfit_index.invalidate()
+
+on_wardrobe_change(_sync_outfit_index)
+
+
+async def _loaded_index(user_id: str):
+    await refresh_if_stale(user_id)
+    outfit_index = get_outfit_index(user_id)
+    if not outfit_index.loaded:
+        outfit_index.load(await get_wardrobe_items())
+    return outfit_index
+
+
+async def suggest_outfits(occasion: str = "casual") -> Dict[str, Any]:
     """
-    Get wardrobe data and prepare for outfit suggestions.
-    
+    Get the best pre-ranked outfit combinations from the wardrobe for an occasion.
+
+    Args:
+        occasion (str): The occasion or request, e.g. "casual", "formal", "wedding", "office".
+
+    Returns:
+        Dict[str, Any]: Top ranked outfits (with item _ids) and item counts per type
+    """
+    outfit_index = await _loaded_index(current_user_id.get())
+    occasion = detect_occasion(occasion) or "casual"
+    return {
+        "occasion": occasion,
+        "outfits": outfit_index.top(occasion),
+        "items_by_type": outfit_index.summary()
+    }
+
+
+async def wardrobe_look(request: str = "casual") -> str:
+    """
+    Get the best pre-ranked outfits and the most relevant wardrobe items as a compact table.
+
+    Args:
+        request (str): The occasion or request, e.g. "formal", "wedding", "office", "my blue shirts".
+
     Returns:
-        Dict[str, Any]: All wardrobe items for outfit suggestions
+        str: Ranked outfits and a dictionary-encoded item table, using short item handles (w1, w2, ...)
     """
-    items = await get_wardrobe_items()
-    return {"wardrobe": items}
+    with span("tool", tool="WardrobeLook") as fields:
+        user_id = current_user_id.get()
+        outfit_index = await _loaded_index(user_id)
+        occasion = detect_occasion(request) or "casual"
+        # The precomputed plan, when it matches this wardrobe version, saves ranking and adds rotation stats
+        plan = await get_daily(user_id, compute=False)
+        outfits = plan["outfits"].get(occasion) if plan else None
+        outfits = outfits or outfit_index.top(occasion)
+        # Every item compact_wardrobe may show needs its handle settled first
+        shown = list(outfit_index.items) + [item["_id"] for outfit in outfits for item in outfit["items"]]
+        handles = await shared_handles(user_id, shown)
+        context = compact_wardrobe(
+            outfit_index.items.values(),
+            request,
+            occasion,
+            outfits,
+            handles,
+            rotation=plan["rotation"] if plan else None
+        )
+        fields["precomputed"] = plan is not None
+        fields["tokens"] = estimate_tokens(context)
+        metrics.inc("wardrobe_context_tokens_total", fields["tokens"])
+        return context
 
 MarkAsWornTool = FunctionTool(
     name="MarkAsWorn",
-    description="Mark selected wardrobe items as worn today and increment their wear count.",
+    description="Mark selected wardrobe items as worn today, together as one outfit, and increment their wear count. Takes the item handles (e.g. w3) shown by WardrobeLook. Reports any items that were not found.",
     func=mark_items_worn
 )
 
 WardrobeLook = FunctionTool(
     name="WardrobeLook",
-    description="Use this tool to check the user's wardrobe data and suggest outfit combinations based on their clothes, colors, types, and styles.",
-    func=suggest_outfits
+    description="Use this tool to get the best ranked outfit combinations from the user's wardrobe for a request or occasion (casual, semi-formal, formal, wedding, office, 'blue shirts'...), a count of items per type and a compact table of the most relevant items with their handles.",
+    func=wardrobe_look
 )
\ No newline at end of file
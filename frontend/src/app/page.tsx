@@ -2,9 +2,9 @@
 import { useState, useEffect, useRef } from "react";
 
 export default function Home() {
-  const [messages, setMessage] = useState<{ sender: string; text: string }[]>(
-    []
-  );
+  const [messages, setMessage] = useState<
+    { sender: string; text: string; streaming?: boolean }[]
+  >([]);
   const [input, setInput] = useState("");
   const [isProcessing, setIsProcessing] = useState(false);
   const [isConnected, setIsConnected] = useState(false);
@@ -31,7 +31,11 @@ export default function Home() {
     const connectWebSocket = () => {
       try {
         console.log("Attempting to connect to WebSocket...");
-        w.current = new WebSocket("ws://localhost:8000/ws");
+        // Resume the previous conversation after a reload or reconnect
+        const sessionId = sessionStorage.getItem("taraSessionId");
+        w.current = new WebSocket(
+          "ws://localhost:8000/ws" + (sessionId ? `?session_id=${sessionId}` : "")
+        );
 
         w.current.onopen = () => {
           console.log("✅ Connected to Tara");
@@ -48,7 +52,12 @@ export default function Home() {
           try {
             const data = JSON.parse(e.data);
 
-            if (data.type === "status") {
+            if (data.type === "session") {
+              sessionStorage.setItem("taraSessionId", data.session_id);
+            } else if (data.type === "ping") {
+              // Heartbeat: answer so the server keeps the session open
+              w.current?.send(JSON.stringify({ type: "pong" }));
+            } else if (data.type === "status") {
               console.log("⏳ Status:", data.message);
               setIsProcessing(true);
             } else if (data.type === "stream") {
@@ -61,24 +70,48 @@ export default function Home() {
                 },
               ]);
               setIsProcessing(false);
-            } else if (data.type === "final_response") {
-              console.log("✅ Final response:", data.content);
-              // Only add if not already added via stream
-              const lastMessage = messages[messages.length - 1];
-              if (!lastMessage || lastMessage.text !== data.content) {
-                setMessage((prev) => [
+            } else if (data.type === "partial_response") {
+              // Grow a draft message token by token until final_response arrives
+              setMessage((prev) => {
+                const last = prev[prev.length - 1];
+                if (last?.streaming) {
+                  return [
+                    ...prev.slice(0, -1),
+                    { ...last, text: last.text + data.content },
+                  ];
+                }
+                return [
                   ...prev,
                   {
                     sender: data.agent || "Tara",
                     text: data.content,
+                    streaming: true,
                   },
-                ]);
-              }
+                ];
+              });
+              setIsProcessing(false);
+            } else if (data.type === "final_response") {
+              console.log("✅ Final response:", data.content);
+              // Replace the streamed draft, or add if nothing was streamed
+              setMessage((prev) => {
+                const last = prev[prev.length - 1];
+                const finalMessage = {
+                  sender: data.agent || "Tara",
+                  text: data.content,
+                };
+                if (last?.streaming) {
+                  return [...prev.slice(0, -1), finalMessage];
+                }
+                if (last && last.text === data.content) {
+                  return prev;
+                }
+                return [...prev, finalMessage];
+              });
               setIsProcessing(false);
             } else if (data.type === "error") {
               console.error("❌ Error:", data.content);
               setMessage((prev) => [
-                ...prev,
+                ...prev.map((m) => ({ ...m, streaming: false })),
                 {
                   sender: "System",
                   text: `Error: ${data.content}`,
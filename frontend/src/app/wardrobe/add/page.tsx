@@ -65,6 +65,31 @@ export default function AddItem() {
     });
   };
 
+  const handlePhoto = async (e: React.ChangeEvent<HTMLInputElement>) => {
+    const file = e.target.files?.[0];
+    if (!file) return;
+    const form = new FormData();
+    form.append("files", file);
+    try {
+      setMessage("Detecting color...");
+      const response = await fetch("http://localhost:8000/wardrobe/photo/colors", {
+        method: "POST",
+        body: form,
+      });
+      const data = await response.json();
+      const colors = data.data?.[0]?.colors;
+      if (colors?.length) {
+        setItem({ ...item, color: colors[0].color });
+        setMessage(`Detected ${colors.map((c: { color: string }) => c.color).join(", ")}`);
+      } else {
+        setMessage("Could not detect a color from that photo");
+      }
+    } catch (error) {
+      console.error("Error:", error);
+      setMessage("Could not detect a color from that photo");
+    }
+  };
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     try {
@@ -154,6 +179,11 @@ export default function AddItem() {
                   required
                   variant="outlined"
                 />
+
+                <Button variant="outlined" component="label" sx={{ whiteSpace: "nowrap" }}>
+                  From photo
+                  <input hidden accept="image/*" type="file" onChange={handlePhoto} />
+                </Button>
               </Box>
 
               <Box